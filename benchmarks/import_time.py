@@ -0,0 +1,155 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Import time budget check
+Imports the entry points of the ASD manager in a fresh interpreter and verifies the import time stays within budget
+and that no clients or managers are built while importing.
+Client and manager construction is detected by instrumenting SSHClient, ServiceFactory.get_manager and PackageFactory.get_manager
+in a separate import, so building them directly (not only through shared_instance) is caught as well.
+Exits with a non-zero exit code when a check fails, so it can run as a CI step.
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-factor 2 --repeat 5
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module: budget in seconds
+BUDGETS = {'source.asdmanager': 1.0,   # asd-manager CLI commands
+           'source.tools.watcher': 0.3,
+           'source.app': 1.5}          # API
+
+MEASURE_SCRIPT = """
+import json, time
+start = time.time()
+__import__({0!r})
+duration = time.time() - start
+print json.dumps({{'duration': duration}})
+"""
+
+# Importing the instrumented classes upfront would hide their import time, so the builds are detected in a separate interpreter
+BUILDS_SCRIPT = """
+import json
+from source.tools.packagefactory import PackageFactory
+from source.tools.servicefactory import ServiceFactory
+from source.tools.sshclient import SSHClient
+built = []
+
+def _instrument(owner, name, label):
+    original = getattr(owner, name)
+    def _wrapper(*args, **kwargs):
+        built.append(label)
+        return original(*args, **kwargs)
+    setattr(owner, name, staticmethod(_wrapper) if name != '__init__' else _wrapper)
+
+_instrument(SSHClient, '__init__', 'SSHClient')
+_instrument(ServiceFactory, 'get_manager', 'ServiceFactory.get_manager')
+_instrument(PackageFactory, 'get_manager', 'PackageFactory.get_manager')
+__import__({0!r})
+print json.dumps({{'built': sorted(set(built))}})
+"""
+
+
+def _run_script(script, module):
+    """
+    Run a measurement script for a module in a fresh interpreter
+    :param script: The script to run (MEASURE_SCRIPT or BUILDS_SCRIPT)
+    :type script: str
+    :param module: Name of the module to import
+    :type module: str
+    :raises RuntimeError: When the module could not be imported
+    :return: The output of the script
+    :rtype: dict
+    """
+    process = subprocess.Popen([sys.executable, '-c', script.format(module)], cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = process.communicate()[0]
+    if process.returncode != 0:
+        raise RuntimeError('Importing {0} failed:\n{1}'.format(module, output.strip()))
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(module):
+    """
+    Measure the import time of a module in a fresh interpreter
+    :param module: Name of the module to import
+    :type module: str
+    :return: The import duration in seconds
+    :rtype: float
+    """
+    return _run_script(MEASURE_SCRIPT, module)['duration']
+
+
+def get_builds(module):
+    """
+    Retrieve the clients and managers built while importing a module in a fresh interpreter
+    :param module: Name of the module to import
+    :type module: str
+    :return: The built clients and managers
+    :rtype: list
+    """
+    return _run_script(BUILDS_SCRIPT, module)['built']
+
+
+def check(module, repeat, budget_factor):
+    """
+    Verify the import of a module stays within budget and does not build clients or managers
+    :param module: Name of the module to import
+    :type module: str
+    :param repeat: Amount of measurements, the fastest one is used
+    :type repeat: int
+    :param budget_factor: Factor to apply on the budget
+    :type budget_factor: float
+    :raises AssertionError: When a check fails
+    :return: The import duration, the budget and the built clients and managers
+    :rtype: tuple
+    """
+    duration = min(measure(module) for _ in xrange(repeat))
+    built = get_builds(module)
+    budget = BUDGETS[module] * budget_factor
+    print '{0:>24} {1:>12.1f} {2:>12.1f} {3}'.format(module, duration * 1000, budget * 1000, ', '.join(built) or '-')
+    if duration > budget:
+        raise AssertionError('{0} took {1:.3f}s to import, budget is {2:.3f}s'.format(module, duration, budget))
+    if len(built) > 0:
+        raise AssertionError('{0} builds {1} while being imported'.format(module, ', '.join(built)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the import time of the ASD manager entry points')
+    parser.add_argument('--repeat', type=int, default=3, help='Amount of measurements per module, the fastest one is used')
+    parser.add_argument('--budget-factor', type=float, default=1.0, help='Factor to apply on the budgets (eg: for slow build machines)')
+    arguments = parser.parse_args()
+
+    failures = []
+    print '{0:>24} {1:>12} {2:>12} {3}'.format('module', 'import (ms)', 'budget (ms)', 'built at import')
+    for module in sorted(BUDGETS):
+        try:
+            check(module=module, repeat=arguments.repeat, budget_factor=arguments.budget_factor)
+        except (AssertionError, RuntimeError) as ex:
+            failures.append(str(ex))
+    for failure in failures:
+        print 'FAILED: {0}'.format(failure)
+    sys.exit(1 if len(failures) > 0 else 0)
+
+
+if __name__ == '__main__':
+    main()
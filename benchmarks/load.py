@@ -0,0 +1,196 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Concurrent poller load test for the ASD manager API
+Starts the API in a threaded werkzeug server on a simulated node and drives a mix of concurrent readers (polling /slots,
+/maintenance and /service_status/<name> like the framework workers do) and writers (slot and ASD restarts).
+Reports the throughput and tail latency per endpoint, the contention on the file mutexes and resource locks and the amount of threads.
+Usage:
+    python benchmarks/load.py --disks 60 --readers 16 --writers 2 --duration 30 --command-latency 5
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import urllib2
+import argparse
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.simulation import SimulatedNode, percentile
+
+READ_ENDPOINTS = ['/slots', '/maintenance', '/service_status/alba-maintenance']
+WRITE_ENDPOINTS = ['slot_restart', 'asd_restart']
+
+
+class LoadClient(threading.Thread):
+    """
+    Client thread which keeps sending requests until the deadline has passed
+    """
+    def __init__(self, base_url, auth, pick_request, deadline, results):
+        super(LoadClient, self).__init__(name='load_client')
+        self.daemon = True
+        self._base_url = base_url
+        self._auth = auth
+        self._pick_request = pick_request
+        self._deadline = deadline
+        self._results = results
+
+    def run(self):
+        while time.time() < self._deadline:
+            label, method, path = self._pick_request()
+            request = urllib2.Request('{0}{1}'.format(self._base_url, path), data='' if method == 'POST' else None)
+            request.add_header('Authorization', 'Basic {0}'.format(self._auth))
+            start = time.time()
+            try:
+                urllib2.urlopen(request, timeout=300).read()
+                success = True
+            except Exception:
+                success = False
+            self._results.append((label, time.time() - start, success))
+
+
+def run_load(node, readers, writers, duration, port):
+    """
+    Run the load test against a simulated node
+    :param node: Simulated node
+    :type node: benchmarks.simulation.SimulatedNode
+    :param readers: Amount of concurrent readers
+    :type readers: int
+    :param writers: Amount of concurrent writers
+    :type writers: int
+    :param duration: Duration of the test in seconds
+    :type duration: float
+    :param port: Port to start the API on
+    :type port: int
+    :return: The results of the load test
+    :rtype: dict
+    """
+    from werkzeug.serving import make_server
+    from source.app import app
+    from source.tools.metrics import Metrics
+
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, name='load_server')
+    server_thread.daemon = True
+    server_thread.start()
+
+    slots = [(disk.aliases[0].split('/')[-1], [asd.asd_id for asd in disk.asds]) for disk in node.disks]
+
+    def _pick_read():
+        path = random.choice(READ_ENDPOINTS)
+        return path, 'GET', path
+
+    def _pick_write():
+        slot_id, asd_ids = random.choice(slots)
+        if random.choice(WRITE_ENDPOINTS) == 'asd_restart' and len(asd_ids) > 0:
+            return 'asd_restart', 'POST', '/slots/{0}/asds/{1}/restart'.format(slot_id, random.choice(asd_ids))
+        return 'slot_restart', 'POST', '/slots/{0}/restart'.format(slot_id)
+
+    Metrics.reset()
+    results = []
+    base_url = 'http://127.0.0.1:{0}'.format(port)
+    auth = base64.b64encode('{0}:{1}'.format(node.USERNAME, node.PASSWORD))
+    start = time.time()
+    deadline = start + duration
+    clients = [LoadClient(base_url, auth, _pick_read, deadline, results) for _ in xrange(readers)]
+    clients += [LoadClient(base_url, auth, _pick_write, deadline, results) for _ in xrange(writers)]
+    for client in clients:
+        client.start()
+    max_threads = 0
+    while any(client.is_alive() for client in clients):
+        max_threads = max(max_threads, threading.active_count())
+        time.sleep(0.1)
+    elapsed = time.time() - start
+    server.shutdown()
+
+    endpoints = {}
+    for label, request_duration, success in results:
+        entry = endpoints.setdefault(label, {'durations': [], 'errors': 0})
+        entry['durations'].append(request_duration)
+        if success is False:
+            entry['errors'] += 1
+    summary = {'elapsed': elapsed,
+               'requests': len(results),
+               'throughput': len(results) / elapsed,
+               'max_threads': max_threads,
+               'endpoints': {},
+               'locks': {}}
+    for label, entry in endpoints.iteritems():
+        summary['endpoints'][label] = {'requests': len(entry['durations']),
+                                       'errors': entry['errors'],
+                                       'throughput': len(entry['durations']) / elapsed,
+                                       'p50': percentile(entry['durations'], 50),
+                                       'p99': percentile(entry['durations'], 99),
+                                       'max': max(entry['durations'])}
+    for (name, labels), value in Metrics.get_values().iteritems():
+        if name not in ['asd_manager_lock_wait_seconds', 'asd_manager_lock_hold_seconds']:
+            continue
+        lock = summary['locks'].setdefault(dict(labels)['lock'], {})
+        kind = 'wait' if name == 'asd_manager_lock_wait_seconds' else 'hold'
+        lock['{0}_total'.format(kind)] = value[1]
+        lock['{0}_mean'.format(kind)] = value[1] / value[2] if value[2] > 0 else 0.0
+        lock['acquisitions'] = value[2]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the ASD manager API with concurrent pollers and writers')
+    parser.add_argument('--disks', type=int, default=60, help='Amount of disks to simulate')
+    parser.add_argument('--asds-per-disk', type=int, default=1, help='Amount of ASDs per disk')
+    parser.add_argument('--readers', type=int, default=16, help='Amount of concurrent readers')
+    parser.add_argument('--writers', type=int, default=2, help='Amount of concurrent writers')
+    parser.add_argument('--duration', type=float, default=30, help='Duration of the test in seconds')
+    parser.add_argument('--command-latency', type=float, default=5.0, help='Latency of every command in milliseconds')
+    parser.add_argument('--config-latency', type=float, default=1.0, help='Latency of every configuration management call in milliseconds')
+    parser.add_argument('--port', type=int, default=18500, help='Port to start the API on')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    arguments = parser.parse_args()
+
+    with SimulatedNode(disk_count=arguments.disks,
+                       asds_per_disk=arguments.asds_per_disk,
+                       command_latency=arguments.command_latency / 1000.0,
+                       config_latency=arguments.config_latency / 1000.0) as node:
+        summary = run_load(node=node,
+                           readers=arguments.readers,
+                           writers=arguments.writers,
+                           duration=arguments.duration,
+                           port=arguments.port)
+
+    if arguments.json is True:
+        print json.dumps(summary, indent=4)
+        return
+    print 'Requests: {0} in {1:.1f}s ({2:.1f} req/s), max {3} threads'.format(summary['requests'], summary['elapsed'], summary['throughput'], summary['max_threads'])
+    print
+    print '{0:>34} {1:>9} {2:>7} {3:>8} {4:>10} {5:>10} {6:>10}'.format('endpoint', 'requests', 'errors', 'req/s', 'p50 (ms)', 'p99 (ms)', 'max (ms)')
+    for label in sorted(summary['endpoints']):
+        entry = summary['endpoints'][label]
+        print '{0:>34} {1:>9} {2:>7} {3:>8.1f} {4:>10.1f} {5:>10.1f} {6:>10.1f}'.format(label, entry['requests'], entry['errors'], entry['throughput'],
+                                                                                         entry['p50'] * 1000, entry['p99'] * 1000, entry['max'] * 1000)
+    print
+    print '{0:>34} {1:>12} {2:>14} {3:>14} {4:>14}'.format('lock', 'acquisitions', 'wait mean (ms)', 'wait total (s)', 'hold mean (ms)')
+    for name in sorted(summary['locks']):
+        lock = summary['locks'][name]
+        print '{0:>34} {1:>12} {2:>14.1f} {3:>14.2f} {4:>14.1f}'.format(name, lock.get('acquisitions', 0), lock.get('wait_mean', 0) * 1000,
+                                                                         lock.get('wait_total', 0), lock.get('hold_mean', 0) * 1000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Response serialization benchmark
+Retrieves the GET /slots payload of a simulated node for increasing amounts of disks and measures, for every available
+JSON encoder and content encoding, the size of the response body and the time spent encoding (and compressing) it.
+Usage:
+    python benchmarks/serialization.py --disks 12,60,200,500 --asds-per-disk 2
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.simulation import SimulatedNode, percentile
+
+
+def get_payload(disk_count, asds_per_disk):
+    """
+    Retrieve the decoded GET /slots response of a simulated node
+    :param disk_count: Amount of disks to simulate
+    :type disk_count: int
+    :param asds_per_disk: Amount of ASDs per disk
+    :type asds_per_disk: int
+    :return: The response data and the size of the response body when requesting gzip
+    :rtype: tuple
+    """
+    from source.app import app
+
+    with SimulatedNode(disk_count=disk_count, asds_per_disk=asds_per_disk, command_latency=0, config_latency=0) as node:
+        client = app.test_client()
+        headers = {'Authorization': 'Basic {0}'.format(base64.b64encode('{0}:{1}'.format(node.USERNAME, node.PASSWORD)))}
+        response = client.get('/slots', headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError('GET /slots returned {0}: {1}'.format(response.status_code, response.data))
+        data = json.loads(response.data)
+        response = client.get('/slots', headers=dict(headers.items() + [('Accept-Encoding', 'gzip')]))
+        if response.headers.get('Content-Encoding') != 'gzip':
+            raise RuntimeError('GET /slots did not return a gzip encoded response')
+        return data, len(response.data)
+
+
+def run_scenario(disk_count, asds_per_disk, iterations):
+    """
+    Measure the encoding of the GET /slots payload for a single node layout
+    :param disk_count: Amount of disks to simulate
+    :type disk_count: int
+    :param asds_per_disk: Amount of ASDs per disk
+    :type asds_per_disk: int
+    :param iterations: Amount of measured encodings per encoder and content encoding
+    :type iterations: int
+    :return: The results per encoder and content encoding
+    :rtype: list
+    """
+    from source.tools.serialization import Serialization
+
+    data, gzip_response_size = get_payload(disk_count=disk_count, asds_per_disk=asds_per_disk)
+    results = []
+    for encoder in [name for name in Serialization.ENCODER_PREFERENCE if name in Serialization._encoders]:
+        Serialization.set_encoder(encoder)
+        for content_encoding in [None, 'gzip', 'deflate']:
+            durations = []
+            size = 0
+            for _ in xrange(iterations):
+                start = time.time()
+                payload = Serialization.encode(data)
+                if content_encoding is not None:
+                    payload = Serialization.compress(payload, content_encoding)
+                durations.append(time.time() - start)
+                size = len(payload)
+            results.append({'disks': disk_count,
+                            'asds': disk_count * asds_per_disk,
+                            'encoder': encoder,
+                            'content_encoding': content_encoding or 'identity',
+                            'bytes': size,
+                            'p50': percentile(durations, 50),
+                            'gzip_response_bytes': gzip_response_size})
+    Serialization.set_encoder('json')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the encoding of the GET /slots response on a simulated node')
+    parser.add_argument('--disks', default='12,60,200,500', help='Comma separated list of disk counts to simulate')
+    parser.add_argument('--asds-per-disk', type=int, default=2, help='Amount of ASDs per disk')
+    parser.add_argument('--iterations', type=int, default=20, help='Amount of measured encodings per encoder and content encoding')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    arguments = parser.parse_args()
+
+    results = []
+    for disk_count in [int(count) for count in arguments.disks.split(',')]:
+        results.extend(run_scenario(disk_count=disk_count, asds_per_disk=arguments.asds_per_disk, iterations=arguments.iterations))
+    if arguments.json is True:
+        print json.dumps(results, indent=4)
+        return
+    # Savings are relative to the standard json module without compression, which is what the API used to return
+    baselines = dict((result['disks'], result) for result in results if result['encoder'] == 'json' and result['content_encoding'] == 'identity')
+    print '{0:>6} {1:>6} {2:>11} {3:>9} {4:>12} {5:>10} {6:>12} {7:>12}'.format('disks', 'asds', 'encoder', 'encoding', 'bytes', 'saved', 'p50 (ms)', 'saved (ms)')
+    for result in results:
+        baseline = baselines[result['disks']]
+        print '{0:>6} {1:>6} {2:>11} {3:>9} {4:>12} {5:>9.1f}% {6:>12.2f} {7:>12.2f}'.format(result['disks'], result['asds'],
+                                                                                        result['encoder'], result['content_encoding'],
+                                                                                        result['bytes'], 100.0 - 100.0 * result['bytes'] / baseline['bytes'],
+                                                                                        result['p50'] * 1000, (baseline['p50'] - result['p50']) * 1000)
+
+
+if __name__ == '__main__':
+    main()
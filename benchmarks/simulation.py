@@ -0,0 +1,416 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Simulated ASD manager node
+Replaces the command execution, the service manager and the configuration store by in-process stand-ins with configurable latencies
+and models the disks and ASDs in a throw-away database
+"""
+
+import os
+import sys
+import time
+import shutil
+import random
+import string
+import tempfile
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ovs_extensions.generic.configuration import Configuration as _Configuration, NotFoundException
+from ovs_extensions.generic.sshclient import SSHClient as _SSHClient
+from source.constants.asd import ASD_NODE_CONFIG_MAIN_LOCATION, ASD_NODE_CONFIG_NETWORK_LOCATION
+from source.dal.asdbase import ASDBase
+from source.dal.objects.asd import ASD
+from source.dal.objects.disk import Disk
+from source.dal.objects.setting import Setting
+from source.tools.blockqueue import BlockQueue
+from source.tools.lazy import shared_instance
+from source.tools.servicefactory import ServiceFactory
+
+
+def percentile(values, percent):
+    # type: (List[float], float) -> float
+    """
+    Calculate a percentile (nearest rank)
+    :param values: Values to calculate the percentile for
+    :type values: list[float]
+    :param percent: Percentile to calculate (0 - 100)
+    :type percent: float
+    :return: The percentile
+    :rtype: float
+    """
+    if len(values) == 0:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100.0 * len(ordered) + 0.5)) - 1)]
+
+
+class Counter(object):
+    """
+    Thread safe call counter
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def increment(self):
+        with self._lock:
+            self.value += 1
+
+    def reset(self):
+        with self._lock:
+            self.value = 0
+
+
+class ConfigStoreStandIn(object):
+    """
+    In-memory configuration store
+    """
+    def __init__(self, latency=0.0):
+        self.data = {}
+        self.latency = latency
+        self.calls = Counter()
+
+    def _call(self):
+        self.calls.increment()
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def _split(key):
+        if '|' in key:
+            key, sub_key = key.split('|', 1)
+            return key.rstrip('/'), sub_key
+        return key.rstrip('/'), None
+
+    def get(self, key, raw=False, **kwargs):
+        _ = raw
+        self._call()
+        key, sub_key = self._split(key)
+        if key not in self.data or (sub_key is not None and sub_key not in self.data[key]):
+            if 'default' in kwargs:
+                return kwargs['default']
+            raise NotFoundException('Key {0} not found'.format(key))
+        return self.data[key] if sub_key is None else self.data[key][sub_key]
+
+    def set(self, key, value, raw=False, **kwargs):
+        _ = raw, kwargs
+        self._call()
+        key, sub_key = self._split(key)
+        if sub_key is None:
+            self.data[key] = value
+        else:
+            self.data.setdefault(key, {})[sub_key] = value
+
+    def exists(self, key, raw=False, **kwargs):
+        _ = raw, kwargs
+        self._call()
+        key, sub_key = self._split(key)
+        return key in self.data and (sub_key is None or sub_key in self.data[key])
+
+    def dir_exists(self, key, **kwargs):
+        _ = kwargs
+        self._call()
+        key = key.rstrip('/')
+        return any(existing == key or existing.startswith(key + '/') for existing in self.data)
+
+    def delete(self, key, remove_root=False, raw=False, **kwargs):
+        _ = remove_root, raw, kwargs
+        self._call()
+        key = key.rstrip('/')
+        for existing in list(self.data):
+            if existing == key or existing.startswith(key + '/'):
+                self.data.pop(existing)
+
+    def list(self, key, recursive=False, **kwargs):
+        _ = recursive, kwargs
+        self._call()
+        key = key.rstrip('/') + '/'
+        return sorted(set(existing[len(key):].split('/')[0] for existing in self.data if existing.startswith(key)))
+
+    @staticmethod
+    def get_configuration_path(key):
+        return 'arakoon://config{0}?ini=/opt/OpenvStorage/config/arakoon_cacc.ini'.format(key)
+
+
+class CommandStandIn(object):
+    """
+    Replaces the execution of commands. Answers the commands executed by the ASD manager with plausible output
+    """
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+
+    def run(self, command, *args, **kwargs):
+        _ = args
+        self.calls.increment()
+        if self.latency > 0:
+            time.sleep(self.latency)
+        command_string = command if isinstance(command, basestring) else ' '.join(command)
+        if command_string.startswith('df'):
+            output = '4000787030016 1073741824 3999713288192'
+        else:
+            output = ''
+        if kwargs.get('return_stderr') is True:
+            return output, ''
+        return output
+
+
+class ServiceManagerStandIn(object):
+    """
+    Replaces the service manager. All services exist and are active
+    """
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.services = set()
+
+    def _call(self):
+        self.calls.increment()
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def has_service(self, name, client=None):
+        _ = name, client
+        self._call()
+        return True
+
+    def get_service_status(self, name, client=None):
+        _ = name, client
+        self._call()
+        return 'active'
+
+    def list_services(self, client=None):
+        _ = client
+        self._call()
+        return sorted(self.services)
+
+    def add_service(self, name, client=None, params=None, target_name=None, **kwargs):
+        _ = client, params, kwargs
+        self._call()
+        self.services.add(target_name or name)
+
+    def remove_service(self, name, client=None, **kwargs):
+        _ = client, kwargs
+        self._call()
+        self.services.discard(name)
+
+    def _noop(self, *args, **kwargs):
+        _ = args, kwargs
+        self._call()
+
+    start_service = stop_service = restart_service = send_signal = regenerate_service = _noop
+
+
+class SimulatedNode(object):
+    """
+    Simulated ASD manager node
+    Usage:
+        with SimulatedNode(disk_count=100, asds_per_disk=2, command_latency=0.002, config_latency=0.001) as node:
+            ...
+    """
+    NODE_ID = 'benchmarknode0001'
+    USERNAME = 'root'
+    PASSWORD = 'benchmark'
+
+    def __init__(self, disk_count=12, asds_per_disk=1, command_latency=0.0, config_latency=0.0, ssd_ratio=0.0):
+        self.disk_count = disk_count
+        self.asds_per_disk = asds_per_disk
+        self.ssd_ratio = ssd_ratio
+        self.config_store = ConfigStoreStandIn(latency=config_latency)
+        self.commands = CommandStandIn(latency=command_latency)
+        self.service_manager = ServiceManagerStandIn(latency=command_latency)
+        self.writes = Counter()
+        self.db_folder = None
+        self.disks = []
+        self._originals = []
+
+    def __enter__(self):
+        self.setup()
+        return self
+
+    def __exit__(self, *args):
+        self.teardown()
+
+    def _patch(self, owner, name, value):
+        self._originals.append((owner, name, owner.__dict__.get(name)))
+        setattr(owner, name, value)
+
+    def setup(self):
+        """
+        Install the stand-ins and model the simulated disks and ASDs
+        """
+        self.db_folder = tempfile.mkdtemp(prefix='asd-manager-benchmark-')
+        self._patch(ASDBase, 'DATABASE_FOLDER', self.db_folder)
+        self._patch(BlockQueue, 'SYSFS_ROOT', os.path.join(self.db_folder, 'sys'))
+        self._patch(BlockQueue, 'UDEV_RULES_FILE', os.path.join(self.db_folder, '99-alba-asd-queue.rules'))
+        for method in ['save', 'delete']:
+            self._patch(ASDBase, method, self._write_method(getattr(ASDBase, method)))
+
+        for method in ['get', 'set', 'exists', 'dir_exists', 'delete', 'list', 'get_configuration_path']:
+            self._patch(_Configuration, method, classmethod(self._config_method(method)))
+
+        commands = self.commands
+        self._patch(_SSHClient, 'run', lambda client, command, *args, **kwargs: commands.run(command, *args, **kwargs))
+
+        service_manager = self.service_manager
+        self._patch(ServiceFactory, 'get_manager', classmethod(lambda cls, *args, **kwargs: service_manager))
+        # All controllers and DAL objects share the instances built by shared_instance
+        self._patch(shared_instance, '_instances', {'service_manager': service_manager})
+
+        self._model()
+        self.reset_counters()
+
+    def _config_method(self, method):
+        store = self.config_store
+
+        def _method(cls, *args, **kwargs):
+            _ = cls
+            return getattr(store, method)(*args, **kwargs)
+        return _method
+
+    def _write_method(self, original):
+        writes = self.writes
+
+        def _method(instance, *args, **kwargs):
+            writes.increment()
+            return original(instance, *args, **kwargs)
+        return _method
+
+    def teardown(self):
+        """
+        Remove the stand-ins and the simulated database
+        """
+        for owner, name, original in reversed(self._originals):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._originals = []
+        if self.db_folder is not None:
+            shutil.rmtree(self.db_folder, ignore_errors=True)
+            self.db_folder = None
+
+    def reset_counters(self):
+        """
+        Reset the call counters of all stand-ins
+        """
+        self.config_store.calls.reset()
+        self.commands.calls.reset()
+        self.service_manager.calls.reset()
+        self.writes.reset()
+
+    def get_counters(self):
+        """
+        Retrieve the call counters of all stand-ins
+        :return: Configuration store calls, executed commands, service manager calls and database writes
+        :rtype: dict
+        """
+        return {'config_calls': self.config_store.calls.value,
+                'commands': self.commands.calls.value,
+                'service_calls': self.service_manager.calls.value,
+                'writes': self.writes.value}
+
+    def _model(self):
+        """
+        Model the node settings, the disks and their ASDs
+        """
+        setting = Setting()
+        setting.code = 'node_id'
+        setting.value = self.NODE_ID
+        setting.save()
+        self.config_store.data[ASD_NODE_CONFIG_MAIN_LOCATION.format(self.NODE_ID)] = {'ip': '127.0.0.1',
+                                                                                       'port': 8500,
+                                                                                       'node_id': self.NODE_ID,
+                                                                                       'username': self.USERNAME,
+                                                                                       'password': self.PASSWORD}
+        self.config_store.data[ASD_NODE_CONFIG_NETWORK_LOCATION.format(self.NODE_ID)] = {'ips': [], 'port': 8600}
+
+        port = 8600
+        for index in xrange(self.disk_count):
+            self.disks.append(self.model_disk(index))
+            for _ in xrange(self.asds_per_disk):
+                self.model_asd(self.disks[-1], port)
+                port += 1
+
+    def model_disk(self, index):
+        """
+        Model a prepared disk
+        :param index: Index of the disk, used to generate its name and aliases
+        :type index: int
+        :return: The modeled disk
+        :rtype: source.dal.objects.disk.Disk
+        """
+        alias = '/dev/disk/by-id/wwn-0x5000c500{0:08x}'.format(index)
+        disk = Disk()
+        disk.name = 'sd{0}'.format(self.device_suffix(index))
+        disk.state = 'OK'
+        disk.aliases = [alias]
+        disk.is_ssd = index < self.disk_count * self.ssd_ratio
+        disk.model = 'BENCHMARK-DISK'
+        disk.size = 4000787030016
+        disk.serial = 'SERIAL{0:08d}'.format(index)
+        disk.partitions = [{'aliases': ['{0}-part1'.format(alias)],
+                            'filesystem': 'xfs',
+                            'mountpoint': '/mnt/alba-asd/{0}'.format(''.join(random.choice(string.ascii_letters) for _ in range(16))),
+                            'offset': 2097152,
+                            'size': 4000784932864,
+                            'state': 'OK'}]
+        disk.save()
+        return disk
+
+    def model_asd(self, disk, port):
+        """
+        Model an ASD and its configuration
+        :param disk: Disk of the ASD
+        :type disk: source.dal.objects.disk.Disk
+        :param port: Port of the ASD
+        :type port: int
+        :return: The modeled ASD
+        :rtype: source.dal.objects.asd.ASD
+        """
+        asd_id = ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(32))
+        asd = ASD()
+        asd.disk = disk
+        asd.port = port
+        asd.hosts = ['127.0.0.1']
+        asd.asd_id = asd_id
+        asd.folder = asd_id
+        asd.save()
+        self.config_store.data[asd.config_key] = {'ips': ['127.0.0.1'],
+                                                  'home': '{0}/{1}'.format(disk.mountpoint, asd_id),
+                                                  'port': port,
+                                                  'asd_id': asd_id,
+                                                  'node_id': self.NODE_ID,
+                                                  'capacity': disk.size / max(1, self.asds_per_disk),
+                                                  'multicast': None,
+                                                  'transport': 'tcp',
+                                                  'log_level': 'info'}
+        self.service_manager.services.add(asd.service_name)
+        return asd
+
+    @staticmethod
+    def device_suffix(index):
+        """
+        Generate the device letters of a disk (a, b, ..., z, aa, ab, ...)
+        """
+        suffix = ''
+        index += 1
+        while index > 0:
+            index, remainder = divmod(index - 1, 26)
+            suffix = chr(ord('a') + remainder) + suffix
+        return suffix
@@ -0,0 +1,112 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+GET /slots scale benchmark
+Measures the latency of GET /slots on a simulated node for increasing amounts of disks, together with the amount of commands
+(subprocesses) and configuration management calls each request costs.
+Usage:
+    python benchmarks/slots.py --disks 12,60,200,500 --asds-per-disk 2 --command-latency 2 --config-latency 1
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.simulation import SimulatedNode, percentile
+
+
+def run_scenario(disk_count, asds_per_disk, command_latency, config_latency, requests, warmup):
+    """
+    Measure GET /slots for a single node layout
+    :param disk_count: Amount of disks to simulate
+    :type disk_count: int
+    :param asds_per_disk: Amount of ASDs per disk
+    :type asds_per_disk: int
+    :param command_latency: Latency of every command or service manager call (seconds)
+    :type command_latency: float
+    :param config_latency: Latency of every configuration management call (seconds)
+    :type config_latency: float
+    :param requests: Amount of measured requests
+    :type requests: int
+    :param warmup: Amount of requests executed before measuring
+    :type warmup: int
+    :return: The results of the scenario
+    :rtype: dict
+    """
+    from source.app import app
+
+    with SimulatedNode(disk_count=disk_count, asds_per_disk=asds_per_disk, command_latency=command_latency, config_latency=config_latency) as node:
+        client = app.test_client()
+        headers = {'Authorization': 'Basic {0}'.format(base64.b64encode('{0}:{1}'.format(node.USERNAME, node.PASSWORD)))}
+        durations = []
+        totals = {'config_calls': 0, 'commands': 0, 'service_calls': 0, 'writes': 0}
+        for index in xrange(warmup + requests):
+            node.reset_counters()
+            start = time.time()
+            response = client.get('/slots', headers=headers)
+            duration = time.time() - start
+            if response.status_code != 200:
+                raise RuntimeError('GET /slots returned {0}: {1}'.format(response.status_code, response.data))
+            if index < warmup:
+                continue
+            durations.append(duration)
+            for key, value in node.get_counters().iteritems():
+                totals[key] += value
+        return {'disks': disk_count,
+                'asds': disk_count * asds_per_disk,
+                'p50': percentile(durations, 50),
+                'p99': percentile(durations, 99),
+                'subprocesses_per_request': (totals['commands'] + totals['service_calls']) / float(requests),
+                'config_calls_per_request': totals['config_calls'] / float(requests)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark GET /slots on a simulated node')
+    parser.add_argument('--disks', default='12,60,200,500', help='Comma separated list of disk counts to simulate')
+    parser.add_argument('--asds-per-disk', type=int, default=1, help='Amount of ASDs per disk')
+    parser.add_argument('--command-latency', type=float, default=2.0, help='Latency of every command in milliseconds')
+    parser.add_argument('--config-latency', type=float, default=1.0, help='Latency of every configuration management call in milliseconds')
+    parser.add_argument('--requests', type=int, default=10, help='Amount of measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=1, help='Amount of unmeasured requests per scenario')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    arguments = parser.parse_args()
+
+    results = []
+    for disk_count in [int(count) for count in arguments.disks.split(',')]:
+        results.append(run_scenario(disk_count=disk_count,
+                                    asds_per_disk=arguments.asds_per_disk,
+                                    command_latency=arguments.command_latency / 1000.0,
+                                    config_latency=arguments.config_latency / 1000.0,
+                                    requests=arguments.requests,
+                                    warmup=arguments.warmup))
+    if arguments.json is True:
+        print json.dumps(results, indent=4)
+        return
+    print '{0:>6} {1:>6} {2:>10} {3:>10} {4:>14} {5:>14}'.format('disks', 'asds', 'p50 (ms)', 'p99 (ms)', 'cmds/request', 'config/request')
+    for result in results:
+        print '{0:>6} {1:>6} {2:>10.1f} {3:>10.1f} {4:>14.1f} {5:>14.1f}'.format(result['disks'], result['asds'],
+                                                                                  result['p50'] * 1000, result['p99'] * 1000,
+                                                                                  result['subprocesses_per_request'],
+                                                                                  result['config_calls_per_request'])
+
+
+if __name__ == '__main__':
+    main()
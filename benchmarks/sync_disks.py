@@ -0,0 +1,247 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+DiskController.sync_disks benchmark
+Feeds synthetic or recorded DiskTools.model_devices outputs into DiskController.sync_disks and measures the wall time,
+the database writes and the memory usage of every pass.
+Scenarios:
+    - steady: Every pass reports the same disks
+    - name_switch: Every pass rotates the device names of the disks (sda becomes sdb, ...). Measures DiskController as it is,
+                   including the name comparison of _prepare_for_name_switch
+    - disappearing: Every pass a different part of the disks is no longer reported
+    - partition_churn: Every pass a part of the disks loses or regains its partition
+Usage:
+    python benchmarks/sync_disks.py --disks 100,500 --scenarios steady,name_switch --passes 10
+    python benchmarks/sync_disks.py --dump fixture.json           # Record the output of the current node
+    python benchmarks/sync_disks.py --fixture fixture.json        # Replay a recorded output
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import resource
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.simulation import SimulatedNode, percentile
+
+SCENARIOS = ['steady', 'name_switch', 'disappearing', 'partition_churn']
+
+
+class GenericDiskStandIn(object):
+    """
+    Mimics the disk objects returned by DiskTools.model_devices
+    """
+    def __init__(self, data):
+        partitions = data.pop('partitions', [])
+        self.__dict__.update(data)
+        self.partitions = [GenericPartitionStandIn(partition) for partition in partitions]
+
+    def to_dict(self):
+        data = dict((key, value) for key, value in self.__dict__.iteritems() if key != 'partitions')
+        data['partitions'] = [partition.__dict__ for partition in self.partitions]
+        return data
+
+
+class GenericPartitionStandIn(object):
+    """
+    Mimics the partition objects returned by DiskTools.model_devices
+    """
+    def __init__(self, data):
+        self.__dict__.update(data)
+
+
+class NameAliasMapping(dict):
+    """
+    Mimics the name-alias mapping returned by DiskTools.model_devices
+    """
+    def reverse_mapping(self):
+        reverse = {}
+        for name, aliases in self.iteritems():
+            for alias in aliases:
+                reverse[alias] = name
+        return reverse
+
+
+def build_output(disks):
+    """
+    Build the output of DiskTools.model_devices
+    :param disks: Disks to report, as dicts
+    :type disks: list[dict]
+    :return: The disks and the name-alias mapping
+    :rtype: tuple
+    """
+    mapping = NameAliasMapping()
+    for disk in disks:
+        aliases = list(disk['aliases'])
+        for partition in disk['partitions']:
+            aliases.extend(partition['aliases'])
+        mapping['/dev/{0}'.format(disk['name'])] = aliases
+    return [GenericDiskStandIn(copy.deepcopy(disk)) for disk in disks], mapping
+
+
+def generate_passes(node, scenario, passes, churn):
+    """
+    Generate the model_devices outputs of every pass of a scenario
+    :param node: Simulated node holding the modeled disks
+    :type node: benchmarks.simulation.SimulatedNode
+    :param scenario: Name of the scenario
+    :type scenario: str
+    :param passes: Amount of passes
+    :type passes: int
+    :param churn: Fraction of the disks affected every pass
+    :type churn: float
+    :return: The disks reported in every pass, as dicts
+    :rtype: list[list[dict]]
+    """
+    baseline = [{'name': disk.name,
+                 'state': disk.state,
+                 'aliases': disk.aliases,
+                 'is_ssd': disk.is_ssd,
+                 'model': disk.model,
+                 'size': disk.size,
+                 'serial': disk.serial,
+                 'partitions': disk.partitions} for disk in node.disks]
+    affected_count = int(len(baseline) * churn)
+    generated = []
+    for index in xrange(passes):
+        disks = copy.deepcopy(baseline)
+        if scenario == 'name_switch':
+            names = [disk['name'] for disk in disks]
+            shift = (index + 1) % max(1, len(names))
+            for position, disk in enumerate(disks):
+                disk['name'] = names[(position + shift) % len(names)]
+        elif scenario == 'disappearing':
+            gone = set(random.sample(xrange(len(disks)), affected_count))
+            disks = [disk for position, disk in enumerate(disks) if position not in gone]
+        elif scenario == 'partition_churn':
+            for disk in random.sample(disks, affected_count):
+                disk['partitions'] = []
+        generated.append(disks)
+    return generated
+
+
+def run_passes(node, outputs):
+    """
+    Run DiskController.sync_disks once for every model_devices output
+    :param node: Simulated node
+    :type node: benchmarks.simulation.SimulatedNode
+    :param outputs: The disks to report in every pass, as dicts
+    :type outputs: list[list[dict]]
+    :return: Wall time, database writes and maxrss (KiB) of every pass
+    :rtype: list[dict]
+    """
+    from source.controllers.disk import DiskController, DiskTools
+
+    results = []
+    remaining = list(outputs)
+    original = DiskTools.__dict__['model_devices']
+    DiskTools.model_devices = staticmethod(lambda *args, **kwargs: build_output(remaining.pop(0)))
+    try:
+        for _ in xrange(len(outputs)):
+            node.reset_counters()
+            start = time.time()
+            DiskController.sync_disks()
+            duration = time.time() - start
+            counters = node.get_counters()
+            results.append({'duration': duration,
+                            'writes': counters['writes'],
+                            'commands': counters['commands'],
+                            'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss})
+    finally:
+        DiskTools.model_devices = original
+    return results
+
+
+def summarize(label, disk_count, results):
+    durations = [result['duration'] for result in results]
+    return {'scenario': label,
+            'disks': disk_count,
+            'passes': len(results),
+            'p50': percentile(durations, 50),
+            'max': max(durations),
+            'writes_per_pass': sum(result['writes'] for result in results) / float(len(results)),
+            'commands_per_pass': sum(result['commands'] for result in results) / float(len(results)),
+            'maxrss_growth': results[-1]['maxrss'] - results[0]['maxrss'],
+            'maxrss': results[-1]['maxrss']}
+
+
+def dump(filename):
+    """
+    Record the model_devices output of the current node as a fixture
+    """
+    from ovs_extensions.generic.disk import DiskTools
+
+    disks, _ = DiskTools.model_devices()
+    with open(filename, 'w') as fixture:
+        json.dump([[{'name': disk.name,
+                     'state': disk.state,
+                     'aliases': disk.aliases,
+                     'is_ssd': disk.is_ssd,
+                     'model': disk.model,
+                     'size': disk.size,
+                     'serial': disk.serial,
+                     'partitions': [partition.__dict__ for partition in disk.partitions]} for disk in disks]], fixture, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DiskController.sync_disks')
+    parser.add_argument('--disks', default='100,500', help='Comma separated list of disk counts to simulate')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma separated list of scenarios ({0})'.format(', '.join(SCENARIOS)))
+    parser.add_argument('--passes', type=int, default=10, help='Amount of sync passes per scenario')
+    parser.add_argument('--churn', type=float, default=0.1, help='Fraction of the disks affected every pass')
+    parser.add_argument('--asd-ratio', type=float, default=0.5, help='Fraction of the disks holding an ASD')
+    parser.add_argument('--fixture', help='Replay the passes recorded in this fixture instead of the synthetic scenarios')
+    parser.add_argument('--dump', help='Record the output of DiskTools.model_devices of this node into a fixture and exit')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    arguments = parser.parse_args()
+
+    if arguments.dump is not None:
+        dump(arguments.dump)
+        return
+
+    summaries = []
+    if arguments.fixture is not None:
+        with open(arguments.fixture) as fixture:
+            outputs = json.load(fixture)
+        with SimulatedNode(disk_count=0, asds_per_disk=0) as node:
+            summaries.append(summarize(os.path.basename(arguments.fixture), max(len(output) for output in outputs), run_passes(node, outputs)))
+    else:
+        for disk_count in [int(count) for count in arguments.disks.split(',')]:
+            for scenario in arguments.scenarios.split(','):
+                with SimulatedNode(disk_count=disk_count, asds_per_disk=0) as node:
+                    for disk in node.disks[:int(disk_count * arguments.asd_ratio)]:
+                        node.model_asd(disk, 8600 + node.disks.index(disk))
+                    outputs = generate_passes(node, scenario, arguments.passes, arguments.churn)
+                    summaries.append(summarize(scenario, disk_count, run_passes(node, outputs)))
+
+    if arguments.json is True:
+        print json.dumps(summaries, indent=4)
+        return
+    print '{0:>16} {1:>6} {2:>10} {3:>10} {4:>14} {5:>14} {6:>12}'.format('scenario', 'disks', 'p50 (ms)', 'max (ms)', 'writes/pass', 'cmds/pass', 'rss +KiB')
+    for summary in summaries:
+        print '{0:>16} {1:>6} {2:>10.1f} {3:>10.1f} {4:>14.1f} {5:>14.1f} {6:>12}'.format(summary['scenario'], summary['disks'],
+                                                                                            summary['p50'] * 1000, summary['max'] * 1000,
+                                                                                            summary['writes_per_pass'], summary['commands_per_pass'],
+                                                                                            summary['maxrss_growth'])
+
+
+if __name__ == '__main__':
+    main()
@@ -19,31 +19,54 @@ API views
 """
 
 import json
-from flask import send_from_directory
+import time
+from multiprocessing.pool import ThreadPool
+from flask import Response, g, request, send_from_directory
 from ovs_extensions.api.exceptions import HttpNotAcceptableException, HttpNotFoundException
 from ovs_extensions.dal.base import ObjectNotFoundException
-from ovs_extensions.generic.filemutex import file_mutex
-from ovs_extensions.generic.sshclient import SSHClient
 from source.app import app
 from source.app.decorators import HTTPRequestDecorators
-from source.constants.asd import ASD_NODE_CONFIG_NETWORK_LOCATION
+from source.constants.asd import ASD_NODE_CONFIG_MAIN_LOCATION, ASD_NODE_CONFIG_NETWORK_LOCATION
 from source.controllers.asd import ASDController
 from source.controllers.disk import DiskController
 from source.controllers.generic import GenericController
+from source.controllers.health import HealthController
+from source.controllers.inventory import InventoryController
+from source.controllers.job import JobCancelledException, JobController
 from source.controllers.maintenance import MaintenanceController
+from source.controllers.reaper import ReaperController
+from source.controllers.trim import TrimController
 from source.controllers.update import SDMUpdateController
+from source.dal.lists.asdlist import ASDList
 from source.dal.lists.disklist import DiskList
+from source.dal.lists.joblist import JobList
 from source.dal.lists.settinglist import SettingList
+from source.dal.objects.asd import ASD
 from source.dal.objects.disk import Disk
+from source.tools.baseline import DiskBaseline
+from source.tools.blockqueue import BlockQueue
 from source.tools.configuration import Configuration
+from source.tools.diskstats import DiskStats
+from source.tools.filemutex import file_mutex
+from source.tools.filesystem import FilesystemProfiles
+from source.tools.health import DiskHealth
+from source.tools.lazy import shared_instance
+from source.tools.lockmanager import LockManager
 from source.tools.logger import Logger
+from source.tools.metrics import Metrics
 from source.tools.osfactory import OSFactory
-from source.tools.servicefactory import ServiceFactory
+from source.tools.processstats import ProcessStats
+from source.tools.profiler import Profiler, ProfilerBusyException
+from source.tools.timeseries import TimeSeries, TimeSeriesException
 
 
 class API(object):
     """ ALBA API """
     _logger = Logger('flask')
+    _local_client = shared_instance('local_client')
+    _service_manager = shared_instance('service_manager')
+
+    SLOT_RESTART_MAX_PARALLEL = 4
 
     get = HTTPRequestDecorators.get
     post = HTTPRequestDecorators.post
@@ -120,6 +143,122 @@ class API(object):
         API._logger.info('Uploading file {0}'.format(filename))
         return send_from_directory(directory='/opt/asd-manager/downloads', filename=filename)
 
+    ###########
+    # METRICS #
+    ###########
+    @staticmethod
+    @app.before_request
+    def _start_request_metrics():
+        # type: () -> None
+        """
+        Keep track of the start of the request and of the commands executed while handling it
+        :return: None
+        :rtype: NoneType
+        """
+        g.metrics_start = time.time()
+        Metrics.start_counting_commands()
+        Profiler.start_request()
+
+    @staticmethod
+    @app.after_request
+    def _record_request_metrics(response):
+        # type: (Response) -> Response
+        """
+        Record the duration of the request and the amount of commands executed while handling it
+        :param response: Flask response
+        :type response: Response
+        :return: The unchanged response
+        :rtype: Response
+        """
+        Profiler.stop_request()
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        Metrics.observe('asd_manager_request_duration_seconds', time.time() - g.metrics_start,
+                        method=request.method, route=route, status=str(response.status_code))
+        Metrics.observe('asd_manager_request_subprocesses', Metrics.get_command_count(),
+                        method=request.method, route=route)
+        return response
+
+    @staticmethod
+    @app.route('/metrics')
+    def metrics():
+        # type: () -> Response
+        """
+        Retrieve the metrics of this ASD manager in the Prometheus text format
+        Requires the credentials of this node, unless 'metrics_authentication' is disabled in the main configuration of this node
+        :return: Flask response
+        :rtype: Response
+        """
+        node_id = SettingList.get_setting_by_code(code='node_id').value
+        authenticate = Configuration.get(ASD_NODE_CONFIG_MAIN_LOCATION.format(node_id)).get('metrics_authentication', True)
+        if authenticate is not False and not HTTPRequestDecorators.authorized():
+            return Response('Invalid credentials', status=401, headers={'WWW-Authenticate': 'Basic realm="ASD manager"'})
+        return Response(Metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    #############
+    # PROFILING #
+    #############
+    @staticmethod
+    @get('/debug/threads')
+    @wrap('threads')
+    def debug_threads():
+        # type: () -> dict
+        """
+        Retrieve the current stack of all threads of the ASD manager
+        :return: The stack per thread
+        :rtype: dict
+        """
+        return Profiler.dump_threads()
+
+    @staticmethod
+    @get('/debug/locks')
+    @wrap('locks')
+    def debug_locks():
+        # type: () -> dict
+        """
+        Retrieve the resource locks currently held and the threads waiting for them
+        :return: Per resource the thread holding it, since when and the waiting threads
+        :rtype: dict
+        """
+        return LockManager.get_locks()
+
+    @staticmethod
+    @post('/debug/profile')
+    @provide_request_data
+    @wrap('profile')
+    def debug_profile(request_data):
+        # type: (dict) -> dict
+        """
+        Profile the ASD manager for a number of seconds
+        :param request_data: Data about the request (given by the decorator)
+                             Optionally contains 'seconds' (defaults to 10), 'mode' ('collapsed' (default) to sample the stacks of all threads
+                             or 'pstats' to profile all requests handled meanwhile) and 'interval' (time between two samples, defaults to 0.01)
+                             The interval should be at least 0.001 seconds and at most the duration, which is at most 120 seconds
+        :type request_data: dict
+        :return: The profiling results
+        :rtype: dict
+        """
+        try:
+            seconds = float(request_data.get('seconds', 10))
+            interval = float(request_data.get('interval', 0.01))
+        except (TypeError, ValueError):
+            raise HttpNotAcceptableException(error='invalid_data', error_description='Seconds and interval should be numbers')
+        # The comparisons are False for NaN, so NaN is rejected as well
+        if not Profiler.MIN_INTERVAL <= seconds <= Profiler.MAX_DURATION:
+            raise HttpNotAcceptableException(error='invalid_data',
+                                             error_description='Seconds should be between {0} and {1}'.format(Profiler.MIN_INTERVAL, Profiler.MAX_DURATION))
+        mode = request_data.get('mode', 'collapsed')
+        if mode not in ['collapsed', 'pstats']:
+            raise HttpNotAcceptableException(error='invalid_data', error_description='Mode should be "collapsed" or "pstats"')
+        try:
+            if mode == 'collapsed':
+                if not Profiler.MIN_INTERVAL <= interval <= seconds:
+                    raise HttpNotAcceptableException(error='invalid_data',
+                                                     error_description='Interval should be between {0} and the amount of seconds'.format(Profiler.MIN_INTERVAL))
+                return Profiler.sample(duration=seconds, interval=interval)
+            return Profiler.profile(duration=seconds)
+        except ProfilerBusyException as ex:
+            raise HttpNotAcceptableException(error='profiler_busy', error_description=str(ex))
+
     #################
     # STACK / SLOTS #
     #################
@@ -131,33 +270,339 @@ class API(object):
         # type: () -> dict
         """
         Gets the current stack (slot based)
+        The 'fields' query argument limits the computed fields (see _get_export_fields), eg: 'fields=osds.asd_id' only reads the model
+        'baseline_outlier' compares every slot with all slots of its disk class and is only returned when requested
         :return: Stack information
         :rtype: dict
         """
+        slot_fields, asd_fields = API._get_export_fields()
         stack = {}
-        for disk in DiskList.get_usable_disks():
+        disks = DiskList.get_usable_disks()
+        with_outliers = slot_fields is not None and 'baseline_outlier' in slot_fields
+        outliers = {}
+        if with_outliers is True:
+            outliers = DiskBaseline.get_outliers(disks=disks, slow_factor=DiskBaseline.get_settings()['slow_factor'])
+        for disk in disks:
             slot_id = disk.aliases[0].split('/')[-1]
-            stack[slot_id] = disk.export()
-            stack[slot_id].update({'osds': dict((asd.asd_id, asd.export()) for asd in disk.asds)})
+            stack[slot_id] = disk.export(fields=slot_fields)
+            if slot_fields is None or 'osds' in slot_fields:
+                stack[slot_id]['osds'] = dict((asd.asd_id, asd.export(fields=asd_fields)) for asd in disk.asds)
+            if with_outliers is True:
+                stack[slot_id]['baseline_outlier'] = outliers.get(disk.id, [])
         return stack
 
+    @staticmethod
+    def _get_export_fields():
+        # type: () -> Tuple[Optional[List[str]], Optional[List[str]]]
+        """
+        Parse the 'fields' query argument: a comma separated list of slot fields (see Disk.EXPORT_FIELDS, 'osds' and 'baseline_outlier')
+        and ASD fields prefixed with 'osds.' (see _get_invalid_asd_fields, eg: 'fields=state,osds.asd_id,osds.state')
+        Requesting 'osds' includes all ASD fields, requesting an ASD field implies 'osds'
+        :return: The slot fields and ASD fields to export. None when the argument is not passed: all fields except 'baseline_outlier'
+        :rtype: tuple
+        """
+        fields = API._get_fields_argument()
+        if fields is None:
+            return None, None
+        slot_fields = [field for field in fields if '.' not in field]
+        asd_fields = [field.split('.', 1)[1] for field in fields if field.startswith('osds.')]
+        invalid = [field for field in fields if '.' in field and not field.startswith('osds.')]
+        invalid += [field for field in slot_fields if field not in Disk.EXPORT_FIELDS and field not in ['osds', 'baseline_outlier']]
+        invalid += ['osds.{0}'.format(field) for field in API._get_invalid_asd_fields(asd_fields)]
+        if len(invalid) > 0:
+            raise HttpNotAcceptableException(error='invalid_data',
+                                             error_description='Unknown fields: {0}. Slot fields: {1}, osds, baseline_outlier. ASD fields: osds.<{2}>'.format(
+                                                 ', '.join(invalid), ', '.join(sorted(Disk.EXPORT_FIELDS)), '|'.join(API._get_asd_fields())))
+        if 'osds' in slot_fields:
+            asd_fields = None
+        elif len(asd_fields) > 0:
+            slot_fields.append('osds')
+        return slot_fields, asd_fields
+
+    @staticmethod
+    def _get_fields_argument():
+        # type: () -> Optional[List[str]]
+        """
+        Split the 'fields' query argument
+        :return: The requested fields or None when the argument is not passed
+        :rtype: list
+        """
+        if 'fields' not in request.args:
+            return None
+        return [field.strip() for field in request.args['fields'].split(',') if field.strip() != '']
+
+    @staticmethod
+    def _get_asd_fields():
+        # type: () -> List[str]
+        """
+        Retrieve the fields which can be requested for an ASD: its model fields, state fields and known configuration fields
+        :return: The sorted field names
+        :rtype: list
+        """
+        return sorted(ASD.EXPORT_FIELDS.keys() + ASD.STATE_FIELDS + ASD.CONFIG_FIELDS)
+
+    @staticmethod
+    def _get_invalid_asd_fields(fields):
+        # type: (List[str]) -> List[str]
+        """
+        Retrieve the requested ASD fields which are unknown
+        :param fields: Requested ASD fields
+        :type fields: list
+        :return: The unknown fields
+        :rtype: list
+        """
+        asd_fields = API._get_asd_fields()
+        return [field for field in fields if field not in asd_fields]
+
+    @staticmethod
+    @get('/slots/<slot_id>')
+    @wrap()
+    def get_slot(slot_id):
+        # type: (str) -> dict
+        """
+        Gets the information of a single slot, as returned by GET /slots. Only this slot is probed
+        The 'fields' query argument limits the computed fields (see _get_export_fields).
+        'baseline_outlier' compares the slot with all slots of its disk class and is only returned when requested
+        :param slot_id: Identifier of the slot
+        :type slot_id: str
+        :return: Slot information
+        :rtype: dict
+        """
+        slot_fields, asd_fields = API._get_export_fields()
+        disk = API._get_slot(slot_id)
+        slot = disk.export(fields=slot_fields)
+        if slot_fields is None or 'osds' in slot_fields:
+            slot['osds'] = dict((asd.asd_id, asd.export(fields=asd_fields)) for asd in disk.asds)
+        if slot_fields is not None and 'baseline_outlier' in slot_fields:
+            disks = DiskList.get_usable_disks()
+            outliers = DiskBaseline.get_outliers(disks=disks, slow_factor=DiskBaseline.get_settings()['slow_factor'])
+            slot['baseline_outlier'] = outliers.get(disk.id, [])
+        return slot
+
+    @staticmethod
+    @get('/slots/<slot_id>/asds/<asd_id>')
+    @wrap()
+    def get_slot_asd(slot_id, asd_id):
+        # type: (str, str) -> dict
+        """
+        Gets the information of a single ASD, as returned by GET /slots
+        The 'fields' query argument limits the computed fields to a comma separated list of ASD fields (see _get_asd_fields, eg: 'fields=state,state_detail')
+        :param slot_id: Identifier of the slot
+        :type slot_id: str
+        :param asd_id: Identifier of the ASD
+        :type asd_id: str
+        :return: ASD information
+        :rtype: dict
+        """
+        fields = API._get_fields_argument()
+        if fields is not None:
+            invalid = API._get_invalid_asd_fields(fields)
+            if len(invalid) > 0:
+                raise HttpNotAcceptableException(error='invalid_data',
+                                                 error_description='Unknown fields: {0}. ASD fields: {1}'.format(', '.join(invalid), ', '.join(API._get_asd_fields())))
+        disk = API._get_slot(slot_id)
+        asds = [asd for asd in disk.asds if asd.asd_id == asd_id]
+        if len(asds) != 1:
+            raise HttpNotFoundException(error='asd_not_found',
+                                        error_description='Could not find ASD {0} on Slot {1}'.format(asd_id, slot_id))
+        return asds[0].export(fields=fields)
+
+    @staticmethod
+    def _get_slot(slot_id):
+        # type: (str) -> Disk
+        """
+        Retrieve the disk modeled for a slot
+        :param slot_id: Identifier of the slot
+        :type slot_id: str
+        :return: The disk
+        :rtype: source.dal.objects.disk.Disk
+        """
+        try:
+            return DiskList.get_by_alias(slot_id)
+        except ObjectNotFoundException:
+            raise HttpNotFoundException(error='slot_not_found',
+                                        error_description='Could not find Slot {0}'.format(slot_id))
+
+    @staticmethod
+    @get('/slots/queue')
+    @wrap()
+    def get_slots_queue():
+        # type: () -> dict
+        """
+        Report the block queue settings of the slots in use which deviate from the profile of their disk class
+        :return: Disk class and deviating queue attributes per slot
+        :rtype: dict
+        """
+        profiles = BlockQueue.get_profiles()
+        slots = {}
+        for disk in DiskList.get_usable_disks():
+            if disk.available is True or disk.state == 'MISSING':
+                continue
+            slots[disk.aliases[0].split('/')[-1]] = {'disk_class': disk.disk_class,
+                                                     'drift': BlockQueue.get_drift(disk=disk, profiles=profiles)}
+        return slots
+
+    @staticmethod
+    @get('/slots/trim')
+    @wrap()
+    def get_slots_trim():
+        # type: () -> dict
+        """
+        Report the result of the last scheduled trim of the slots relying on the trim scheduler
+        :return: Start, duration, trimmed bytes, offset to resume at (if interrupted by the end of the trim window) and error of the last trim per slot
+        :rtype: dict
+        """
+        return dict((disk.aliases[0].split('/')[-1], disk.trim_info or {}) for disk in TrimController.get_trimmable_disks())
+
+    @staticmethod
+    @get('/slots/health')
+    @wrap()
+    def get_slots_health():
+        # type: () -> dict
+        """
+        Report the last collected SMART/NVMe health information of all slots. Executes no commands
+        :return: Status, collection time, temperature, reallocated and pending sectors, media errors and wear per slot
+        :rtype: dict
+        """
+        return dict((disk.aliases[0].split('/')[-1], DiskHealth.get(disk)) for disk in DiskList.get_usable_disks())
+
+    @staticmethod
+    @get('/slots/stats')
+    @wrap()
+    def get_slots_stats():
+        # type: () -> dict
+        """
+        Report the sampled I/O statistics of all slots. Served from memory
+        The 'samples' query argument sets the amount of historical samples to include (defaults to 0)
+        :return: Latest IOPS, throughput, latency and utilization per slot and optionally their history
+        :rtype: dict
+        """
+        samples = API._get_samples_argument()
+        stats = {}
+        for disk in DiskList.get_usable_disks():
+            slot_stats = {'latest': DiskStats.get_latest(disk.name)}
+            if samples > 0:
+                slot_stats['history'] = DiskStats.get_history(disk.name, amount=samples)
+            stats[disk.aliases[0].split('/')[-1]] = slot_stats
+        return stats
+
+    @staticmethod
+    def _get_samples_argument():
+        # type: () -> int
+        """
+        Parse the 'samples' query argument
+        :return: The amount of historical samples to include. 0 when not passed
+        :rtype: int
+        """
+        samples = request.args.get('samples', '0')
+        if not samples.isdigit():
+            raise HttpNotAcceptableException(error='invalid_data', error_description='samples should be a non-negative integer')
+        return int(samples)
+
+    @staticmethod
+    @post('/slots/<slot_id>/health')
+    @wrap('health')
+    def slot_health(slot_id):
+        # type: (str) -> dict
+        """
+        Collect the health information of a slot right away
+        :param slot_id: Identifier of the slot
+        :type slot_id: str
+        :return: The health information of the slot
+        :rtype: dict
+        """
+        disk = DiskList.get_by_alias(slot_id)
+        HealthController.collect_disk(disk=disk)
+        return DiskHealth.get(disk)
+
+    @staticmethod
+    @get('/slots/trash')
+    @wrap()
+    def get_slots_trash():
+        # type: () -> dict
+        """
+        Report the data of removed ASDs still waiting to be deleted by the reaper
+        :return: Amount of trashed folders and the bytes and entries deleted so far of the folder being deleted per slot
+        :rtype: dict
+        """
+        return ReaperController.get_pending()
+
+    @staticmethod
+    @post('/slots/<slot_id>/trim')
+    @wrap('trim_info')
+    def slot_trim(slot_id):
+        # type: (str) -> dict
+        """
+        Trim the filesystem of a slot right away, regardless of the trim schedule
+        :param slot_id: Identifier of the slot
+        :type slot_id: str
+        :return: Start, duration, trimmed bytes and error of the trim
+        :rtype: dict
+        """
+        disk = DiskList.get_by_alias(slot_id)
+        if disk.available is True:
+            raise HttpNotAcceptableException(error='disk_not_configured', error_description='Disk not yet configured')
+        try:
+            return TrimController.trim(disk=disk)
+        except RuntimeError as ex:
+            raise HttpNotAcceptableException(error='trim_not_possible', error_description=str(ex))
+
     @staticmethod
     @post('/slots/<slot_id>/asds')
-    def asd_add(slot_id):
-        # type: (str) -> None
+    @provide_request_data
+    def asd_add(slot_id, request_data):
+        # type: (str, dict) -> Union[dict, None]
         """
         Add an ASD to the slot specified
         :param slot_id: Identifier of the slot
         :type slot_id: str
+        :param request_data: Data about the request (given by the decorator)
+                             Optionally contains 'filesystem_profile' to format the slot with, when it has not been prepared yet
+                             Optionally contains 'baseline' to measure a performance baseline before formatting the slot
+                             Optionally contains 'asynchronous' to execute the request as a job
+        :type request_data: dict
+        :return: The identifier of the job when executed asynchronously
+        :rtype: dict
+        """
+        disk = DiskList.get_by_alias(slot_id)
+        filesystem_profile = request_data.get('filesystem_profile') or None
+        baseline = str(request_data['baseline']).lower() == 'true' if 'baseline' in request_data else None
+        if disk.available is True:
+            try:
+                FilesystemProfiles.resolve(disk=disk, name=filesystem_profile)
+            except ValueError as ex:
+                raise HttpNotAcceptableException(error='invalid_data', error_description=str(ex))
+        if API._is_asynchronous(request_data) is True:
+            job = JobController.submit(name='asd_add',
+                                       function=API._add_asd,
+                                       arguments={'slot_id': slot_id, 'filesystem_profile': filesystem_profile, 'baseline': baseline})
+            return {'job_id': job.id}
+        API._add_asd(slot_id=slot_id, filesystem_profile=filesystem_profile, baseline=baseline)
+
+    @staticmethod
+    def _add_asd(slot_id, filesystem_profile, baseline=None):
+        # type: (str, str, Optional[bool]) -> None
+        """
+        Prepare the slot when needed and add an ASD to it
+        :param slot_id: Identifier of the slot
+        :type slot_id: str
+        :param filesystem_profile: Name of the filesystem profile to format the slot with
+        :type filesystem_profile: str
+        :param baseline: Measure a performance baseline before formatting the slot. Defaults to the baseline setting of this node
+        :type baseline: bool
         :return: None
         :rtype: NoneType
         """
         disk = DiskList.get_by_alias(slot_id)
-        if disk.available is True:
-            with file_mutex('add_disk'), file_mutex('disk_{0}'.format(slot_id)):
-                DiskController.prepare_disk(disk=disk)
+        with LockManager.locked(LockManager.get_slot_resource(disk)):
+            disk = Disk(disk.id)
+            if disk.available is True:
+                JobController.report_progress('Preparing slot {0}'.format(slot_id))
+                # Preparing edits node wide state (fstab) and ends with a disk sync, so only one slot is prepared at a time
+                with LockManager.locked('add_disk'):
+                    DiskController.prepare_disk(disk=disk, filesystem_profile=filesystem_profile, baseline=baseline)
                 disk = Disk(disk.id)
-        with file_mutex('add_asd'):
+            JobController.report_progress('Creating ASD on slot {0}'.format(slot_id))
             ASDController.create_asd(disk)
 
     @staticmethod
@@ -180,7 +625,8 @@ class API(object):
         if len(asds) != 1:
             raise HttpNotFoundException(error='asd_not_found',
                                         error_description='Could not find ASD {0} on Slot {1}'.format(asd_id, slot_id))
-        ASDController.remove_asd(asds[0])
+        with LockManager.locked('asd:{0}'.format(asd_id)):
+            ASDController.remove_asd(asds[0])
 
     @staticmethod
     @post('/slots/<slot_id>/asds/<asd_id>/restart')
@@ -200,7 +646,8 @@ class API(object):
         if len(asds) != 1:
             raise HttpNotFoundException(error='asd_not_found',
                                         error_description='Could not find ASD {0} on Slot {1}'.format(asd_id, slot_id))
-        ASDController.restart_asd(asds[0])
+        with LockManager.locked('asd:{0}'.format(asd_id)):
+            ASDController.restart_asd(asds[0])
 
     @staticmethod
     @post('/slots/<slot_id>/asds/<asd_id>/update')
@@ -223,7 +670,8 @@ class API(object):
         if len(asds) != 1:
             raise HttpNotFoundException(error='asd_not_found',
                                         error_description='Could not find ASD {0} on Slot {1}'.format(asd_id, slot_id))
-        ASDController.update_asd(asd=asds[0], update_data=request_data['update_data'])
+        with LockManager.locked('asd:{0}'.format(asd_id)):
+            ASDController.update_asd(asd=asds[0], update_data=request_data['update_data'])
 
     @staticmethod
     @post('/slots/<slot_id>/restart')
@@ -236,24 +684,134 @@ class API(object):
        :return: None
        """
         disk = DiskList.get_by_alias(slot_id)
-        with file_mutex('slot_{0}'.format(slot_id)):
+        API._restart_slot(slot_id=slot_id, disk=disk)
+
+    @staticmethod
+    @post('/slots/restart')
+    @provide_request_data
+    @wrap('slots')
+    def slots_restart(request_data):
+        # type: (dict) -> dict
+        """
+        Restart all slots on this node. Slots are processed concurrently
+        :param request_data: Data about the request (given by the decorator)
+                             Optionally contains 'slot_ids' (JSON list) to restrict the slots to restart
+                             and 'max_parallel' to limit the amount of slots restarted simultaneously
+        :type request_data: dict
+        :return: The result of the restart per slot
+        :rtype: dict
+        """
+        max_parallel = int(request_data.get('max_parallel', API.SLOT_RESTART_MAX_PARALLEL))
+        if max_parallel < 1:
+            raise HttpNotAcceptableException(error='invalid_data', error_description='max_parallel should be at least 1')
+        slot_ids = request_data.get('slot_ids')
+        if slot_ids is not None:
+            slot_ids = json.loads(slot_ids)
+
+        slots = {}
+        for disk in DiskList.get_usable_disks():
+            if disk.available is True:
+                continue
+            slot_id = disk.aliases[0].split('/')[-1]
+            if slot_ids is None or slot_id in slot_ids:
+                slots[slot_id] = disk
+
+        def _restart(slot_info):
+            _slot_id, _disk = slot_info
+            try:
+                API._restart_slot(slot_id=_slot_id, disk=_disk)
+                return _slot_id, {'success': True}
+            except Exception as ex:
+                API._logger.exception('Restarting slot {0} failed'.format(_slot_id))
+                return _slot_id, {'success': False, 'error': str(ex)}
+
+        if len(slots) == 0:
+            return {}
+        pool = ThreadPool(processes=min(max_parallel, len(slots)))
+        try:
+            return dict(pool.map(_restart, slots.items()))
+        finally:
+            pool.close()
+            pool.join()
+
+    @staticmethod
+    def _restart_slot(slot_id, disk):
+        # type: (str, Disk) -> None
+        """
+        Stop all ASDs on a slot, remount the slot and start the ASDs again
+        :param slot_id: Identifier of the slot
+        :type slot_id: str
+        :param disk: Disk modeled for the slot
+        :type disk: source.dal.objects.disk.Disk
+        :return: None
+        :rtype: NoneType
+        """
+        with LockManager.locked(LockManager.get_slot_resource(disk)):
             API._logger.info('Got lock for restarting slot {0}'.format(slot_id))
-            for asd in disk.asds:
-                ASDController.stop_asd(asd=asd)
+            asds = list(disk.asds)
+            ASDController.stop_asds(asds=asds)
             DiskController.remount_disk(disk=disk)
-            for asd in disk.asds:
-                ASDController.start_asd(asd=asd)
+            ASDController.start_asds(asds=asds)
+
+    @staticmethod
+    @post('/slots/locate')
+    @provide_request_data
+    @wrap('slots')
+    def slots_locate(request_data):
+        # type: (dict) -> dict
+        """
+        Start or stop locating slots on their disk controller, in a single batch
+        :param request_data: Data about the request (given by the decorator)
+                             Contains 'slot_ids' (a JSON list) and optionally 'start' (True (default) to start locating, False to stop)
+        :type request_data: dict
+        :return: Per slot whether it was found on a disk controller
+        :rtype: dict
+        """
+        if 'slot_ids' not in request_data:
+            raise HttpNotAcceptableException(error='invalid_data', error_description='slot_ids is required')
+        slot_ids = json.loads(request_data['slot_ids'])
+        start = str(request_data.get('start', True)).lower() == 'true'
+        aliases = {}
+        for disk in DiskList.get_usable_disks():
+            slot_id = disk.aliases[0].split('/')[-1]
+            if slot_id in slot_ids:
+                # Prefer an alias which the inventory can map onto a drive (eg: the WWN alias)
+                alias = next((alias for alias in disk.aliases if InventoryController.get_location(alias) is not None), disk.aliases[0])
+                aliases[alias] = slot_id
+        located = InventoryController.locate(aliases=aliases.keys(), start=start)
+        return dict((slot_id, located.get(alias, False)) for alias, slot_id in aliases.iteritems())
+
+    @staticmethod
+    @post('/slots/pin')
+    @provide_request_data
+    @wrap('asds')
+    def slots_pin(request_data):
+        # type: (dict) -> dict
+        """
+        Re-calculate the CPU and NUMA placement of all ASDs on this node
+        :param request_data: Data about the request (given by the decorator)
+                             Optionally contains 'restart' to restart the ASDs of which the placement changed
+        :type request_data: dict
+        :return: The placement per ASD
+        :rtype: dict
+        """
+        restart = str(request_data.get('restart', False)).lower() == 'true'
+        return ASDController.pin_asds(restart=restart)
 
     @staticmethod
     @delete('/slots/<slot_id>')
-    def clear_slot(slot_id):
-        # type: (str) -> None
+    @provide_request_data
+    def clear_slot(slot_id, request_data):
+        # type: (str, dict) -> Union[dict, None]
         """
         Clears a slot
         :param slot_id: Identifier of the slot
         :type slot_id: str
-        :return: None
-        :rtype: NoneType
+        :param request_data: Data about the request (given by the decorator)
+                             Optionally contains 'asynchronous' to execute the request as a job
+        :type request_data: dict
+        :return: The identifier of the job when executed asynchronously
+        :rtype: dict
         """
         try:
             disk = DiskList.get_by_alias(slot_id)
@@ -264,16 +822,41 @@ class API(object):
         if disk.available is True:
             raise HttpNotAcceptableException(error='disk_not_configured', error_description='Disk not yet configured')
 
-        with file_mutex('disk_{0}'.format(slot_id)):
+        if API._is_asynchronous(request_data) is True:
+            job = JobController.submit(name='clear_slot', function=API._clear_slot, arguments={'slot_id': slot_id})
+            return {'job_id': job.id}
+        API._clear_slot(slot_id=slot_id)
+
+    @staticmethod
+    def _clear_slot(slot_id):
+        # type: (str) -> None
+        """
+        Remove all ASDs of a slot and clean it
+        :param slot_id: Identifier of the slot
+        :type slot_id: str
+        :return: None
+        :rtype: NoneType
+        """
+        disk = DiskList.get_by_alias(slot_id)
+        with LockManager.locked(LockManager.get_slot_resource(disk)):
+            # The whole disk gets wiped, so the (possibly millions of) files of the ASDs are not deleted one by one
+            JobController.report_progress('Stopping the ASDs on slot {0}'.format(slot_id))
+            try:
+                ASDController.stop_asds(asds=list(disk.asds))
+            except Exception:
+                API._logger.exception('Slot {0} - Failed to stop all ASDs'.format(slot_id))
             last_exception = None
             for asd in disk.asds:
                 try:
-                    ASDController.remove_asd(asd=asd)
+                    JobController.report_progress('Removing ASD {0}'.format(asd.asd_id))
+                    with LockManager.locked('asd:{0}'.format(asd.asd_id)):
+                        ASDController.remove_asd(asd=asd, delete_data=False)
                 except Exception as ex:
                     last_exception = ex
             disk = Disk(disk.id)
             if len(disk.asds) == 0:
-                DiskController.clean_disk(disk=disk)
+                JobController.report_progress('Wiping slot {0}'.format(slot_id))
+                DiskController.clean_disk(disk=disk, wipe=True)
             elif last_exception is not None:
                 raise last_exception
             else:
@@ -329,6 +912,26 @@ class API(object):
         """ Obsolete """
         return {'services': []}
 
+    @staticmethod
+    @get('/asds/stats')
+    @wrap()
+    def get_asds_stats():
+        # type: () -> dict
+        """
+        Report the sampled resource usage of all ASD processes. Served from memory
+        The 'samples' query argument sets the amount of historical samples to include (defaults to 0)
+        :return: Latest memory, CPU, file descriptor and I/O usage and warnings per ASD and optionally their history
+        :rtype: dict
+        """
+        samples = API._get_samples_argument()
+        stats = {}
+        for asd in ASDList.get_asds():
+            asd_stats = {'latest': ProcessStats.get_latest(asd.asd_id)}
+            if samples > 0:
+                asd_stats['history'] = ProcessStats.get_history(asd.asd_id, amount=samples)
+            stats[asd.asd_id] = asd_stats
+        return stats
+
     @staticmethod
     @get('/disks/<disk_id>/asds')
     def list_asds_disk(disk_id):
@@ -409,7 +1012,26 @@ class API(object):
 
     @staticmethod
     @post('/update/install/<package_name>')
-    def update(package_name):
+    @provide_request_data
+    def update(package_name, request_data):
+        # type: (str, dict) -> Union[dict, None]
+        """
+        Install the specified package
+        :param package_name: Name of the package to update
+        :type package_name: str
+        :param request_data: Data about the request (given by the decorator)
+                             Optionally contains 'asynchronous' to execute the request as a job
+        :type request_data: dict
+        :return: The identifier of the job when executed asynchronously
+        :rtype: dict
+        """
+        if API._is_asynchronous(request_data) is True:
+            job = JobController.submit(name='update', function=API._update, arguments={'package_name': package_name})
+            return {'job_id': job.id}
+        API._update(package_name=package_name)
+
+    @staticmethod
+    def _update(package_name):
         # type: (str) -> None
         """
         Install the specified package
@@ -497,13 +1119,126 @@ class API(object):
         :return: Status of the service
         :rtype: dict
         """
-        client = SSHClient(endpoint='127.0.0.1', username='root')
-        service_manager = ServiceFactory.get_manager()
-        if service_manager.has_service(name=name, client=client):
-            status = service_manager.get_service_status(name=name, client=client)
+        if API._service_manager.has_service(name=name, client=API._local_client):
+            status = API._service_manager.get_service_status(name=name, client=API._local_client)
             return status == 'active', status
         return None
 
+    ########
+    # JOBS #
+    ########
+
+    @staticmethod
+    def _is_asynchronous(request_data):
+        # type: (dict) -> bool
+        """
+        Verify whether the request asks to be executed as a job
+        :param request_data: Data about the request
+        :type request_data: dict
+        :return: True if the request should be executed as a job
+        :rtype: bool
+        """
+        return str(request_data.get('asynchronous', False)).lower() == 'true'
+
+    @staticmethod
+    def _get_job(job_id):
+        # type: (str) -> Job
+        """
+        Retrieve a job or raise a not found error
+        :param job_id: Identifier of the job
+        :type job_id: str
+        :return: The job
+        :rtype: source.dal.objects.job.Job
+        """
+        try:
+            return JobController.get_job(int(job_id))
+        except (ValueError, ObjectNotFoundException):
+            raise HttpNotFoundException(error='job_not_found',
+                                        error_description='Could not find job {0}'.format(job_id))
+
+    @staticmethod
+    @get('/jobs')
+    @wrap('jobs')
+    def list_jobs():
+        # type: () -> List[dict]
+        """
+        List all jobs
+        :return: All jobs, oldest first
+        :rtype: list
+        """
+        return [job.export() for job in JobList.get_jobs()]
+
+    @staticmethod
+    @get('/jobs/<job_id>')
+    @wrap('job')
+    def get_job(job_id):
+        # type: (str) -> dict
+        """
+        Retrieve the status, progress and result of a job
+        :param job_id: Identifier of the job
+        :type job_id: str
+        :return: The job information
+        :rtype: dict
+        """
+        return API._get_job(job_id).export()
+
+    @staticmethod
+    @delete('/jobs/<job_id>')
+    @wrap('job')
+    def cancel_job(job_id):
+        # type: (str) -> dict
+        """
+        Cancel a queued job
+        :param job_id: Identifier of the job
+        :type job_id: str
+        :return: The job information
+        :rtype: dict
+        """
+        job = API._get_job(job_id)
+        try:
+            return JobController.cancel(job.id).export()
+        except JobCancelledException as ex:
+            raise HttpNotAcceptableException(error='job_not_cancellable', error_description=str(ex))
+
+    ###############
+    # TIME SERIES #
+    ###############
+
+    @staticmethod
+    @get('/timeseries')
+    @wrap('series')
+    def list_timeseries():
+        # type: () -> List[str]
+        """
+        List the recorded time series
+        :return: The names of all time series (eg: slots/<slot_id>/read_iops, asds/<asd_id>/rss)
+        :rtype: list
+        """
+        return TimeSeries.list_series()
+
+    @staticmethod
+    @get('/timeseries/<path:series>')
+    @wrap()
+    def get_timeseries(series):
+        # type: (str) -> dict
+        """
+        Retrieve the values of a time series within a range
+        The 'start' and 'end' query arguments set the range (epoch seconds, defaults to the last hour),
+        the 'resolution' query argument sets the minimal resolution in seconds (defaults to the finest resolution covering the range)
+        :param series: Name of the series
+        :type series: str
+        :return: The resolution used and the [timestamp, average] points of the series
+        :rtype: dict
+        """
+        try:
+            arguments = dict((key, float(request.args[key])) for key in ['start', 'end', 'resolution'] if key in request.args)
+        except ValueError:
+            raise HttpNotAcceptableException(error='invalid_data', error_description='start, end and resolution should be numbers')
+        try:
+            return TimeSeries.query(series=series, **arguments)
+        except TimeSeriesException as ex:
+            raise HttpNotFoundException(error='series_not_found', error_description=str(ex))
+
     ########################
     # MAINTENANCE SERVICES #
     ########################
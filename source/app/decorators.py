@@ -19,20 +19,24 @@ API decorators
 """
 
 import json
-from flask import request
+import time
+from functools import wraps
+from flask import Response, request
 from ovs_extensions.api.decorators.flask_requests import HTTPRequestFlaskDecorators
 from ovs_extensions.api.decorators.generic_requests import HTTPRequestGenericDecorators
+from ovs_extensions.api.exceptions import HttpException
 from source.app import app
-from source.asdmanager import BOOTSTRAP_FILE
-from source.constants.asd import ASD_NODE_CONFIG_MAIN_LOCATION
+from source.constants.asd import ASD_NODE_CONFIG_MAIN_LOCATION, BOOTSTRAP_FILE
 from source.dal.lists.settinglist import SettingList
 from source.tools.configuration import Configuration
 from source.tools.logger import Logger
+from source.tools.serialization import Serialization
 
 
 class HTTPRequestDecorators(HTTPRequestFlaskDecorators, HTTPRequestGenericDecorators):
     """
     Class with decorator functionality for HTTP requests
+    The responses are encoded using the pluggable encoder of Serialization and compressed when the client accepts it
     """
     app = app
     logger = Logger('flask')
@@ -60,3 +64,100 @@ class HTTPRequestDecorators(HTTPRequestFlaskDecorators, HTTPRequestGenericDecora
         password = node_config['password']
         auth = request.authorization
         return auth and auth.username == username and auth.password == password
+
+    @classmethod
+    def get(cls, route, authenticate=True):
+        """
+        GET decorator
+        :param route: Route of the call
+        :type route: str
+        :param authenticate: Require the credentials of this node
+        :type authenticate: bool
+        """
+        return cls._build_function(route=route, method='GET', authenticate=authenticate)
+
+    @classmethod
+    def post(cls, route, authenticate=True):
+        """
+        POST decorator
+        :param route: Route of the call
+        :type route: str
+        :param authenticate: Require the credentials of this node
+        :type authenticate: bool
+        """
+        return cls._build_function(route=route, method='POST', authenticate=authenticate)
+
+    @classmethod
+    def delete(cls, route, authenticate=True):
+        """
+        DELETE decorator
+        :param route: Route of the call
+        :type route: str
+        :param authenticate: Require the credentials of this node
+        :type authenticate: bool
+        """
+        return cls._build_function(route=route, method='DELETE', authenticate=authenticate)
+
+    @classmethod
+    def _build_function(cls, route, method, authenticate):
+        """
+        Build the decorator registering a call on the Flask app
+        :param route: Route of the call
+        :type route: str
+        :param method: HTTP method of the call
+        :type method: str
+        :param authenticate: Require the credentials of this node
+        :type authenticate: bool
+        """
+        def wrapper(f):
+            @wraps(f)
+            def new_function(*args, **kwargs):
+                start = time.time()
+                if authenticate is True and not cls.authorized():
+                    data, status = {'_success': False,
+                                    '_error': 'Invalid credentials'}, 401
+                else:
+                    try:
+                        data = f(*args, **kwargs)
+                        if data is None:
+                            data = {}
+                        data.update({'_success': True,
+                                     '_error': ''})
+                        status = 200
+                    except HttpException as ex:
+                        data = {'_success': False,
+                                '_error': ex.error_description,
+                                'error': ex.error,
+                                'error_description': ex.error_description}
+                        status = ex.status_code
+                    except Exception as ex:
+                        cls.logger.exception('Error processing {0} {1}'.format(method, request.path))
+                        data, status = {'_success': False,
+                                        '_error': str(ex)}, 500
+                data.update({'_version': cls.version,
+                             '_duration': time.time() - start})
+                return cls._build_response(data=data, status=status)
+            cls.app.add_url_rule(route, endpoint='{0} {1}'.format(method, route), view_func=new_function, methods=[method])
+            return new_function
+        return wrapper
+
+    @classmethod
+    def _build_response(cls, data, status):
+        """
+        Encode the data and compress it when it is large enough and the client accepts a supported encoding
+        :param data: Data to return
+        :type data: dict
+        :param status: HTTP status code
+        :type status: int
+        :return: Flask response
+        :rtype: Response
+        """
+        payload = Serialization.encode(data)
+        response = Response(payload, content_type='application/json', status=status)
+        response.vary.add('Accept-Encoding')
+        if len(payload) >= Serialization.COMPRESSION_MIN_SIZE:
+            encoding = Serialization.negotiate_encoding(request.headers.get('Accept-Encoding'))
+            if encoding is not None:
+                response.set_data(Serialization.compress(payload, encoding))
+                response.headers['Content-Encoding'] = encoding
+        return response
@@ -21,6 +21,7 @@ Module for ASD Manager SetupController
 """
 import os
 import sys
+import atexit
 import copy
 import json
 import time
@@ -28,23 +29,19 @@ import logging
 from threading import Thread
 from ovs_extensions.constants.config import CACC_LOCATION
 from ovs_extensions.generic.interactive import Interactive
-from ovs_extensions.generic.sshclient import SSHClient
 from ovs_extensions.generic.toolbox import ExtensionsToolbox
 from source.dal.lists.asdlist import ASDList
 from source.dal.lists.disklist import DiskList
 from source.dal.lists.settinglist import SettingList
 from source.dal.objects.setting import Setting
-from source.constants.asd import ASD_NODE_CONFIG_MAIN_LOCATION, CONFIG_STORE_LOCATION
-from source.controllers.asd import ASDController
-from source.controllers.disk import DiskController
-from source.controllers.maintenance import MaintenanceController
+from source.constants.asd import ASD_NODE_CONFIG_MAIN_LOCATION, BOOTSTRAP_FILE, CONFIG_STORE_LOCATION
 from source.tools.configuration import Configuration
 from source.tools.logger import Logger
 from source.tools.osfactory import OSFactory
 from source.tools.servicefactory import ServiceFactory
+from source.tools.sshclient import SSHClient
 
 PRECONFIG_FILE = '/opt/asd-manager/config/preconfig.json'
-BOOTSTRAP_FILE = '/opt/asd-manager/config/bootstrap.json'
 MANAGER_SERVICE = 'asd-manager'
 WATCHER_SERVICE = 'asd-watcher'
 
@@ -191,6 +188,10 @@ def remove(silent=None):
     :rtype: NoneType
     """
     _print_and_log(message='\n' + Interactive.boxed_message(['ASD Manager removal']))
+    # The controllers are only imported when needed, keeping the other commands and the API startup fast
+    from source.controllers.asd import ASDController
+    from source.controllers.disk import DiskController
+    from source.controllers.maintenance import MaintenanceController
 
     local_client = SSHClient(endpoint='127.0.0.1', username='root')
     if not local_client.file_exists(filename='{0}/main.db'.format(Setting.DATABASE_FOLDER)):
@@ -236,8 +237,8 @@ def remove(silent=None):
                 _print_and_log(message='    - Retrieving ASD information for disk {0}'.format(disk.name))
                 for asd in disk.asds:
                     _print_and_log(message='      - Removing ASD {0}'.format(asd.name))
-                    ASDController.remove_asd(asd)
-                DiskController.clean_disk(disk)
+                    ASDController.remove_asd(asd, delete_data=False)
+                DiskController.clean_disk(disk, wipe=True)
             except Exception:
                 _print_and_log(level='exception',
                                message='    - Deleting ASDs failed')
@@ -356,6 +357,10 @@ if __name__ == '__main__':
         raise RuntimeError('IP and/or port not available in configuration for ALBA node {0}'.format(node_id))
 
     from source.app import app
+    from source.controllers.job import JobController
+
+    # Jobs do not survive a restart
+    JobController.recover()
 
     @app.before_first_request
     def setup_logging():
@@ -372,6 +377,36 @@ if __name__ == '__main__':
     thread = Thread(target=_sync_disks, name='sync_disks')
     thread.start()
 
+    from source.controllers.trim import TrimController
+    trim_thread = Thread(target=TrimController.run, name='trim_scheduler')
+    trim_thread.start()
+
+    from source.controllers.reaper import ReaperController
+    reaper_thread = Thread(target=ReaperController.run, name='reaper')
+    reaper_thread.start()
+
+    from source.controllers.health import HealthController
+    health_thread = Thread(target=HealthController.run, name='health_collector')
+    health_thread.start()
+
+    from source.controllers.inventory import InventoryController
+    inventory_thread = Thread(target=InventoryController.run, name='controller_inventory')
+    inventory_thread.start()
+
+    from source.controllers.iostats import IOStatsController
+    iostats_thread = Thread(target=IOStatsController.run, name='diskstats_sampler')
+    iostats_thread.start()
+
+    from source.controllers.processstats import ProcessStatsController
+    processstats_thread = Thread(target=ProcessStatsController.run, name='process_stats_sampler')
+    processstats_thread.start()
+
+    from source.controllers.timeseries import TimeSeriesController
+    from source.tools.timeseries import TimeSeries
+    atexit.register(TimeSeries.close)
+    timeseries_thread = Thread(target=TimeSeriesController.run, name='timeseries_recorder')
+    timeseries_thread.start()
+
     app.debug = False
     app.run(host=asd_manager_config['ip'],
             port=asd_manager_config['port'],
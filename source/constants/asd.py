@@ -20,8 +20,16 @@ Constants involved in config management
 CACC_LOCATION_OLD = '/opt/asd-manager/config/arakoon_cacc.ini'  # Used for post-update.py
 ASD_NODE_LOCATION = '/ovs/alba/asdnodes/{0}'
 CONFIG_STORE_LOCATION = '/opt/asd-manager/config/framework.json'
+BOOTSTRAP_FILE = '/opt/asd-manager/config/bootstrap.json'
 ASD_NODE_CONFIG_LOCATION = '{0}/config'.format(ASD_NODE_LOCATION)                   #/ovs/alba/asdnodes/{0}/config
 ASD_NODE_CONFIG_MAIN_LOCATION = '{0}/config/main'.format(ASD_NODE_LOCATION)         #/ovs/alba/asdnodes/{0}/config/main
 ASD_NODE_CONFIG_MAIN_LOCATION_S3 = '{0}/config/main|s3'.format(ASD_NODE_LOCATION)   #/ovs/alba/asdnodes/{0}/config/main|s3
 ASD_NODE_CONFIG_IPMI_LOCATION = '{0}/config/ipmi'.format(ASD_NODE_LOCATION)         #/ovs/alba/asdnodes/{0}/config/ipmi|ipmi
-ASD_NODE_CONFIG_NETWORK_LOCATION = '{0}/config/network'.format(ASD_NODE_LOCATION)   #/ovs/alba/asdnodes/{0}/config/network
\ No newline at end of file
+ASD_NODE_CONFIG_NETWORK_LOCATION = '{0}/config/network'.format(ASD_NODE_LOCATION)   #/ovs/alba/asdnodes/{0}/config/network
+ASD_NODE_CONFIG_TUNING_LOCATION = '{0}/config/tuning'.format(ASD_NODE_LOCATION)     #/ovs/alba/asdnodes/{0}/config/tuning
+ASD_NODE_CONFIG_BLOCK_QUEUE_LOCATION = '{0}/config/block_queue'.format(ASD_NODE_LOCATION)   #/ovs/alba/asdnodes/{0}/config/block_queue
+ASD_NODE_CONFIG_FILESYSTEM_LOCATION = '{0}/config/filesystem'.format(ASD_NODE_LOCATION)     #/ovs/alba/asdnodes/{0}/config/filesystem
+ASD_NODE_CONFIG_TRIM_LOCATION = '{0}/config/trim'.format(ASD_NODE_LOCATION)     #/ovs/alba/asdnodes/{0}/config/trim
+ASD_NODE_CONFIG_REAPER_LOCATION = '{0}/config/reaper'.format(ASD_NODE_LOCATION) #/ovs/alba/asdnodes/{0}/config/reaper
+ASD_NODE_CONFIG_HEALTH_LOCATION = '{0}/config/health'.format(ASD_NODE_LOCATION) #/ovs/alba/asdnodes/{0}/config/health
+ASD_NODE_CONFIG_BASELINE_LOCATION = '{0}/config/baseline'.format(ASD_NODE_LOCATION) #/ovs/alba/asdnodes/{0}/config/baseline
@@ -22,13 +22,19 @@ import math
 import random
 import signal
 import string
-from ovs_extensions.generic.sshclient import SSHClient
+from multiprocessing.pool import ThreadPool
+from ovs_extensions.services.interfaces.systemd import Systemd
 from source.constants.asd import ASD_NODE_CONFIG_NETWORK_LOCATION, ASD_NODE_CONFIG_LOCATION
+from source.controllers.reaper import ReaperController
+from source.controllers.tuning import TuningController
 from source.dal.lists.asdlist import ASDList
 from source.dal.lists.settinglist import SettingList
 from source.dal.objects.asd import ASD
 from source.tools.configuration import Configuration
+from source.tools.lazy import shared_instance
+from source.tools.lockmanager import LockManager
 from source.tools.logger import Logger
+from source.tools.numa import NUMATools
 from source.tools.osfactory import OSFactory
 from source.tools.packagefactory import PackageFactory
 from source.tools.servicefactory import ServiceFactory
@@ -40,21 +46,8 @@ class ASDController(object):
     """
     ASD_PREFIX = 'alba-asd'
     _logger = Logger('controllers')
-    _local_client = SSHClient(endpoint='127.0.0.1', username='root')
-    _service_manager = ServiceFactory.get_manager()
-
-    @staticmethod
-    def calculate_rocksdb_cache_size(is_ssd):
-        """
-        Calculate the cache size for the RocksDB
-        :param disk: disk on which the asd is running
-        :type disk: source.dal.objects.disk.Disk
-        :return: None or int
-        """
-        if is_ssd:  # No cache size is required to be specified for ASDs
-            return None
-        else:
-            return 128 * 1024 * 1024  # 128 MiB
+    _local_client = shared_instance('local_client')
+    _service_manager = shared_instance('service_manager')
 
     @staticmethod
     def create_asd(disk):
@@ -87,72 +80,75 @@ class ASDController(object):
             if asd.has_config:
                 config = Configuration.get(asd.config_key)
                 config['capacity'] = asd_size
-                cache_size = ASDController.calculate_rocksdb_cache_size(is_ssd=disk.is_ssd)
-                if cache_size:
-                    config.update({'rocksdb_block_cache_size': cache_size})
                 Configuration.set(asd.config_key, config)
                 try:
                     ASDController._service_manager.send_signal(asd.service_name, signal.SIGUSR1, ASDController._local_client)
                 except Exception as ex:
                     ASDController._logger.info('Could not send signal to ASD for reloading the quota: {0}'.format(ex))
 
-        used_ports = []
-        for asd in ASDList.get_asds():
-            if asd.has_config:
-                config = Configuration.get(asd.config_key)
-                used_ports.append(config['port'])
-                if 'rora_port' in config:
-                    used_ports.append(config['rora_port'])
-
         # Prepare & start service
         ASDController._logger.info('Setting up service for disk {0}'.format(disk.name))
         asd_id = ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(32))
         homedir = '{0}/{1}'.format(disk.mountpoint, asd_id)
         base_port = Configuration.get('{0}|port'.format(ASD_NODE_CONFIG_NETWORK_LOCATION.format(_node_id)))
 
-        asd_port = base_port
-        rora_port = base_port + 1
-        while asd_port in used_ports:
-            asd_port += 1
-        used_ports.append(asd_port)
-        while rora_port in used_ports:
-            rora_port += 1
-
-        asd_config = {'ips': ipaddresses,
-                      'home': homedir,
-                      'port': asd_port,
-                      'asd_id': asd_id,
-                      'node_id': _node_id,
-                      'capacity': asd_size,
-                      'multicast': None,
-                      'transport': 'tcp',
-                      'log_level': 'info'
-                      }
-        cache_size = ASDController.calculate_rocksdb_cache_size(is_ssd=disk.is_ssd)
-        if cache_size:
-            asd_config.update({'rocksdb_block_cache_size': cache_size})
-        if Configuration.get('/ovs/framework/rdma'):
-            asd_config['rora_port'] = rora_port
-            asd_config['rora_transport'] = 'rdma'
+        # ASDs on other slots can be created concurrently, only the port allocation is serialized
+        # The ports are reserved by the modeled ASD and its configuration
+        with LockManager.locked('ports'):
+            used_ports = []
+            for asd in ASDList.get_asds():
+                used_ports.append(asd.port)
+                if asd.has_config:
+                    config = Configuration.get(asd.config_key)
+                    used_ports.append(config['port'])
+                    if 'rora_port' in config:
+                        used_ports.append(config['rora_port'])
+
+            asd_port = base_port
+            rora_port = base_port + 1
+            while asd_port in used_ports:
+                asd_port += 1
+            used_ports.append(asd_port)
+            while rora_port in used_ports:
+                rora_port += 1
 
+            asd_config = {'ips': ipaddresses,
+                          'home': homedir,
+                          'port': asd_port,
+                          'asd_id': asd_id,
+                          'node_id': _node_id,
+                          'capacity': asd_size,
+                          'multicast': None,
+                          'transport': 'tcp',
+                          'log_level': 'info'
+                          }
+            if Configuration.get('/ovs/framework/rdma'):
+                asd_config['rora_port'] = rora_port
+                asd_config['rora_transport'] = 'rdma'
+
+            asd = ASD()
+            asd.disk = disk
+            asd.port = asd_port
+            asd.hosts = ipaddresses
+            asd.asd_id = asd_id
+            asd.folder = asd_id
+            asd.save()
+            Configuration.set(asd.config_key, asd_config)
+
+        # The new ASD has no configuration yet, but does take its share of the memory budget
+        tuning = TuningController.calculate(asds=[_asd for _asd in ASDList.get_asds() if _asd.asd_id == asd_id or _asd.has_config])
+        TuningController.apply_to_config(config=asd_config, values=tuning[asd_id])
         if Configuration.exists('{0}/extra'.format(ASD_NODE_CONFIG_LOCATION.format(_node_id))):
             data = Configuration.get('{0}/extra'.format(ASD_NODE_CONFIG_LOCATION.format(_node_id)))
             asd_config.update(data)
 
-        asd = ASD()
-        asd.disk = disk
-        asd.port = asd_port
-        asd.hosts = ipaddresses
-        asd.asd_id = asd_id
-        asd.folder = asd_id
-        asd.save()
-
         Configuration.set(asd.config_key, asd_config)
         params = {'LOG_SINK': Logger.get_sink_path('alba-asd_{0}'.format(asd_id)),
                   'CONFIG_PATH': Configuration.get_configuration_path(asd.config_key),
                   'SERVICE_NAME': asd.service_name,
                   'ALBA_PKG_NAME': alba_pkg_name,
                   'ALBA_VERSION_CMD': alba_version_cmd}
+        params.update(ASDController.get_affinity_params(disk))
         os.mkdir(homedir)
         ASDController._local_client.run(['chown', '-R', 'alba:alba', homedir])
         ASDController._service_manager.add_service(name=ASDController.ASD_PREFIX,
@@ -160,6 +156,75 @@ class ASDController(object):
                                                    params=params,
                                                    target_name=asd.service_name)
         ASDController.start_asd(asd)
+        # Other ASDs receive a smaller share of the memory budget now
+        TuningController.apply_profile(skip=[asd_id])
+
+    @staticmethod
+    def get_affinity_params(disk, sysfs_root=None):
+        """
+        Calculate the CPU and NUMA placement service parameters for an ASD on the given disk
+        ASDs are bound to the CPUs of the NUMA node of the controller through which the disk is connected and prefer memory of that node
+        When the node has a single NUMA node or when the NUMA node of the disk cannot be determined, no placement is done
+        The memory policy is set through numactl: the systemd NUMAPolicy and NUMAMask settings require systemd 243 or newer
+        :param disk: Disk on which the ASD runs
+        :type disk: source.dal.objects.disk.Disk
+        :param sysfs_root: Root of the sysfs tree
+        :type sysfs_root: str
+        :return: The service parameters
+        :rtype: dict
+        """
+        params = {'CPU_AFFINITY': '',
+                  'NUMA_COMMAND': ''}
+        try:
+            if len(NUMATools.get_nodes(sysfs_root=sysfs_root)) < 2:
+                return params
+            node = NUMATools.get_device_node(device_name=disk.name, sysfs_root=sysfs_root)
+            if node is None:
+                return params
+            params.update({'CPU_AFFINITY': NUMATools.get_node_cpus(node=node, sysfs_root=sysfs_root),
+                           'NUMA_COMMAND': '/usr/bin/numactl --preferred={0} '.format(node)})
+        except Exception:
+            ASDController._logger.exception('Could not determine the NUMA placement for disk {0}'.format(disk.name))
+        return params
+
+    @staticmethod
+    def pin_asds(restart=False):
+        """
+        Re-calculate the CPU and NUMA placement of all ASDs and regenerate their services
+        :param restart: Restart the running ASDs for the new placement to take effect
+        :type restart: bool
+        :return: The placement parameters per ASD ID
+        :rtype: dict
+        """
+        node_id = SettingList.get_setting_by_code(code='node_id').value
+        placements = {}
+        changed_asds = []
+        for asd in ASDList.get_asds():
+            config_key = ServiceFactory.SERVICE_CONFIG_KEY.format(node_id, asd.service_name)
+            if not Configuration.exists(config_key):
+                continue
+            affinity_params = ASDController.get_affinity_params(asd.disk)
+            with LockManager.locked('asd:{0}'.format(asd.asd_id)):
+                params = Configuration.get(config_key)
+                if any(params.get(key) != value for key, value in affinity_params.iteritems()):
+                    ASDController._logger.info('Updating placement of ASD {0}: {1}'.format(asd.asd_id, affinity_params))
+                    params.update(affinity_params)
+                    Configuration.set(config_key, params)
+                    ASDController._service_manager.regenerate_service(name=ASDController.ASD_PREFIX,
+                                                                      client=ASDController._local_client,
+                                                                      target_name=asd.service_name)
+                    changed_asds.append(asd)
+            placements[asd.asd_id] = affinity_params
+
+        if len(changed_asds) > 0 and isinstance(ASDController._service_manager, Systemd):
+            ASDController._local_client.run(['systemctl', 'daemon-reload'])
+        if restart is True:
+            for asd in changed_asds:
+                # The ASD could have been stopped or removed since its service was regenerated
+                with LockManager.locked('asd:{0}'.format(asd.asd_id)):
+                    if ASDController._service_manager.get_service_status(asd.service_name, ASDController._local_client) == 'active':
+                        ASDController.restart_asd(asd)
+        return placements
 
     @staticmethod
     def update_asd(asd, update_data):
@@ -188,23 +253,31 @@ class ASDController(object):
         Configuration.set(key=asd.config_key, value=config)
 
     @staticmethod
-    def remove_asd(asd):
+    def remove_asd(asd, delete_data=True):
         """
         Remove an ASD
         :param asd: ASD to remove
         :type asd: source.dal.objects.asd.ASD
+        :param delete_data: Delete the data of the ASD (in the background, by the reaper). Can be skipped when the whole disk gets wiped afterwards
+        :type delete_data: bool
         :return: None
         :rtype: NoneType
         """
         if ASDController._service_manager.has_service(asd.service_name, ASDController._local_client):
             ASDController._service_manager.stop_service(asd.service_name, ASDController._local_client)
             ASDController._service_manager.remove_service(asd.service_name, ASDController._local_client)
-        try:
-            ASDController._local_client.dir_delete('{0}/{1}'.format(asd.disk.mountpoint, asd.asd_id))
-        except Exception:
-            ASDController._logger.exception('Could not clean ASD data')
+        if delete_data is True:
+            try:
+                ReaperController.trash(disk=asd.disk, folder=asd.folder or asd.asd_id)
+            except Exception:
+                ASDController._logger.exception('Could not move the ASD data to the trash')
         Configuration.delete(asd.config_key)
         asd.delete()
+        # Remaining ASDs can use the memory freed up by this ASD
+        try:
+            TuningController.apply_profile()
+        except Exception:
+            ASDController._logger.exception('Could not re-apply the tuning profile')
 
     @staticmethod
     def start_asd(asd):
@@ -230,6 +303,53 @@ class ASDController(object):
         if ASDController._service_manager.has_service(asd.service_name, ASDController._local_client):
             ASDController._service_manager.stop_service(asd.service_name, ASDController._local_client)
 
+    @staticmethod
+    def start_asds(asds):
+        """
+        Start multiple ASDs in parallel
+        :param asds: ASDs to start
+        :type asds: list[source.dal.objects.asd.ASD]
+        :return: None
+        :rtype: NoneType
+        """
+        ASDController._run_parallel(ASDController.start_asd, asds)
+
+    @staticmethod
+    def stop_asds(asds):
+        """
+        Stop multiple ASDs in parallel
+        :param asds: ASDs to stop
+        :type asds: list[source.dal.objects.asd.ASD]
+        :return: None
+        :rtype: NoneType
+        """
+        ASDController._run_parallel(ASDController.stop_asd, asds)
+
+    @staticmethod
+    def _run_parallel(function, asds):
+        """
+        Execute a function for each ASD, each in its own thread
+        The first exception raised by any of the calls is re-raised once all calls have completed
+        :param function: Function to execute. Receives the ASD as argument
+        :type function: callable
+        :param asds: ASDs to execute the function for
+        :type asds: list[source.dal.objects.asd.ASD]
+        :return: None
+        :rtype: NoneType
+        """
+        asds = list(asds)
+        if len(asds) == 0:
+            return
+        if len(asds) == 1:
+            function(asds[0])
+            return
+        pool = ThreadPool(processes=len(asds))
+        try:
+            pool.map(function, asds)
+        finally:
+            pool.close()
+            pool.join()
+
     @staticmethod
     def restart_asd(asd):
         """
@@ -18,7 +18,6 @@
 Disk related code
 """
 
-import json
 import time
 import uuid
 import random
@@ -26,22 +25,26 @@ import string
 from subprocess import CalledProcessError
 from ovs_extensions.dal.base import ObjectNotFoundException
 from ovs_extensions.generic.disk import DiskTools, Disk as GenericDisk
-from ovs_extensions.generic.sshclient import SSHClient
 from source.dal.lists.disklist import DiskList
 from source.dal.lists.settinglist import SettingList
 from source.dal.objects.disk import Disk
 from source.constants.asd import ASD_NODE_CONFIG_MAIN_LOCATION_S3
+from source.controllers.inventory import InventoryController
+from source.tools.baseline import DiskBaseline
+from source.tools.blockqueue import BlockQueue
 from source.tools.configuration import Configuration
+from source.tools.filesystem import FilesystemProfiles
 from source.tools.fstab import FSTab
+from source.tools.lazy import shared_instance
 from source.tools.logger import Logger
+from source.tools.metrics import Metrics
 
 
 class DiskController(object):
     """
     Disk helper methods
     """
-    controllers = {}
-    _local_client = SSHClient(endpoint='127.0.0.1', username='root')
+    _local_client = shared_instance('local_client')
     _logger = Logger('controllers')
 
     @staticmethod
@@ -53,8 +56,26 @@ class DiskController(object):
         :return: None
         :rtype: NoneType
         """
+        start = time.time()
+        result = 'failure'
+        try:
+            DiskController._sync_disks()
+            result = 'success'
+        finally:
+            Metrics.observe('asd_manager_sync_disks_duration_seconds', time.time() - start)
+            Metrics.increment('asd_manager_sync_disks_total', result=result)
+
+    @staticmethod
+    def _sync_disks():
+        # type: () -> None
+        """
+        Syncs the disks
+        :return: None
+        :rtype: NoneType
+        """
         node_id = SettingList.get_setting_by_code(code='node_id').value
         s3 = Configuration.get(ASD_NODE_CONFIG_MAIN_LOCATION_S3.format(node_id), default=False)
+        previous_disks = dict((disk.id, (disk.state, disk.aliases)) for disk in DiskList.get_disks())
         disks, name_alias_mapping = DiskTools.model_devices(s3=s3)
         disks_by_name = dict((disk.name, disk) for disk in disks)
         alias_name_mapping = name_alias_mapping.reverse_mapping()
@@ -83,6 +104,39 @@ class DiskController(object):
         # Create all disks and their partitions not yet modeled
         for disk_name, generic_disk_model in disks_by_name.iteritems():
             DiskController._model_disk(generic_disk_model)
+        # Queue settings are lost when a disk gets re-plugged and the profiles can change over time
+        DiskController._sync_block_queues()
+        # Let the controller inventory refresh the enclosures of the disks which appeared, disappeared or changed
+        changed_aliases = set()
+        for disk in DiskList.get_disks():
+            if previous_disks.pop(disk.id, None) != (disk.state, disk.aliases):
+                changed_aliases.update(disk.aliases)
+        for _, aliases in previous_disks.itervalues():
+            changed_aliases.update(aliases)
+        if len(changed_aliases) > 0:
+            InventoryController.notify(aliases=changed_aliases)
+
+    @classmethod
+    def _sync_block_queues(cls):
+        # type: () -> None
+        """
+        Re-apply the block queue profiles onto the disks used by ALBA which deviate from their profile and regenerate the udev rules
+        :return: None
+        :rtype: NoneType
+        """
+        try:
+            profiles = BlockQueue.get_profiles()
+            disks = [disk for disk in DiskList.get_usable_disks() if disk.available is False]
+            for disk in disks:
+                if disk.state == 'MISSING':
+                    continue
+                drift = BlockQueue.get_drift(disk=disk, profiles=profiles)
+                if len(drift) > 0:
+                    cls._logger.info('Disk {0} - Queue settings deviate from the {1} profile: {2}'.format(disk.name, disk.disk_class, drift))
+                    BlockQueue.apply(disk=disk, profiles=profiles)
+            BlockQueue.write_udev_rules(disks=disks, profiles=profiles)
+        except Exception:
+            cls._logger.exception('Failed to sync the block queue settings')
 
     @classmethod
     def _remove_disk_model(cls, modeled_disk):
@@ -188,22 +242,31 @@ class DiskController(object):
                     pass
 
     @classmethod
-    def prepare_disk(cls, disk):
+    def prepare_disk(cls, disk, filesystem_profile=None, baseline=None):
         """
         Prepare a disk for use with ALBA
         :param disk: Disk object to prepare
         :type disk: source.dal.objects.disk.Disk
+        :param filesystem_profile: Name of the filesystem profile to format and mount the disk with. Defaults to the profile of the disk class
+        :type filesystem_profile: str
+        :param baseline: Measure a performance baseline of the disk before formatting it. Defaults to the baseline setting of this node
+        :type baseline: bool
         :return: None
         """
         if disk.usable is False:
             raise RuntimeError('Cannot prepare disk {0}'.format(disk.name))
-        cls._logger.info('Preparing disk {0}'.format(disk.name))
+        filesystem_profile, profile = FilesystemProfiles.resolve(disk=disk, name=filesystem_profile)
+        cls._logger.info('Preparing disk {0} using filesystem profile {1}'.format(disk.name, filesystem_profile))
 
         # Create partition
         mountpoint = '/mnt/alba-asd/{0}'.format(''.join(random.choice(string.ascii_letters + string.digits) for _ in range(16)))
         alias = disk.aliases[0]
         cls._locate(device_alias=alias, start=False)
+        BlockQueue.apply(disk=disk)
         cls._local_client.run(['umount', disk.mountpoint], allow_nonzero=True)
+        baseline_settings = DiskBaseline.get_settings()
+        if (baseline if baseline is not None else baseline_settings['enabled']) is True:
+            cls._measure_baseline(disk=disk, alias=alias, settings=baseline_settings)
         cls._local_client.run(['parted', alias, '-s', 'mklabel', 'gpt'])
         cls._local_client.run(['parted', alias, '-s', 'mkpart', alias.split('/')[-1], '2MB', '100%'])
         cls._local_client.run(['udevadm', 'settle'])  # Waits for all udev rules to have finished
@@ -215,7 +278,7 @@ class DiskController(object):
             disk = Disk(disk.id)
             if len(disk.partitions) == 1:
                 try:
-                    cls._local_client.run(['mkfs.xfs', '-qf', disk.partition_aliases[0]])
+                    cls._local_client.run(['mkfs.xfs', '-qf'] + profile['mkfs_options'] + [disk.partition_aliases[0]])
                     break
                 except CalledProcessError:
                     mountpoint = disk.mountpoint
@@ -236,19 +299,47 @@ class DiskController(object):
 
         # Create mountpoint and mount
         cls._local_client.run(['mkdir', '-p', mountpoint])
-        FSTab.add(partition_aliases=[disk.partition_aliases[0]], mountpoint=mountpoint)
+        FSTab.add(partition_aliases=[disk.partition_aliases[0]], mountpoint=mountpoint, mount_options=profile['mount_options'])
         if already_mounted is False:
             cls._local_client.run(['mount', mountpoint])
+        disk = Disk(disk.id)
+        disk.filesystem_profile = filesystem_profile
+        disk.save()
         cls.sync_disks()
         cls._local_client.run(['chown', '-R', 'alba:alba', mountpoint])
         cls._logger.info('Prepare disk {0} complete'.format(disk.name))
 
     @classmethod
-    def clean_disk(cls, disk):
+    def _measure_baseline(cls, disk, alias, settings):
+        # type: (Disk, str, dict) -> None
+        """
+        Measure the performance baseline of a disk and store it. Failing to measure does not fail the preparation
+        :param disk: Disk object to measure
+        :type disk: source.dal.objects.disk.Disk
+        :param alias: Alias of the device to measure
+        :type alias: str
+        :param settings: Baseline settings
+        :type settings: dict
+        :return: None
+        :rtype: NoneType
+        """
+        cls._logger.info('Disk {0} - Measuring the performance baseline'.format(disk.name))
+        try:
+            disk.baseline = DiskBaseline.measure(device=alias, settings=settings)
+            cls._logger.info('Disk {0} - Performance baseline: {1}'.format(disk.name, disk.baseline))
+        except Exception as ex:
+            cls._logger.exception('Disk {0} - Could not measure the performance baseline'.format(disk.name))
+            disk.baseline = {'timestamp': time.time(), 'error': str(ex)}
+        disk.save()
+
+    @classmethod
+    def clean_disk(cls, disk, wipe=False):
         """
         Removes the given disk
         :param disk: Disk object to clean
         :type disk: source.dal.objects.disk.Disk
+        :param wipe: Wipe the filesystem signatures (and discard all blocks of SSDs) instead of relying on the data having been removed
+        :type wipe: bool
         :return: None
         """
         if disk.usable is False:
@@ -264,15 +355,41 @@ class DiskController(object):
             except Exception:
                 cls._logger.exception('Failure to umount or delete the mountpoint')
                 raise
+        if wipe is True:
+            cls._wipe_disk(disk=disk)
         try:
             cls._local_client.run(['parted', disk.aliases[0], '-s', 'mklabel', 'gpt'])
         except CalledProcessError:
             # Wiping the partition is a nice-to-have and might fail when a disk is e.g. unavailable
             pass
+        disk.filesystem_profile = None
+        disk.save()
         cls.sync_disks()
         cls._locate(device_alias=disk.aliases[0], start=True)
         cls._logger.info('Clean disk {0} complete'.format(disk.name))
 
+    @classmethod
+    def _wipe_disk(cls, disk):
+        # type: (Disk) -> None
+        """
+        Wipe an unmounted disk: removes the filesystem and partition table signatures and discards all blocks of SSDs
+        Takes seconds regardless of the amount of files stored on the disk
+        :param disk: Disk object to wipe
+        :type disk: source.dal.objects.disk.Disk
+        :return: None
+        :rtype: NoneType
+        """
+        cls._logger.info('Wiping disk {0}'.format(disk.name))
+        alias = disk.aliases[0]
+        for partition_alias in disk.partition_aliases:
+            cls._local_client.run(['wipefs', '-a', partition_alias], allow_nonzero=True)
+        if disk.is_ssd is True:
+            # Not all devices support discards, the signatures are wiped regardless
+            output, error = cls._local_client.run(['blkdiscard', alias], allow_nonzero=True, return_stderr=True)
+            if error:
+                cls._logger.warning('Disk {0} - Could not discard all blocks: {1}'.format(disk.name, error.strip()))
+        cls._local_client.run(['wipefs', '-a', alias], allow_nonzero=True)
+
     @classmethod
     def remount_disk(cls, disk):
         """
@@ -295,22 +412,7 @@ class DiskController(object):
         Scan the disk controller(s)
         :return: None
         """
-        cls._logger.info('Scanning controllers')
-        controllers = {}
-        has_storecli = cls._local_client.run(['which', 'storcli64'], allow_nonzero=True).strip() != ''
-        if has_storecli is True:
-            controller_info = json.loads(cls._local_client.run(['storcli64', '/call/eall/sall', 'show', 'all', 'J']))
-            for controller in controller_info['Controllers']:
-                if controller['Command Status']['Status'] == 'Failure':
-                    continue
-                data = controller['Response Data']
-                drive_locations = set(drive.split(' ')[1] for drive in data.keys())
-                for location in drive_locations:
-                    if data['Drive {0}'.format(location)][0]['State'] == 'JBOD':
-                        wwn = data['Drive {0} - Detailed Information'.format(location)]['Drive {0} Device attributes'.format(location)]['WWN']
-                        controllers[wwn] = ('storcli64', location)
-        cls.controllers = controllers
-        cls._logger.info('Scan complete')
+        InventoryController.scan()
 
     @classmethod
     def _locate(cls, device_alias, start):
@@ -322,11 +424,4 @@ class DiskController(object):
         :type start: bool
         :return: None
         """
-        if cls.controllers == {}:
-            cls.scan_controllers()
-        for wwn in cls.controllers:
-            if device_alias and device_alias.endswith(wwn):
-                controller_type, location = cls.controllers[wwn]
-                if controller_type == 'storcli64':
-                    cls._logger.info('Location {0} for {1}'.format('start' if start is True else 'stop', location))
-                    cls._local_client.run(['storcli64', location, 'start' if start is True else 'stop', 'locate'])
+        InventoryController.locate(aliases=[device_alias], start=start)
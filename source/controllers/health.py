@@ -0,0 +1,125 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+This module contains the health controller (scheduled collection of the SMART/NVMe health information of the disks)
+"""
+
+import time
+from multiprocessing.pool import ThreadPool
+from source.constants.asd import ASD_NODE_CONFIG_HEALTH_LOCATION
+from source.dal.lists.disklist import DiskList
+from source.dal.lists.settinglist import SettingList
+from source.tools.configuration import Configuration
+from source.tools.health import DiskHealth
+from source.tools.lazy import shared_instance
+from source.tools.logger import Logger
+
+
+class HealthController(object):
+    """
+    Health controller class
+    Every 'interval' seconds the health information of all disks is collected, 'max_parallel' disks at a time
+    Disks in standby are not woken up, their previous information is kept
+    """
+    DEFAULT_SETTINGS = {'interval': 15 * 60,
+                        'max_parallel': 8,
+                        'timeout': 30}
+
+    _logger = Logger('controllers')
+    _local_client = shared_instance('local_client')
+
+    @classmethod
+    def get_settings(cls):
+        # type: () -> dict
+        """
+        Retrieve the health collection settings of this node
+        :return: The health collection settings
+        :rtype: dict
+        """
+        node_id = SettingList.get_setting_by_code(code='node_id').value
+        settings = cls.DEFAULT_SETTINGS.copy()
+        settings.update(Configuration.get(ASD_NODE_CONFIG_HEALTH_LOCATION.format(node_id), default={}))
+        return settings
+
+    @classmethod
+    def run(cls):
+        # type: () -> None
+        """
+        Run the health collector. Does not return
+        :return: None
+        :rtype: NoneType
+        """
+        while True:
+            interval = cls.DEFAULT_SETTINGS['interval']
+            try:
+                settings = cls.get_settings()
+                interval = settings['interval']
+                cls.collect(settings=settings)
+            except Exception:
+                cls._logger.exception('Unexpected error in the health collector')
+            time.sleep(interval)
+
+    @classmethod
+    def collect(cls, settings=None):
+        # type: (Optional[dict]) -> None
+        """
+        Collect the health information of all disks in parallel
+        :param settings: Health collection settings. Retrieved when not passed
+        :type settings: dict
+        :return: None
+        :rtype: NoneType
+        """
+        if settings is None:
+            settings = cls.get_settings()
+        disks = [disk for disk in DiskList.get_disks() if disk.state != 'MISSING']
+        if len(disks) == 0:
+            return
+        pool = ThreadPool(processes=min(len(disks), settings['max_parallel']))
+        try:
+            pool.map(lambda _disk: cls.collect_disk(disk=_disk, timeout=settings['timeout']), disks)
+        finally:
+            pool.close()
+            pool.join()
+
+    @classmethod
+    def collect_disk(cls, disk, timeout=30):
+        # type: (Disk, int) -> None
+        """
+        Collect the health information of a single disk and cache it
+        :param disk: Disk to collect the information for
+        :type disk: source.dal.objects.disk.Disk
+        :param timeout: Timeout of the health command
+        :type timeout: int
+        :return: None
+        :rtype: NoneType
+        """
+        device = '/dev/{0}'.format(disk.name)
+        try:
+            if disk.name.startswith('nvme'):
+                info = DiskHealth.parse_nvme(cls._local_client.run(['nvme', 'smart-log', device, '-o', 'json'], timeout=timeout))
+            else:
+                # Exit status is a bit mask, which is non-zero for eg: disks with logged errors
+                output = cls._local_client.run(['smartctl', '-H', '-A', '-n', 'standby', device], timeout=timeout, allow_nonzero=True)
+                if 'STANDBY mode' in output:
+                    return
+                info = DiskHealth.parse_smartctl(output)
+            info['error'] = None
+        except Exception as ex:
+            cls._logger.warning('Disk {0} - Could not collect the health information: {1}'.format(disk.name, ex))
+            info = {'error': str(ex)}
+        info['timestamp'] = time.time()
+        DiskHealth.store(disk=disk, info=info)
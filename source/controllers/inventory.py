@@ -0,0 +1,261 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+This module contains the inventory controller (background scanning of the disk controllers)
+"""
+
+import re
+import json
+import time
+import threading
+from multiprocessing.pool import ThreadPool
+from source.tools.lazy import shared_instance
+from source.tools.logger import Logger
+
+
+class InventoryController(object):
+    """
+    Inventory controller class
+    Keeps an index of the JBOD drives on the storcli64 controllers by WWN, so locating a drive requires no scan
+    Scanning all drives in detail ('/call/eall/sall show all J') is slow on large controllers. Instead, a cheap summary of
+    all drives is retrieved and only the enclosures of which the drives changed (or which contain changed devices) are scanned in detail.
+    The scan runs in the background: after startup, when the disk sync reports changes and every REFRESH_INTERVAL seconds
+    """
+    REFRESH_INTERVAL = 60 * 60
+    STORCLI = 'storcli64'
+
+    _logger = Logger('controllers')
+    _local_client = shared_instance('local_client')
+
+    _lock = threading.Lock()
+    _refresh_event = threading.Event()
+    _pending_aliases = set()
+    _full_refresh = True
+    _scanned = False
+    _drives = {}      # WWN (lowercase hexadecimal): {'enclosure': '/c0/e252', 'location': '/c0/e252/s3'}
+    _enclosures = {}  # Enclosure: signature of its drives in the summary
+
+    @classmethod
+    def run(cls):
+        # type: () -> None
+        """
+        Run the inventory service. Does not return
+        :return: None
+        :rtype: NoneType
+        """
+        while True:
+            try:
+                with cls._lock:
+                    aliases = cls._pending_aliases
+                    full = cls._full_refresh
+                    cls._pending_aliases = set()
+                    cls._full_refresh = False
+                    cls._refresh_event.clear()
+                cls.refresh(aliases=aliases, full=full)
+            except Exception:
+                cls._logger.exception('Unexpected error in the controller inventory')
+            cls._refresh_event.wait(cls.REFRESH_INTERVAL)
+            if not cls._refresh_event.is_set():
+                with cls._lock:
+                    cls._full_refresh = True
+
+    @classmethod
+    def notify(cls, aliases):
+        # type: (Iterable[str]) -> None
+        """
+        Report devices which appeared, disappeared or changed, triggering a background refresh of their enclosures
+        :param aliases: Aliases of the changed devices
+        :type aliases: list
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            cls._pending_aliases.update(aliases)
+        cls._refresh_event.set()
+
+    @classmethod
+    def scan(cls):
+        # type: () -> None
+        """
+        Scan all drives of all controllers in detail right away
+        :return: None
+        :rtype: NoneType
+        """
+        cls.refresh(aliases=[], full=True)
+
+    @classmethod
+    def refresh(cls, aliases, full=False):
+        # type: (Iterable[str], bool) -> None
+        """
+        Refresh the enclosures of which the drives changed according to the summary of all drives
+        :param aliases: Aliases of devices of which the enclosures have to be refreshed as well
+        :type aliases: set
+        :param full: Refresh all enclosures
+        :type full: bool
+        :return: None
+        :rtype: NoneType
+        """
+        if cls._local_client.run(['which', cls.STORCLI], allow_nonzero=True).strip() == '':
+            with cls._lock:
+                cls._drives = {}
+                cls._enclosures = {}
+                cls._scanned = True
+            return
+
+        start = time.time()
+        summary = cls._get_summary()
+        with cls._lock:
+            changed = set(enclosure for enclosure, signature in summary.iteritems() if full is True or cls._enclosures.get(enclosure) != signature)
+            for alias in aliases:
+                drive = cls._find_drive(alias)
+                if drive is not None and drive['enclosure'] in summary:
+                    changed.add(drive['enclosure'])
+            removed = set(cls._enclosures) - set(summary)
+        if len(changed) == 0 and len(removed) == 0:
+            with cls._lock:
+                cls._scanned = True
+            return
+
+        cls._logger.info('Scanning enclosures {0}'.format(', '.join(sorted(changed)) if changed else '-'))
+        details = dict((enclosure, cls._get_drives(enclosure)) for enclosure in changed)
+        with cls._lock:
+            for wwn, drive in cls._drives.items():
+                if drive['enclosure'] in changed or drive['enclosure'] in removed:
+                    cls._drives.pop(wwn)
+            for enclosure, drives in details.iteritems():
+                cls._drives.update(drives)
+                cls._enclosures[enclosure] = summary[enclosure]
+            for enclosure in removed:
+                cls._enclosures.pop(enclosure)
+            cls._scanned = True
+        cls._logger.info('Scan complete in {0:.1f}s, {1} drives indexed'.format(time.time() - start, len(cls._drives)))
+
+    @classmethod
+    def get_location(cls, alias):
+        # type: (str) -> Optional[str]
+        """
+        Retrieve the controller location of a device
+        :param alias: Alias of the device (eg: '/dev/disk/by-id/wwn-0x5000c500a1b2c3d4')
+        :type alias: str
+        :return: The location (eg: '/c0/e252/s3') or None when the device is not a known JBOD drive
+        :rtype: str
+        """
+        with cls._lock:
+            drive = cls._find_drive(alias)
+            return None if drive is None else drive['location']
+
+    @classmethod
+    def locate(cls, aliases, start):
+        # type: (List[str], bool) -> Dict[str, bool]
+        """
+        Start or stop locating devices. Commands for different controllers run in parallel
+        Only the drives of the requested devices are addressed, never the other drives of their enclosures
+        When the background scan did not complete yet, the inventory is scanned first
+        :param aliases: Aliases of the devices (one per device)
+        :type aliases: list
+        :param start: True to start locating, False otherwise
+        :type start: bool
+        :return: Per alias whether the device is located on a controller
+        :rtype: dict
+        """
+        with cls._lock:
+            scanned = cls._scanned
+        if scanned is False:
+            cls._logger.info('Controller inventory not available yet, scanning before locating {0}'.format(', '.join(aliases)))
+            cls.scan()
+        with cls._lock:
+            locations = dict((alias, cls._find_drive(alias)) for alias in aliases)
+
+        # Group the commands per controller: a controller handles its commands one at a time
+        per_controller = {}
+        for location in sorted(set(drive['location'] for drive in locations.itervalues() if drive is not None)):
+            per_controller.setdefault(location.split('/')[1], []).append(location)
+
+        def _run(commands):
+            for location in commands:
+                cls._logger.info('Location {0} for {1}'.format('start' if start is True else 'stop', location))
+                cls._local_client.run([cls.STORCLI, location, 'start' if start is True else 'stop', 'locate'])
+
+        if len(per_controller) > 0:
+            pool = ThreadPool(processes=len(per_controller))
+            try:
+                pool.map(_run, per_controller.values())
+            finally:
+                pool.close()
+                pool.join()
+        return dict((alias, drive is not None) for alias, drive in locations.iteritems())
+
+    @classmethod
+    def _find_drive(cls, alias):
+        # type: (str) -> Optional[dict]
+        """
+        Find the drive of a device alias in the index. Callers must hold the lock
+        Every part of the alias which could be a WWN (eg: 'wwn-0x5000c500a1b2c3d4' or 'pci-0000:03:00.0-sas-0x5000c29f4cf04566-lun-0') is looked up
+        """
+        if not alias:
+            return None
+        for part in re.split('[-_]', alias.split('/')[-1]):
+            part = part.lower()
+            if part.startswith('0x'):
+                part = part[2:]
+            if part in cls._drives:
+                return cls._drives[part]
+        return None
+
+    @classmethod
+    def _get_summary(cls):
+        # type: () -> Dict[str, tuple]
+        """
+        Retrieve a signature of the drives per enclosure from the (fast) summary of all drives
+        :return: Per enclosure (eg: '/c0/e252') the sorted (slot, device ID, state, size) of its drives
+        :rtype: dict
+        """
+        summary = {}
+        output = json.loads(cls._local_client.run([cls.STORCLI, '/call/eall/sall', 'show', 'J']))
+        for controller in output['Controllers']:
+            if controller['Command Status']['Status'] == 'Failure':
+                continue
+            controller_id = controller['Command Status']['Controller']
+            for drive in controller['Response Data'].get('Drive Information', []):
+                enclosure_id, slot = drive['EID:Slt'].split(':')
+                enclosure = '/c{0}'.format(controller_id) if enclosure_id.strip() == '' else '/c{0}/e{1}'.format(controller_id, enclosure_id.strip())
+                summary.setdefault(enclosure, []).append((slot, drive.get('DID'), drive.get('State'), drive.get('Size')))
+        return dict((enclosure, tuple(sorted(drives))) for enclosure, drives in summary.iteritems())
+
+    @classmethod
+    def _get_drives(cls, enclosure):
+        # type: (str) -> Dict[str, dict]
+        """
+        Retrieve the JBOD drives of an enclosure in detail
+        :param enclosure: The enclosure (eg: '/c0/e252')
+        :type enclosure: str
+        :return: Per WWN the enclosure and location of the drive
+        :rtype: dict
+        """
+        drives = {}
+        output = json.loads(cls._local_client.run([cls.STORCLI, '{0}/sall'.format(enclosure), 'show', 'all', 'J']))
+        for controller in output['Controllers']:
+            if controller['Command Status']['Status'] == 'Failure':
+                continue
+            data = controller['Response Data']
+            drive_locations = set(drive.split(' ')[1] for drive in data.keys() if drive.startswith('Drive /'))
+            for location in drive_locations:
+                if data['Drive {0}'.format(location)][0]['State'] == 'JBOD':
+                    wwn = data['Drive {0} - Detailed Information'.format(location)]['Drive {0} Device attributes'.format(location)]['WWN']
+                    drives[wwn.lower()] = {'enclosure': enclosure,
+                                           'location': location}
+        return drives
@@ -0,0 +1,56 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+This module contains the I/O statistics controller (sampling of /proc/diskstats)
+"""
+
+import time
+from source.dal.lists.disklist import DiskList
+from source.tools.diskstats import DiskStats
+from source.tools.logger import Logger
+
+
+class IOStatsController(object):
+    """
+    I/O statistics controller class
+    Samples the I/O statistics of all modeled disks every SAMPLE_INTERVAL seconds. The modeled disks are looked up every NAMES_REFRESH samples
+    """
+    SAMPLE_INTERVAL = 10
+    NAMES_REFRESH = 6
+
+    _logger = Logger('controllers')
+
+    @classmethod
+    def run(cls):
+        # type: () -> None
+        """
+        Run the sampler. Does not return
+        :return: None
+        :rtype: NoneType
+        """
+        names = set()
+        iteration = 0
+        while True:
+            start = time.time()
+            try:
+                if iteration % cls.NAMES_REFRESH == 0:
+                    names = set(disk.name for disk in DiskList.get_disks() if disk.state != 'MISSING')
+                DiskStats.sample(names=names)
+            except Exception:
+                cls._logger.exception('Unexpected error in the I/O statistics sampler')
+            iteration += 1
+            time.sleep(max(0, cls.SAMPLE_INTERVAL - (time.time() - start)))
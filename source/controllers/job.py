@@ -0,0 +1,221 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+This module contains the job controller (background execution of long-running operations)
+"""
+
+import time
+import Queue
+import threading
+from ovs_extensions.dal.base import ObjectNotFoundException
+from source.dal.lists.joblist import JobList
+from source.dal.objects.job import Job
+from source.tools.logger import Logger
+
+
+class JobCancelledException(RuntimeError):
+    """
+    Raised when a job can no longer be cancelled
+    """
+    pass
+
+
+class JobController(object):
+    """
+    Job controller class
+    Jobs are stored in the local database and executed by a bounded pool of worker threads (started on first use)
+    Only queued jobs can be cancelled. Jobs which were queued or running when the ASD manager stopped are marked as failed on startup
+    """
+    MAX_WORKERS = 2
+    MAX_FINISHED_JOBS = 250
+
+    _logger = Logger('controllers')
+    _lock = threading.Lock()
+    _queue = Queue.Queue()
+    _workers = []
+    _functions = {}
+    _thread_data = threading.local()
+
+    @classmethod
+    def submit(cls, name, function, arguments=None):
+        # type: (str, callable, dict) -> Job
+        """
+        Queue a job
+        :param name: Name of the job (eg: asd_add)
+        :type name: str
+        :param function: Function to execute, called with the arguments as keyword arguments. Its return value is stored as the result
+        :type function: callable
+        :param arguments: Arguments to pass to the function. Must be serializable
+        :type arguments: dict
+        :return: The queued job
+        :rtype: source.dal.objects.job.Job
+        """
+        arguments = arguments or {}
+        job = Job()
+        job.name = name
+        job.arguments = arguments
+        job.status = Job.STATUS_QUEUED
+        job.progress = []
+        job.created = time.time()
+        job.save()
+        cls._logger.info('Job {0} ({1}) - Queued with arguments {2}'.format(job.id, name, arguments))
+        with cls._lock:
+            cls._functions[job.id] = function
+            cls._cleanup()
+            cls._start_workers()
+        cls._queue.put(job.id)
+        return job
+
+    @classmethod
+    def get_job(cls, job_id):
+        # type: (int) -> Job
+        """
+        Retrieve a job
+        :param job_id: Identifier of the job
+        :type job_id: int
+        :return: The job
+        :rtype: source.dal.objects.job.Job
+        """
+        return Job(job_id)
+
+    @classmethod
+    def cancel(cls, job_id):
+        # type: (int) -> Job
+        """
+        Cancel a queued job
+        :param job_id: Identifier of the job
+        :type job_id: int
+        :raises JobCancelledException: When the job is no longer queued
+        :return: The cancelled job
+        :rtype: source.dal.objects.job.Job
+        """
+        with cls._lock:
+            job = Job(job_id)
+            if job.status != Job.STATUS_QUEUED:
+                raise JobCancelledException('Job {0} is {1} and can no longer be cancelled'.format(job_id, job.status.lower()))
+            job.status = Job.STATUS_CANCELLED
+            job.finished = time.time()
+            job.save()
+            cls._functions.pop(job.id, None)
+        cls._logger.info('Job {0} ({1}) - Cancelled'.format(job.id, job.name))
+        return job
+
+    @classmethod
+    def report_progress(cls, message):
+        # type: (str) -> None
+        """
+        Add a progress message to the job executed by the current thread. Does nothing outside of a job
+        :param message: Progress message
+        :type message: str
+        :return: None
+        :rtype: NoneType
+        """
+        job_id = getattr(cls._thread_data, 'job_id', None)
+        if job_id is None:
+            return
+        job = Job(job_id)
+        job.progress = job.progress + [{'time': time.time(), 'message': message}]
+        job.save()
+
+    @classmethod
+    def recover(cls):
+        # type: () -> None
+        """
+        Mark all jobs which were interrupted by a restart of the ASD manager as failed
+        :return: None
+        :rtype: NoneType
+        """
+        for job in JobList.get_jobs_by_status([Job.STATUS_QUEUED, Job.STATUS_RUNNING]):
+            cls._logger.warning('Job {0} ({1}) - Interrupted while {2}'.format(job.id, job.name, job.status.lower()))
+            job.status = Job.STATUS_FAILED
+            job.error = 'Interrupted by a restart of the ASD manager'
+            job.finished = time.time()
+            job.save()
+
+    @classmethod
+    def _start_workers(cls):
+        # type: () -> None
+        """
+        Start the worker threads which are not running yet. Must be called while holding the lock
+        """
+        cls._workers = [worker for worker in cls._workers if worker.is_alive()]
+        for index in xrange(cls.MAX_WORKERS - len(cls._workers)):
+            worker = threading.Thread(target=cls._work, name='job_worker_{0}'.format(index))
+            worker.daemon = True
+            worker.start()
+            cls._workers.append(worker)
+
+    @classmethod
+    def _cleanup(cls):
+        # type: () -> None
+        """
+        Remove the oldest finished jobs. Must be called while holding the lock
+        """
+        finished = JobList.get_jobs_by_status(Job.FINISHED_STATUSES)
+        for job in finished[:max(0, len(finished) - cls.MAX_FINISHED_JOBS)]:
+            job.delete()
+
+    @classmethod
+    def _work(cls):
+        # type: () -> None
+        """
+        Worker loop: execute the queued jobs
+        """
+        while True:
+            job_id = cls._queue.get()
+            try:
+                cls._execute(job_id)
+            except Exception:
+                cls._logger.exception('Job {0} - Unexpected error while executing'.format(job_id))
+
+    @classmethod
+    def _execute(cls, job_id):
+        # type: (int) -> None
+        """
+        Execute a job
+        :param job_id: Identifier of the job
+        :type job_id: int
+        """
+        with cls._lock:
+            try:
+                job = Job(job_id)
+            except ObjectNotFoundException:
+                return
+            function = cls._functions.pop(job_id, None)
+            if job.status != Job.STATUS_QUEUED or function is None:
+                return
+            job.status = Job.STATUS_RUNNING
+            job.started = time.time()
+            job.save()
+
+        cls._logger.info('Job {0} ({1}) - Started'.format(job.id, job.name))
+        cls._thread_data.job_id = job.id
+        try:
+            result = function(**job.arguments)
+            job = Job(job.id)
+            job.result = result
+            job.status = Job.STATUS_SUCCESS
+            cls._logger.info('Job {0} ({1}) - Finished'.format(job.id, job.name))
+        except Exception as ex:
+            cls._logger.exception('Job {0} ({1}) - Failed'.format(job.id, job.name))
+            job = Job(job.id)
+            job.error = str(ex)
+            job.status = Job.STATUS_FAILED
+        finally:
+            cls._thread_data.job_id = None
+        job.finished = time.time()
+        job.save()
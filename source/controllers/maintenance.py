@@ -18,13 +18,12 @@
 This module contains the maintenance controller (maintenance service logic)
 """
 
-from ovs_extensions.generic.sshclient import SSHClient
 from ovs_extensions.constants.arakoon import ARAKOON_CONFIG
 from ovs_extensions.constants.alba import BACKEND_MAINTENANCE_CONFIG, BACKEND_MAINTENANCE_SERVICE, MAINTENANCE_PREFIX
 from source.tools.configuration import Configuration
+from source.tools.lazy import shared_instance
 from source.tools.logger import Logger
 from source.tools.packagefactory import PackageFactory
-from source.tools.servicefactory import ServiceFactory
 
 
 class MaintenanceController(object):
@@ -33,8 +32,8 @@ class MaintenanceController(object):
     """
     MAINTENANCE_KEY = BACKEND_MAINTENANCE_SERVICE
     MAINTENANCE_PREFIX = MAINTENANCE_PREFIX
-    _local_client = SSHClient(endpoint='127.0.0.1', username='root')
-    _service_manager = ServiceFactory.get_manager()
+    _local_client = shared_instance('local_client')
+    _service_manager = shared_instance('service_manager')
 
     @staticmethod
     def get_services():
@@ -0,0 +1,80 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+This module contains the process statistics controller (sampling of the resource usage of the ASD processes)
+"""
+
+import time
+from ovs_extensions.services.interfaces.systemd import Systemd
+from source.dal.lists.asdlist import ASDList
+from source.tools.lazy import shared_instance
+from source.tools.logger import Logger
+from source.tools.processstats import ProcessStats
+
+
+class ProcessStatsController(object):
+    """
+    Process statistics controller class
+    Samples the resource usage of all ASD processes every SAMPLE_INTERVAL seconds
+    """
+    SAMPLE_INTERVAL = 30
+
+    _logger = Logger('controllers')
+    _local_client = shared_instance('local_client')
+    _service_manager = shared_instance('service_manager')
+
+    @classmethod
+    def run(cls):
+        # type: () -> None
+        """
+        Run the sampler. Does not return
+        :return: None
+        :rtype: NoneType
+        """
+        while True:
+            start = time.time()
+            try:
+                asds = ASDList.get_asds()
+                service_pids = cls.get_pids(service_names=[asd.service_name for asd in asds])
+                ProcessStats.sample(pids=dict((asd.asd_id, service_pids.get(asd.service_name)) for asd in asds))
+            except Exception:
+                cls._logger.exception('Unexpected error in the process statistics sampler')
+            time.sleep(max(0, cls.SAMPLE_INTERVAL - (time.time() - start)))
+
+    @classmethod
+    def get_pids(cls, service_names):
+        # type: (List[str]) -> Dict[str, int]
+        """
+        Retrieve the main PID of services. On systemd, all services are queried with a single command
+        :param service_names: Names of the services
+        :type service_names: list
+        :return: Main PID per service name. 0 for services which are not running
+        :rtype: dict
+        """
+        if len(service_names) == 0:
+            return {}
+        if not isinstance(cls._service_manager, Systemd):
+            return dict((service_name, cls._service_manager.get_service_pid(service_name, cls._local_client)) for service_name in service_names)
+
+        pids = {}
+        output = cls._local_client.run(['systemctl', 'show', '--property=Id', '--property=MainPID'] + ['{0}.service'.format(service_name) for service_name in service_names])
+        # Output consists of a block of 'key=value' lines per unit, separated by empty lines
+        for block in output.strip().split('\n\n'):
+            properties = dict(line.split('=', 1) for line in block.splitlines() if '=' in line)
+            if 'Id' in properties and properties.get('MainPID', '').isdigit():
+                pids[properties['Id'].rsplit('.service', 1)[0]] = int(properties['MainPID'])
+        return pids
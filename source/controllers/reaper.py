@@ -0,0 +1,219 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+This module contains the reaper controller (background removal of the data of removed ASDs)
+"""
+
+import os
+import time
+import threading
+from source.constants.asd import ASD_NODE_CONFIG_REAPER_LOCATION
+from source.dal.lists.disklist import DiskList
+from source.dal.lists.settinglist import SettingList
+from source.tools.configuration import Configuration
+from source.tools.ioprio import IOPriority
+from source.tools.lockmanager import LockManager
+from source.tools.logger import Logger
+
+
+class ReaperController(object):
+    """
+    Reaper controller class
+    The directory of a removed ASD is moved into the trash folder of its filesystem right away. The reaper thread deletes the trashed
+    directories in the background:
+        * In batches of 'files_per_batch' files with a pause of 'batch_pause' seconds in between
+        * At most 'bytes_per_second' bytes per second on average (0 to disable), so the ASDs sharing the disk keep their bandwidth
+        * Using the idle I/O scheduling class when possible. This is best effort: only the BFQ and CFQ schedulers honour it
+    The trash folders are part of the filesystems, so pending deletions survive restarts of the ASD manager
+    """
+    TRASH_FOLDER = '.trash'
+    CHECK_INTERVAL = 300
+    DEFAULT_SETTINGS = {'files_per_batch': 500,
+                        'batch_pause': 1.0,
+                        'bytes_per_second': 50 * 1024 ** 2}
+
+    _logger = Logger('controllers')
+    _lock = threading.Lock()
+    _wake_up = threading.Event()
+    _progress = {}  # Trashed directory being deleted: {'deleted_bytes': int, 'deleted_entries': int}
+
+    @classmethod
+    def get_settings(cls):
+        # type: () -> dict
+        """
+        Retrieve the reaper settings of this node
+        :return: The reaper settings
+        :rtype: dict
+        """
+        node_id = SettingList.get_setting_by_code(code='node_id').value
+        settings = cls.DEFAULT_SETTINGS.copy()
+        settings.update(Configuration.get(ASD_NODE_CONFIG_REAPER_LOCATION.format(node_id), default={}))
+        return settings
+
+    @classmethod
+    def trash(cls, disk, folder):
+        # type: (Disk, str) -> str
+        """
+        Move a folder on a disk into its trash folder, to be deleted by the reaper
+        :param disk: Disk containing the folder
+        :type disk: source.dal.objects.disk.Disk
+        :param folder: Name of the folder to trash (relative to the mountpoint)
+        :type folder: str
+        :return: The path of the trashed folder
+        :rtype: str
+        """
+        trash_folder = os.path.join(disk.mountpoint, cls.TRASH_FOLDER)
+        if not os.path.isdir(trash_folder):
+            os.mkdir(trash_folder)
+        target = os.path.join(trash_folder, '{0}.{1}'.format(folder, int(time.time())))
+        os.rename(os.path.join(disk.mountpoint, folder), target)
+        cls._logger.info('Disk {0} - Moved {1} to the trash'.format(disk.name, folder))
+        cls._wake_up.set()
+        return target
+
+    @classmethod
+    def get_pending(cls):
+        # type: () -> dict
+        """
+        Report the trashed folders waiting to be deleted
+        :return: Per slot the amount of trashed folders and the bytes and entries deleted so far of the folder being deleted
+        :rtype: dict
+        """
+        pending = {}
+        for disk, trash_folder in cls._get_trash_folders():
+            info = {'entries': 0, 'deleted_bytes': 0, 'deleted_entries': 0}
+            for entry in os.listdir(trash_folder):
+                info['entries'] += 1
+                with cls._lock:
+                    progress = cls._progress.get(os.path.join(trash_folder, entry))
+                if progress is not None:
+                    info['deleted_bytes'] += progress['deleted_bytes']
+                    info['deleted_entries'] += progress['deleted_entries']
+            pending[disk.aliases[0].split('/')[-1]] = info
+        return pending
+
+    @classmethod
+    def run(cls):
+        # type: () -> None
+        """
+        Run the reaper. Does not return
+        :return: None
+        :rtype: NoneType
+        """
+        if IOPriority.set_thread_class(IOPriority.CLASS_IDLE) is False:
+            cls._logger.warning('Could not lower the I/O priority of the reaper')
+        while True:
+            cls._wake_up.clear()
+            try:
+                cls.reap()
+            except Exception:
+                cls._logger.exception('Unexpected error in the reaper')
+            cls._wake_up.wait(cls.CHECK_INTERVAL)
+
+    @classmethod
+    def reap(cls):
+        # type: () -> None
+        """
+        Delete all trashed folders
+        :return: None
+        :rtype: NoneType
+        """
+        settings = cls.get_settings()
+        for disk, trash_folder in cls._get_trash_folders():
+            for entry in sorted(os.listdir(trash_folder)):
+                path = os.path.join(trash_folder, entry)
+                try:
+                    cls._reap_folder(disk=disk, path=path, settings=settings)
+                except OSError:
+                    # The disk could have been cleared or removed meanwhile
+                    cls._logger.exception('Disk {0} - Could not delete {1}'.format(disk.name, path))
+                finally:
+                    with cls._lock:
+                        cls._progress.pop(path, None)
+
+    @classmethod
+    def _reap_folder(cls, disk, path, settings):
+        # type: (Disk, str, dict) -> None
+        """
+        Delete a trashed folder in batches. The slot lock is held while deleting a batch, so the slot can be cleared in between
+        The size is counted while deleting: walking the folder upfront would read all of its metadata twice
+        """
+        cls._logger.info('Disk {0} - Deleting {1}'.format(disk.name, path))
+        start = time.time()
+        with cls._lock:
+            cls._progress[path] = {'deleted_bytes': 0, 'deleted_entries': 0}
+
+        batch = []
+        for root, folders, files in os.walk(path, topdown=False):
+            batch.extend((True, os.path.join(root, name)) for name in files)
+            batch.extend((False, os.path.join(root, name)) for name in folders)
+            if len(batch) >= settings['files_per_batch']:
+                cls._delete_batch(disk=disk, path=path, batch=batch)
+                batch = []
+                cls._pace(path=path, start=start, settings=settings)
+        batch.append((False, path))
+        cls._delete_batch(disk=disk, path=path, batch=batch)
+        with cls._lock:
+            progress = cls._progress[path]
+        cls._logger.info('Disk {0} - Deleted {1} ({2} entries, {3} bytes) in {4:.1f}s'.format(disk.name, path, progress['deleted_entries'],
+                                                                                           progress['deleted_bytes'], time.time() - start))
+
+    @classmethod
+    def _pace(cls, path, start, settings):
+        # type: (str, float, dict) -> None
+        """
+        Pause in between two batches: at least 'batch_pause' seconds and long enough to stay within 'bytes_per_second' on average
+        """
+        pause = settings['batch_pause']
+        if settings['bytes_per_second'] > 0:
+            with cls._lock:
+                deleted_bytes = cls._progress[path]['deleted_bytes']
+            pause = max(pause, start + float(deleted_bytes) / settings['bytes_per_second'] - time.time())
+        time.sleep(pause)
+
+    @classmethod
+    def _delete_batch(cls, disk, path, batch):
+        # type: (Disk, str, List[Tuple[bool, str]]) -> None
+        """
+        Delete a batch of files and (emptied) folders
+        """
+        deleted = 0
+        with LockManager.locked(LockManager.get_slot_resource(disk)):
+            for is_file, entry in batch:
+                if is_file is True:
+                    deleted += os.lstat(entry).st_blocks * 512
+                    os.unlink(entry)
+                else:
+                    os.rmdir(entry)
+        with cls._lock:
+            cls._progress[path]['deleted_bytes'] += deleted
+            cls._progress[path]['deleted_entries'] += len(batch)
+
+    @classmethod
+    def _get_trash_folders(cls):
+        # type: () -> List[Tuple[Disk, str]]
+        """
+        Retrieve the existing trash folders of the disks in use
+        """
+        trash_folders = []
+        for disk in DiskList.get_usable_disks():
+            if disk.available is True or disk.state == 'MISSING' or disk.mountpoint is None:
+                continue
+            trash_folder = os.path.join(disk.mountpoint, cls.TRASH_FOLDER)
+            if os.path.isdir(trash_folder):
+                trash_folders.append((disk, trash_folder))
+        return trash_folders
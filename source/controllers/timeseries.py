@@ -0,0 +1,113 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+This module contains the time series controller (recording of the node metrics into the time series store)
+"""
+
+import time
+from source.dal.lists.asdlist import ASDList
+from source.dal.lists.disklist import DiskList
+from source.tools.diskstats import DiskStats
+from source.tools.logger import Logger
+from source.tools.processstats import ProcessStats
+from source.tools.timeseries import TimeSeries, TimeSeriesException
+
+
+class TimeSeriesController(object):
+    """
+    Time series controller class
+    Every RECORD_INTERVAL seconds the latest sampled I/O statistics of the slots and resource usage of the ASDs are recorded:
+        * slots/<slot_id>/<metric> for the metrics of DiskStats
+        * asds/<asd_id>/<metric> for the metrics of ProcessStats
+    The disk usage (slots/<slot_id>/used and slots/<slot_id>/available) executes a command per disk and is only recorded every USAGE_INTERVAL seconds
+    Series which did not receive values during the span of the coarsest tier are removed
+    """
+    RECORD_INTERVAL = 10
+    USAGE_INTERVAL = 60
+    PRUNE_INTERVAL = 3600
+
+    _logger = Logger('controllers')
+
+    @classmethod
+    def run(cls):
+        # type: () -> None
+        """
+        Run the recorder. Does not return
+        :return: None
+        :rtype: NoneType
+        """
+        recorded = {}  # Series prefix: timestamp of the last recorded sample
+        last_usage = 0
+        last_prune = time.time()
+        while True:
+            start = time.time()
+            try:
+                record_usage = start - last_usage >= cls.USAGE_INTERVAL
+                if record_usage is True:
+                    last_usage = start
+                cls.record(recorded=recorded, record_usage=record_usage)
+                if start - last_prune >= cls.PRUNE_INTERVAL:
+                    last_prune = start
+                    resolution, buckets = TimeSeries.TIERS[-1]
+                    removed = TimeSeries.prune(max_age=resolution * buckets)
+                    if len(removed) > 0:
+                        cls._logger.info('Removed {0} stale time series'.format(len(removed)))
+            except Exception:
+                cls._logger.exception('Unexpected error in the time series recorder')
+            time.sleep(max(0, cls.RECORD_INTERVAL - (time.time() - start)))
+
+    @classmethod
+    def record(cls, recorded, record_usage):
+        # type: (dict, bool) -> None
+        """
+        Record the latest metrics of all slots and ASDs. Samples which were recorded before are skipped
+        :param recorded: Timestamp of the last recorded sample per series prefix. Updated in place
+        :type recorded: dict
+        :param record_usage: Record the disk usage as well
+        :type record_usage: bool
+        :return: None
+        :rtype: NoneType
+        """
+        latest = {}
+        for disk in DiskList.get_usable_disks():
+            slot_id = disk.aliases[0].split('/')[-1]
+            latest['slots/{0}'.format(slot_id)] = (DiskStats.get_latest(disk.name), DiskStats.METRICS)
+            if record_usage is True and disk.usage:
+                for key in ['used', 'available']:
+                    cls._record(series='slots/{0}/{1}'.format(slot_id, key), value=disk.usage[key])
+        for asd in ASDList.get_asds():
+            latest['asds/{0}'.format(asd.asd_id)] = (ProcessStats.get_latest(asd.asd_id), ProcessStats.METRICS)
+
+        for prefix, (values, metrics) in latest.iteritems():
+            if values is None or recorded.get(prefix) == values['timestamp']:
+                continue
+            recorded[prefix] = values['timestamp']
+            for metric in metrics:
+                cls._record(series='{0}/{1}'.format(prefix, metric), value=values[metric], timestamp=values['timestamp'])
+        for prefix in set(recorded) - set(latest):
+            recorded.pop(prefix)
+
+    @classmethod
+    def _record(cls, series, value, timestamp=None):
+        # type: (str, float, Optional[float]) -> None
+        """
+        Record a value, logging instead of raising when the series cannot be stored
+        """
+        try:
+            TimeSeries.record(series=series, value=value, timestamp=timestamp)
+        except TimeSeriesException as ex:
+            cls._logger.warning(str(ex))
@@ -0,0 +1,223 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+This module contains the trim controller (scheduled fstrim of the ASD filesystems)
+"""
+
+import os
+import re
+import time
+import datetime
+import threading
+from ovs_extensions.dal.base import ObjectNotFoundException
+from source.constants.asd import ASD_NODE_CONFIG_TRIM_LOCATION
+from source.dal.lists.disklist import DiskList
+from source.dal.lists.settinglist import SettingList
+from source.dal.objects.disk import Disk
+from source.tools.configuration import Configuration
+from source.tools.filesystem import FilesystemProfiles
+from source.tools.lazy import shared_instance
+from source.tools.lockmanager import LockManager
+from source.tools.logger import Logger
+
+
+class TrimController(object):
+    """
+    Trim controller class
+    Filesystems mounted without online discard are trimmed by this scheduler:
+        * Each disk is trimmed at most once every 'interval' seconds
+        * Two scheduled trims on this node are at least 'stagger' seconds apart and never run concurrently. A disk is never trimmed twice at the same time
+        * Trims only run inside one of the configured 'windows' (eg: [{'start': '01:00', 'end': '05:00'}]). No windows means always
+          A trim which reaches the end of its window stops after the current chunk and resumes at the next chunk in the next window
+        * The filesystem is trimmed in chunks of 'chunk_size' bytes with a pause of 'chunk_pause' seconds in between, to limit the load
+        * Every chunk holds the slot lock, so clearing or restarting the slot waits for at most one chunk. The trim stops once the filesystem is no longer mounted
+    """
+    CHECK_INTERVAL = 60
+    DEFAULT_SETTINGS = {'interval': 7 * 24 * 60 * 60,
+                        'stagger': 30 * 60,
+                        'windows': [],
+                        'chunk_size': 64 * 1024 ** 3,
+                        'chunk_pause': 5}
+
+    _last_trim_start = 0
+    _lock = threading.Lock()
+    _trimming = set()  # IDs of the disks being trimmed
+    _logger = Logger('controllers')
+    _local_client = shared_instance('local_client')
+
+    @classmethod
+    def get_settings(cls):
+        # type: () -> dict
+        """
+        Retrieve the trim settings of this node
+        :return: The trim settings
+        :rtype: dict
+        """
+        node_id = SettingList.get_setting_by_code(code='node_id').value
+        settings = cls.DEFAULT_SETTINGS.copy()
+        settings.update(Configuration.get(ASD_NODE_CONFIG_TRIM_LOCATION.format(node_id), default={}))
+        return settings
+
+    @classmethod
+    def get_trimmable_disks(cls):
+        # type: () -> List[Disk]
+        """
+        Retrieve all disks which rely on the trim scheduler
+        :return: The disks to trim
+        :rtype: list[source.dal.objects.disk.Disk]
+        """
+        profiles = FilesystemProfiles.get_config()[0]
+        return [disk for disk in DiskList.get_usable_disks()
+                if disk.available is False and disk.state != 'MISSING' and FilesystemProfiles.uses_scheduled_trim(disk=disk, profiles=profiles)]
+
+    @classmethod
+    def run(cls):
+        # type: () -> None
+        """
+        Run the trim scheduler. Does not return
+        :return: None
+        :rtype: NoneType
+        """
+        while True:
+            try:
+                cls.trim_next()
+            except Exception:
+                cls._logger.exception('Unexpected error in the trim scheduler')
+            time.sleep(cls.CHECK_INTERVAL)
+
+    @classmethod
+    def trim_next(cls):
+        # type: () -> Optional[Disk]
+        """
+        Trim the disk which has been waiting the longest, if the settings allow a trim right now
+        :return: The trimmed disk, if any
+        :rtype: source.dal.objects.disk.Disk
+        """
+        settings = cls.get_settings()
+        now = time.time()
+        if now - cls._last_trim_start < settings['stagger'] or not cls._in_window(settings['windows']):
+            return None
+        candidates = []
+        for disk in cls.get_trimmable_disks():
+            if disk.id in cls._trimming:
+                continue  # Being trimmed manually
+            trim_info = disk.trim_info or {}
+            last_trim = trim_info.get('start', 0)
+            if trim_info.get('next_offset') is not None or now - last_trim >= settings['interval']:
+                candidates.append((last_trim, disk))
+        if len(candidates) == 0:
+            return None
+        disk = sorted(candidates, key=lambda candidate: candidate[0])[0][1]
+        cls.trim(disk=disk, settings=settings, scheduled=True)
+        return disk
+
+    @classmethod
+    def trim(cls, disk, settings=None, scheduled=False):
+        # type: (Disk, dict, bool) -> dict
+        """
+        Trim the filesystem of a disk and store the result on the disk
+        :param disk: Disk to trim
+        :type disk: source.dal.objects.disk.Disk
+        :param settings: Trim settings. Defaults to the settings of this node
+        :type settings: dict
+        :param scheduled: Scheduled trims resume an interrupted trim and stop at the end of the trim windows. Other trims cover the whole filesystem
+        :type scheduled: bool
+        :return: The trim information (start, duration, trimmed bytes, offset to resume at and error, if any)
+        :rtype: dict
+        """
+        if settings is None:
+            settings = cls.get_settings()
+        if disk.mountpoint is None:
+            raise RuntimeError('Disk {0} is not mounted'.format(disk.name))
+        with cls._lock:
+            if disk.id in cls._trimming:
+                raise RuntimeError('Disk {0} is already being trimmed'.format(disk.name))
+            cls._trimming.add(disk.id)
+        try:
+            return cls._trim(disk=disk, settings=settings, scheduled=scheduled)
+        finally:
+            with cls._lock:
+                cls._trimming.discard(disk.id)
+
+    @classmethod
+    def _trim(cls, disk, settings, scheduled):
+        # type: (Disk, dict, bool) -> dict
+        """
+        Trim the filesystem of a disk chunk by chunk and store the result on the disk
+        """
+        mountpoint = disk.mountpoint
+        offset = 0
+        if scheduled is True:
+            offset = (disk.trim_info or {}).get('next_offset') or 0
+        cls._last_trim_start = time.time()
+        cls._logger.info('Disk {0} - Trimming {1} from offset {2}'.format(disk.name, disk.mountpoint, offset))
+        trim_info = {'start': cls._last_trim_start,
+                     'duration': None,
+                     'trimmed_bytes': 0,
+                     'next_offset': None,
+                     'error': None}
+        try:
+            while offset < disk.size:
+                if scheduled is True and not cls._in_window(settings['windows']):
+                    cls._logger.info('Disk {0} - Trim window ended, resuming at offset {1} in the next window'.format(disk.name, offset))
+                    trim_info['next_offset'] = offset
+                    break
+                with LockManager.locked(LockManager.get_slot_resource(disk)):
+                    if not os.path.ismount(mountpoint):
+                        raise RuntimeError('Disk {0} is no longer mounted on {1}'.format(disk.name, mountpoint))
+                    output = cls._local_client.run(['fstrim', '-v', '-o', str(offset), '-l', str(settings['chunk_size']), mountpoint])
+                match = re.search('\(([0-9]+) bytes\)', output)
+                if match is not None:
+                    trim_info['trimmed_bytes'] += int(match.groups()[0])
+                offset += settings['chunk_size']
+                if offset < disk.size:
+                    time.sleep(settings['chunk_pause'])
+        except Exception as ex:
+            cls._logger.exception('Disk {0} - Trimming failed'.format(disk.name))
+            trim_info['error'] = str(ex)
+        trim_info['duration'] = time.time() - trim_info['start']
+        cls._logger.info('Disk {0} - Trimmed {1} bytes in {2:.1f}s'.format(disk.name, trim_info['trimmed_bytes'], trim_info['duration']))
+
+        try:
+            disk = Disk(disk.id)
+        except ObjectNotFoundException:
+            return trim_info  # Removed meanwhile
+        disk.trim_info = trim_info
+        disk.save()
+        return trim_info
+
+    @staticmethod
+    def _in_window(windows):
+        # type: (List[dict]) -> bool
+        """
+        Verify whether the current time is inside one of the windows
+        :param windows: Windows with a 'start' and 'end' time (HH:MM). A window can span midnight
+        :type windows: list[dict]
+        :return: True if no windows are configured or the current time is inside one of them
+        :rtype: bool
+        """
+        if len(windows) == 0:
+            return True
+        now = datetime.datetime.now().strftime('%H:%M')
+        for window in windows:
+            start, end = window['start'], window['end']
+            if start <= end:
+                if start <= now < end:
+                    return True
+            elif now >= start or now < end:
+                return True
+        return False
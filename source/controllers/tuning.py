@@ -0,0 +1,201 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+This module contains the tuning controller (memory budgeting of the ASDs)
+"""
+
+import copy
+import signal
+from source.constants.asd import ASD_NODE_CONFIG_TUNING_LOCATION
+from source.dal.lists.asdlist import ASDList
+from source.dal.lists.settinglist import SettingList
+from source.dal.objects.disk import Disk
+from source.tools.configuration import Configuration
+from source.tools.lazy import shared_instance
+from source.tools.lockmanager import DeadlockError, LockManager
+from source.tools.logger import Logger
+
+
+class TuningController(object):
+    """
+    Tuning controller class
+    The tuning profile defines which share of the node's memory can be used by the ASDs and how that share is spread over the
+    ASDs, based on the class of the disk they are running on ('hdd', 'ssd' or 'nvme').
+    Each ASD receives a part of the budget proportional to the weight of its disk class, bounded by the class' minimum and maximum.
+    ASDs on a disk class with weight 0 do not receive a block cache and fall back to the defaults of ALBA.
+    The static 'config' of a disk class is written as-is into the configuration of each ASD of that class.
+    """
+    MEMINFO_PATH = '/proc/meminfo'
+    MANAGED_KEYS = ['rocksdb_block_cache_size']
+    DEFAULT_PROFILE = {'memory_share': 0.1,
+                       'classes': {Disk.CLASS_HDD: {'weight': 1,
+                                                    'minimum': 32 * 1024 * 1024,  # 32 MiB
+                                                    'maximum': 1024 * 1024 * 1024,  # 1 GiB
+                                                    'config': {}},
+                                   Disk.CLASS_SSD: {'weight': 0,
+                                                    'minimum': 0,
+                                                    'maximum': 0,
+                                                    'config': {}},
+                                   Disk.CLASS_NVME: {'weight': 0,
+                                                     'minimum': 0,
+                                                     'maximum': 0,
+                                                     'config': {}}}}
+
+    _logger = Logger('controllers')
+    _local_client = shared_instance('local_client')
+    _service_manager = shared_instance('service_manager')
+
+    @classmethod
+    def get_profile(cls):
+        # type: () -> dict
+        """
+        Retrieve the tuning profile of this node. Values which are not configured are taken from the default profile
+        :return: The tuning profile
+        :rtype: dict
+        """
+        node_id = SettingList.get_setting_by_code(code='node_id').value
+        configured = Configuration.get(ASD_NODE_CONFIG_TUNING_LOCATION.format(node_id), default={})
+        profile = copy.deepcopy(cls.DEFAULT_PROFILE)
+        profile['memory_share'] = configured.get('memory_share', profile['memory_share'])
+        for disk_class, class_info in configured.get('classes', {}).iteritems():
+            profile['classes'].setdefault(disk_class, {'weight': 0, 'minimum': 0, 'maximum': 0, 'config': {}}).update(class_info)
+        return profile
+
+    @classmethod
+    def get_node_memory(cls):
+        # type: () -> int
+        """
+        Retrieve the total amount of memory of this node
+        :return: The total memory in bytes
+        :rtype: int
+        """
+        with open(cls.MEMINFO_PATH) as meminfo:
+            for line in meminfo:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) * 1024
+        raise RuntimeError('Could not determine the total memory of the node')
+
+    @classmethod
+    def calculate(cls, asds, profile=None, node_memory=None):
+        # type: (List[source.dal.objects.asd.ASD], dict, int) -> dict
+        """
+        Calculate the tuning values for the ASDs specified
+        :param asds: All ASDs which share the memory budget
+        :type asds: list[source.dal.objects.asd.ASD]
+        :param profile: Tuning profile to use. Defaults to the profile of this node
+        :type profile: dict
+        :param node_memory: Memory of the node in bytes. Defaults to the memory found on this node
+        :type node_memory: int
+        :return: The configuration values to set per ASD ID. Managed keys mapped onto None must be removed
+        :rtype: dict
+        """
+        if profile is None:
+            profile = cls.get_profile()
+        if node_memory is None:
+            node_memory = cls.get_node_memory()
+
+        weights = {}
+        asd_classes = {}
+        for asd in asds:
+            disk_class = asd.disk.disk_class
+            if disk_class not in profile['classes']:
+                disk_class = Disk.CLASS_HDD
+            asd_classes[asd.asd_id] = disk_class
+            weights[asd.asd_id] = profile['classes'][disk_class]['weight']
+
+        budget = int(node_memory * profile['memory_share'])
+        total_weight = sum(weights.itervalues())
+        cache_sizes = {}
+        for asd_id, weight in weights.iteritems():
+            if weight <= 0 or total_weight == 0:
+                continue
+            class_info = profile['classes'][asd_classes[asd_id]]
+            cache_size = budget * weight / total_weight
+            if class_info['maximum'] > 0:
+                cache_size = min(cache_size, class_info['maximum'])
+            cache_sizes[asd_id] = max(cache_size, class_info['minimum'])
+        total_cache_size = sum(cache_sizes.itervalues())
+        if total_cache_size > budget:
+            # Minimum sizes would overcommit the budget, so scale everything down
+            cls._logger.warning('Tuning minimums exceed the memory budget of {0}B, scaling down'.format(budget))
+            for asd_id in cache_sizes:
+                cache_sizes[asd_id] = cache_sizes[asd_id] * budget / total_cache_size
+
+        tuning = {}
+        for asd_id, disk_class in asd_classes.iteritems():
+            values = dict((key, None) for key in cls.MANAGED_KEYS)
+            values.update(profile['classes'][disk_class].get('config', {}))
+            if asd_id in cache_sizes:
+                values['rocksdb_block_cache_size'] = int(cache_sizes[asd_id])
+            tuning[asd_id] = values
+        return tuning
+
+    @staticmethod
+    def apply_to_config(config, values):
+        # type: (dict, dict) -> bool
+        """
+        Apply calculated tuning values onto an ASD configuration
+        :param config: ASD configuration to update
+        :type config: dict
+        :param values: Tuning values for the ASD (as returned by 'calculate')
+        :type values: dict
+        :return: Whether the configuration has been changed
+        :rtype: bool
+        """
+        changed = False
+        for key, value in values.iteritems():
+            if value is None:
+                if key in config:
+                    config.pop(key)
+                    changed = True
+            elif config.get(key) != value:
+                config[key] = value
+                changed = True
+        return changed
+
+    @classmethod
+    def apply_profile(cls, skip=None):
+        # type: (List[str]) -> None
+        """
+        Re-apply the tuning profile onto all ASDs of this node and send a SIGUSR1 to each ASD of which the configuration changed
+        :param skip: IDs of ASDs for which the configuration should not be updated
+        :type skip: list[str]
+        :return: None
+        :rtype: NoneType
+        """
+        skip = skip or []
+        asds = [asd for asd in ASDList.get_asds() if asd.has_config]
+        tuning = cls.calculate(asds=asds)
+        for asd in asds:
+            if asd.asd_id in skip:
+                continue
+            try:
+                # The configuration is read, changed and written back: hold the ASD lock so concurrent updates of the ASD are not lost
+                with LockManager.locked('asd:{0}'.format(asd.asd_id)):
+                    config = Configuration.get(asd.config_key)
+                    if cls.apply_to_config(config=config, values=tuning[asd.asd_id]) is False:
+                        continue
+                    cls._logger.info('Applying tuning profile on ASD {0}'.format(asd.asd_id))
+                    Configuration.set(asd.config_key, config)
+            except DeadlockError:
+                # The thread holding this ASD re-applies the profile itself (eg: two ASDs being removed at the same time)
+                cls._logger.info('Skipped applying the tuning profile on ASD {0}, it is locked by a thread waiting for this one'.format(asd.asd_id))
+                continue
+            try:
+                cls._service_manager.send_signal(asd.service_name, signal.SIGUSR1, cls._local_client)
+            except Exception as ex:
+                cls._logger.info('Could not send signal to ASD {0} for reloading the tuning: {1}'.format(asd.asd_id, ex))
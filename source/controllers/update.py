@@ -23,14 +23,15 @@ import json
 from subprocess import CalledProcessError
 from ovs_extensions.constants.alba import MAINTENANCE_PREFIX
 from ovs_extensions.dal.base import ObjectNotFoundException
-from ovs_extensions.generic.sshclient import SSHClient
-from source.asdmanager import BOOTSTRAP_FILE
-from source.constants.asd import ASD_NODE_CONFIG_MAIN_LOCATION
+from source.constants.asd import ASD_NODE_CONFIG_MAIN_LOCATION, BOOTSTRAP_FILE
 from source.controllers.asd import ASDController
 from source.controllers.maintenance import MaintenanceController
 from source.dal.lists.settinglist import SettingList
+from source.dal.objects.asd import ASD
 from source.dal.objects.setting import Setting
 from source.tools.configuration import Configuration
+from source.tools.lazy import shared_instance
+from source.tools.lockmanager import LockManager
 from source.tools.logger import Logger
 from source.tools.packagefactory import PackageFactory
 from source.tools.servicefactory import ServiceFactory
@@ -41,10 +42,10 @@ class SDMUpdateController(object):
     """
     Update Controller class for SDM package
     """
-    _local_client = SSHClient(endpoint='127.0.0.1', username='root')
+    _local_client = shared_instance('local_client')
     _logger = Logger(name='update', forced_target_type='file')
-    _package_manager = PackageFactory.get_manager()
-    _service_manager = ServiceFactory.get_manager()
+    _package_manager = shared_instance('package_manager')
+    _service_manager = shared_instance('service_manager')
 
     @classmethod
     def get_package_information(cls):
@@ -147,8 +148,14 @@ class SDMUpdateController(object):
                 continue
 
             cls._logger.info('Restarting service {0}'.format(service_name))
+            # ASD services share the lock of their ASD, so they are not restarted while being removed or updated
+            if service_name.startswith(ASD.ASD_SERVICE_PREFIX.format('')):
+                resource = 'asd:{0}'.format(service_name[len(ASD.ASD_SERVICE_PREFIX.format('')):])
+            else:
+                resource = 'service:{0}'.format(service_name)
             try:
-                cls._service_manager.restart_service(service_name, cls._local_client)
+                with LockManager.locked(resource):
+                    cls._service_manager.restart_service(service_name, cls._local_client)
             except CalledProcessError:
                 cls._logger.exception('Failed to restart service {0}'.format(service_name))
 
@@ -57,18 +57,31 @@ class DiskList(object):
     def get_by_alias(alias):
         """
         Gets a Disk by its alias.
+        Only the disks of which the stored aliases or partitions contain the alias are verified. When none of them match
+        (eg: the alias is stored escaped), all usable disks are verified
         :param alias: Alias to search
         :type alias: str
         :return: The found Disk
         :rtype: source.dal.objects.disk.Disk
         """
-        for disk in DiskList.get_usable_disks():
-            for disk_alias in disk.aliases:
-                if disk_alias.endswith(alias):
+        candidates = DataList.query(object_type=Disk,
+                                    query='SELECT id FROM {table} WHERE aliases LIKE :alias OR partitions LIKE :alias',
+                                    parameters={'alias': '%{0}%'.format(alias)})
+        for disks in [candidates, DiskList.get_disks()]:
+            for disk in disks:
+                if DiskList._has_alias(disk, alias) and disk.usable:
                     return disk
-            partition_aliases = []
-            for partition_info in disk.partitions:
-                partition_aliases += partition_info['aliases']
-            if alias in partition_aliases:
-                return disk
         raise ObjectNotFoundException('Disk with alias {0} not available'.format(alias))
+
+    @staticmethod
+    def _has_alias(disk, alias):
+        """
+        Verify whether an alias belongs to a disk: an alias of the disk ends with it or it is an alias of one of its partitions
+        """
+        for disk_alias in disk.aliases:
+            if disk_alias.endswith(alias):
+                return True
+        for partition_info in disk.partitions:
+            if alias in partition_info['aliases']:
+                return True
+        return False
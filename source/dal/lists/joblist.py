@@ -0,0 +1,45 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+JobList module
+"""
+
+from ovs_extensions.dal.datalist import DataList
+from source.dal.objects.job import Job
+
+
+# noinspection SqlNoDataSourceInspection
+class JobList(object):
+    """
+    This JobList class contains various lists regarding to the Job class
+    """
+
+    @staticmethod
+    def get_jobs():
+        """
+        Returns a list of all Jobs, oldest first
+        """
+        return DataList.query(object_type=Job, query='SELECT id FROM {table} ORDER BY id')
+
+    @staticmethod
+    def get_jobs_by_status(statuses):
+        """
+        Returns a list of all Jobs with one of the given statuses, oldest first
+        :param statuses: Statuses to filter on
+        :type statuses: list
+        """
+        return [job for job in JobList.get_jobs() if job.status in statuses]
@@ -19,11 +19,11 @@ This is the ASD module
 """
 
 from ovs_extensions.dal.structures import Property
-from ovs_extensions.generic.sshclient import SSHClient
 from source.dal.asdbase import ASDBase
 from source.dal.objects.disk import Disk
 from source.tools.configuration import Configuration
-from source.tools.servicefactory import ServiceFactory
+from source.tools.lazy import shared_instance
+from source.tools.processstats import ProcessStats
 
 
 class ASD(ASDBase):
@@ -33,8 +33,8 @@ class ASD(ASDBase):
 
     ASD_CONFIG = '/ovs/alba/asds/{0}/config'
     ASD_SERVICE_PREFIX = 'alba-asd-{0}'
-    _local_client = SSHClient(endpoint='127.0.0.1', username='root')
-    _service_manager = ServiceFactory.get_manager()
+    _local_client = shared_instance('local_client')
+    _service_manager = shared_instance('service_manager')
 
     _table = 'asd'
     _properties = [Property(name='port', property_type=int, unique=True, mandatory=True),
@@ -44,6 +44,16 @@ class ASD(ASDBase):
     _relations = [['disk', Disk, 'asds']]
     _dynamics = ['service_name', 'config_key', 'has_config']
 
+    # Fields of the export which only use the model (the others are read from the configuration or determine the state)
+    EXPORT_FIELDS = {'ips': lambda asd: asd.hosts,
+                     'port': lambda asd: asd.port,
+                     'asd_id': lambda asd: asd.asd_id,
+                     'folder': lambda asd: asd.folder,
+                     'process': lambda asd: ProcessStats.get_latest(asd.asd_id)}
+    STATE_FIELDS = ['state', 'state_detail']
+    # Fields of the configuration which can be exported separately. Node specific extra configuration is only part of the full export
+    CONFIG_FIELDS = ['home', 'node_id', 'capacity', 'multicast', 'transport', 'log_level', 'rora_port', 'rora_transport', 'rocksdb_block_cache_size']
+
     def _service_name(self):
         return ASD.ASD_SERVICE_PREFIX.format(self.asd_id)
 
@@ -53,42 +63,53 @@ class ASD(ASDBase):
     def _has_config(self):
         return Configuration.exists(self.config_key)
 
-    def export(self):
+    def export(self, fields=None):
         """
         Exports the ASD information to a dict structure
+        :param fields: Names of the fields to export. Defaults to all fields
+                       The fields of EXPORT_FIELDS only use the model, STATE_FIELDS execute a command and query the service manager,
+                       CONFIG_FIELDS (and any other field) are read from the configuration of the ASD
+        :type fields: list
         :return: Representation of the ASD as dict
         :rtype: dict
         """
-        if not self.has_config:
-            raise RuntimeError('No configuration found for ASD {0}'.format(self.asd_id))
-        data = Configuration.get(self.config_key)
-        for prop in self._properties:
-            if prop.name == 'hosts':
-                data['ips'] = getattr(self, prop.name)
-            else:
-                data[prop.name] = getattr(self, prop.name)
-        if self.disk.state == 'MISSING':
-            data.update({'state': 'error',
-                         'state_detail': 'missing'})
-        else:
-            output, error = ASD._local_client.run(['ls', '{0}/{1}/'.format(self.disk.mountpoint, self.folder)],
-                                                  allow_nonzero=True, return_stderr=True)
-            output += error
-            if 'Input/output error' in output:
-                data.update({'state': 'error',
-                             'state_detail': 'io_error'})
-            elif ASD._service_manager.has_service(self.service_name, ASD._local_client):
-                service_state = ASD._service_manager.get_service_status(self.service_name, ASD._local_client)
-                if service_state == 'activating':
-                    data.update({'state': 'warning',
-                                 'state_detail': 'service_activating'})
-                elif service_state == 'active':
-                    data.update({'state': 'ok',
-                                 'state_detail': None})
-                else:
-                    data.update({'state': 'error',
-                                 'state_detail': 'service_failure'})
-            else:
-                data.update({'state': 'error',
-                             'state_detail': 'service_failure'})
+        config_fields = None if fields is None else [field for field in fields if field not in ASD.EXPORT_FIELDS and field not in ASD.STATE_FIELDS]
+        data = {}
+        if config_fields is None or len(config_fields) > 0:
+            if not self.has_config:
+                raise RuntimeError('No configuration found for ASD {0}'.format(self.asd_id))
+            config = Configuration.get(self.config_key)
+            data = config if config_fields is None else dict((field, config[field]) for field in config_fields if field in config)
+        for field, function in ASD.EXPORT_FIELDS.iteritems():
+            if fields is None or field in fields:
+                data[field] = function(self)
+        if fields is None or any(field in fields for field in ASD.STATE_FIELDS):
+            state = self._get_state()
+            data.update((field, state[field]) for field in ASD.STATE_FIELDS if fields is None or field in fields)
         return data
+
+    def _get_state(self):
+        """
+        Determine the state of the ASD, based on its disk and service
+        :return: The state and state_detail
+        :rtype: dict
+        """
+        if self.disk.state == 'MISSING':
+            return {'state': 'error',
+                    'state_detail': 'missing'}
+        output, error = ASD._local_client.run(['ls', '{0}/{1}/'.format(self.disk.mountpoint, self.folder)],
+                                              allow_nonzero=True, return_stderr=True)
+        output += error
+        if 'Input/output error' in output:
+            return {'state': 'error',
+                    'state_detail': 'io_error'}
+        if ASD._service_manager.has_service(self.service_name, ASD._local_client):
+            service_state = ASD._service_manager.get_service_status(self.service_name, ASD._local_client)
+            if service_state == 'activating':
+                return {'state': 'warning',
+                        'state_detail': 'service_activating'}
+            if service_state == 'active':
+                return {'state': 'ok',
+                        'state_detail': None}
+        return {'state': 'error',
+                'state_detail': 'service_failure'}
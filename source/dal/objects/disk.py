@@ -19,9 +19,11 @@ This is the Disk's module
 """
 
 from ovs_extensions.dal.structures import Property
-from ovs_extensions.generic.sshclient import SSHClient
 from source.dal.asdbase import ASDBase
 from source.dal.lists.settinglist import SettingList
+from source.tools.diskstats import DiskStats
+from source.tools.health import DiskHealth
+from source.tools.lazy import shared_instance
 
 
 class Disk(ASDBase):
@@ -29,7 +31,7 @@ class Disk(ASDBase):
     Represents a disk on the system.
     """
 
-    _local_client = SSHClient(endpoint='127.0.0.1', username='root')
+    _local_client = shared_instance('local_client')
 
     _table = 'disk'
     _properties = [Property(name='name', property_type=str, unique=True, mandatory=True),
@@ -39,9 +41,32 @@ class Disk(ASDBase):
                    Property(name='model', property_type=str, unique=False, mandatory=False),
                    Property(name='size', property_type=int, unique=False, mandatory=True),
                    Property(name='serial', property_type=str, unique=True, mandatory=False),
-                   Property(name='partitions', property_type=list, unique=False, mandatory=False)]
+                   Property(name='partitions', property_type=list, unique=False, mandatory=False),
+                   Property(name='filesystem_profile', property_type=str, unique=False, mandatory=False),
+                   Property(name='trim_info', property_type=dict, unique=False, mandatory=False),
+                   Property(name='baseline', property_type=dict, unique=False, mandatory=False)]
     _relations = []
-    _dynamics = ['mountpoint', 'available', 'usable', 'status', 'usage', 'partition_aliases']
+    _dynamics = ['mountpoint', 'available', 'usable', 'status', 'usage', 'partition_aliases', 'disk_class']
+
+    CLASS_HDD = 'hdd'
+    CLASS_SSD = 'ssd'
+    CLASS_NVME = 'nvme'
+    # Fields of the export. Only usage (df), state and state_detail (ls) execute commands
+    EXPORT_FIELDS = {'size': lambda disk: disk.size,
+                     'usage': lambda disk: disk.usage,
+                     'state': lambda disk: disk.status['state'],
+                     'device': lambda disk: '/dev/{0}'.format(disk.name),
+                     'aliases': lambda disk: disk.aliases,
+                     'node_id': lambda disk: SettingList.get_setting_by_code(code='node_id').value,
+                     'available': lambda disk: disk.available,
+                     'mountpoint': lambda disk: disk.mountpoint,
+                     'state_detail': lambda disk: disk.status.get('detail', ''),
+                     'partition_amount': lambda disk: len(disk.partitions),
+                     'filesystem_profile': lambda disk: disk.filesystem_profile,
+                     'partition_aliases': lambda disk: disk.partition_aliases,
+                     'health': lambda disk: DiskHealth.get(disk),
+                     'baseline': lambda disk: disk.baseline,
+                     'io_stats': lambda disk: DiskStats.get_latest(disk.name)}
 
     def _mountpoint(self):
         for partition in self.partitions:
@@ -105,20 +130,21 @@ class Disk(ASDBase):
             partition_aliases += partition_info['aliases']
         return partition_aliases
 
-    def export(self):
+    def _disk_class(self):
+        if self.name is not None and self.name.startswith('nvme'):
+            return Disk.CLASS_NVME
+        if self.is_ssd is True:
+            return Disk.CLASS_SSD
+        return Disk.CLASS_HDD
+
+    def export(self, fields=None):
         """
         Exports this Disk's information to a dict structure
+        :param fields: Names of the fields to export (see EXPORT_FIELDS). Defaults to all fields
+        :type fields: list
         :return: Representation of the Disk as dict
         :rtype: dict
         """
-        return {'size': self.size,
-                'usage': self.usage,
-                'state': self.status['state'],
-                'device': '/dev/{0}'.format(self.name),
-                'aliases': self.aliases,
-                'node_id': SettingList.get_setting_by_code(code='node_id').value,
-                'available': self.available,
-                'mountpoint': self.mountpoint,
-                'state_detail': self.status.get('detail', ''),
-                'partition_amount': len(self.partitions),
-                'partition_aliases': self.partition_aliases}
+        if fields is None:
+            fields = Disk.EXPORT_FIELDS.keys()
+        return dict((field, Disk.EXPORT_FIELDS[field](self)) for field in fields if field in Disk.EXPORT_FIELDS)
@@ -0,0 +1,58 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+This is the Job's module
+"""
+
+from ovs_extensions.dal.structures import Property
+from source.dal.asdbase import ASDBase
+
+
+class Job(ASDBase):
+    """
+    Represents a long-running operation executed in the background
+    """
+    STATUS_QUEUED = 'QUEUED'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_SUCCESS = 'SUCCESS'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CANCELLED = 'CANCELLED'
+    FINISHED_STATUSES = [STATUS_SUCCESS, STATUS_FAILED, STATUS_CANCELLED]
+
+    _table = 'job'
+    _properties = [Property(name='name', property_type=str, unique=False, mandatory=True),
+                   Property(name='arguments', property_type=dict, unique=False, mandatory=False),
+                   Property(name='status', property_type=str, unique=False, mandatory=True),
+                   Property(name='progress', property_type=list, unique=False, mandatory=False),
+                   Property(name='result', property_type=None, unique=False, mandatory=False),
+                   Property(name='error', property_type=str, unique=False, mandatory=False),
+                   Property(name='created', property_type=float, unique=False, mandatory=True),
+                   Property(name='started', property_type=float, unique=False, mandatory=False),
+                   Property(name='finished', property_type=float, unique=False, mandatory=False)]
+    _relations = []
+    _dynamics = []
+
+    def export(self):
+        """
+        Exports the Job information to a dict structure
+        :return: Representation of the Job as dict
+        :rtype: dict
+        """
+        data = {'id': self.id}
+        for prop in self._properties:
+            data[prop.name] = getattr(self, prop.name)
+        return data
@@ -0,0 +1,176 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Disk baseline module, measures the raw performance of a disk using direct I/O
+"""
+
+import os
+import mmap
+import time
+import ctypes
+import ctypes.util
+import random
+from source.constants.asd import ASD_NODE_CONFIG_BASELINE_LOCATION
+from source.dal.lists.settinglist import SettingList
+from source.tools.configuration import Configuration
+
+
+class DiskBaseline(object):
+    """
+    Short, bounded performance baseline of a disk
+    Measures the latency of random 4 KiB reads and writes and the throughput of sequential 1 MiB reads and writes, bypassing the page cache
+    The writes destroy the data on the disk, so the baseline can only be taken while preparing a disk
+    """
+    DEFAULT_SETTINGS = {'enabled': False,
+                        'samples': 64,          # Amount of random reads and random writes
+                        'sequential_mib': 128,  # Amount of MiB read and written sequentially
+                        'max_duration': 30,     # Upper bound per phase in seconds
+                        'slow_factor': 0.5}     # Disks performing worse than this fraction of the median of their class are flagged
+    MIN_CLASS_SIZE = 3  # Minimum amount of disks with a baseline in a class to compare against the median
+
+    BLOCK_SIZE = 4096
+    SEQUENTIAL_BLOCK_SIZE = 1024 ** 2
+
+    _libc = None
+
+    @classmethod
+    def get_settings(cls):
+        # type: () -> dict
+        """
+        Retrieve the baseline settings of this node
+        :return: The baseline settings
+        :rtype: dict
+        """
+        node_id = SettingList.get_setting_by_code(code='node_id').value
+        settings = cls.DEFAULT_SETTINGS.copy()
+        settings.update(Configuration.get(ASD_NODE_CONFIG_BASELINE_LOCATION.format(node_id), default={}))
+        return settings
+
+    @classmethod
+    def measure(cls, device, settings=None):
+        # type: (str, Optional[dict]) -> dict
+        """
+        Measure the baseline of a device
+        :param device: Path of the device (eg: /dev/disk/by-id/wwn-0x5000c500a1b2c3d4)
+        :type device: str
+        :param settings: Baseline settings, see DEFAULT_SETTINGS
+        :type settings: dict
+        :return: Latencies (ms) and throughputs (MiB/s)
+        :rtype: dict
+        """
+        settings = dict(cls.DEFAULT_SETTINGS, **(settings or {}))
+        if cls._libc is None:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            for function in [libc.pread, libc.pwrite]:
+                function.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_longlong]
+                function.restype = ctypes.c_ssize_t
+            cls._libc = libc
+
+        start = time.time()
+        # Anonymous memory maps are page aligned, as required for direct I/O
+        buffer_map = mmap.mmap(-1, cls.SEQUENTIAL_BLOCK_SIZE)
+        buffer_map.write(os.urandom(cls.SEQUENTIAL_BLOCK_SIZE))
+        buffer_address = ctypes.addressof(ctypes.c_char.from_buffer(buffer_map))
+        fd = os.open(device, os.O_RDWR | os.O_DIRECT | os.O_DSYNC)
+        try:
+            size = os.lseek(fd, 0, os.SEEK_END)
+            blocks = size // cls.BLOCK_SIZE
+            offsets = [random.randrange(blocks) * cls.BLOCK_SIZE for _ in xrange(settings['samples'])]
+            read_latencies = cls._time_calls(cls._libc.pread, fd, buffer_address, cls.BLOCK_SIZE, offsets, settings['max_duration'])
+            write_latencies = cls._time_calls(cls._libc.pwrite, fd, buffer_address, cls.BLOCK_SIZE, offsets, settings['max_duration'])
+
+            count = min(settings['sequential_mib'], size // cls.SEQUENTIAL_BLOCK_SIZE)
+            offsets = [index * cls.SEQUENTIAL_BLOCK_SIZE for index in xrange(count)]
+            read_times = cls._time_calls(cls._libc.pread, fd, buffer_address, cls.SEQUENTIAL_BLOCK_SIZE, offsets, settings['max_duration'])
+            write_times = cls._time_calls(cls._libc.pwrite, fd, buffer_address, cls.SEQUENTIAL_BLOCK_SIZE, offsets, settings['max_duration'])
+        finally:
+            os.close(fd)
+            buffer_map.close()
+
+        read_p50, read_p99 = cls._percentile(read_latencies, 50), cls._percentile(read_latencies, 99)
+        write_p50, write_p99 = cls._percentile(write_latencies, 50), cls._percentile(write_latencies, 99)
+        return {'timestamp': start,
+                'duration': time.time() - start,
+                'read_latency_p50': read_p50 * 1000 if read_p50 is not None else None,
+                'read_latency_p99': read_p99 * 1000 if read_p99 is not None else None,
+                'write_latency_p50': write_p50 * 1000 if write_p50 is not None else None,
+                'write_latency_p99': write_p99 * 1000 if write_p99 is not None else None,
+                'read_throughput': len(read_times) / sum(read_times) if sum(read_times) > 0 else None,
+                'write_throughput': len(write_times) / sum(write_times) if sum(write_times) > 0 else None}
+
+    @classmethod
+    def get_outliers(cls, disks, slow_factor=None):
+        # type: (List[Disk], Optional[float]) -> dict
+        """
+        Compare the baselines of the disks with the median of their disk class
+        :param disks: Disks to compare
+        :type disks: list[source.dal.objects.disk.Disk]
+        :param slow_factor: Disks performing worse than this fraction of the median are flagged
+        :type slow_factor: float
+        :return: Per disk ID the metrics in which the disk is an outlier
+        :rtype: dict
+        """
+        if slow_factor is None:
+            slow_factor = cls.DEFAULT_SETTINGS['slow_factor']
+        per_class = {}
+        for disk in disks:
+            if disk.baseline:
+                per_class.setdefault(disk.disk_class, []).append(disk)
+        outliers = {}
+        for class_disks in per_class.itervalues():
+            if len(class_disks) < cls.MIN_CLASS_SIZE:
+                continue
+            for metric, higher_is_better in [('read_throughput', True), ('write_throughput', True),
+                                             ('read_latency_p99', False), ('write_latency_p99', False)]:
+                values = [disk.baseline[metric] for disk in class_disks if disk.baseline.get(metric) is not None]
+                if len(values) < cls.MIN_CLASS_SIZE:
+                    continue
+                median = cls._percentile(values, 50)
+                for disk in class_disks:
+                    value = disk.baseline.get(metric)
+                    if value is None:
+                        continue
+                    if (higher_is_better is True and value < median * slow_factor) or (higher_is_better is False and value * slow_factor > median):
+                        outliers.setdefault(disk.id, []).append(metric)
+        return outliers
+
+    @staticmethod
+    def _time_calls(function, fd, buffer_address, length, offsets, max_duration):
+        # type: (callable, int, int, int, List[int], float) -> List[float]
+        """
+        Time a read or write call for every offset, stopping early when the maximum duration has been exceeded
+        :return: The duration of every call
+        :rtype: list[float]
+        """
+        durations = []
+        deadline = time.time() + max_duration
+        for offset in offsets:
+            start = time.time()
+            if function(fd, buffer_address, length, offset) != length:
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            durations.append(time.time() - start)
+            if durations[-1] + start > deadline:
+                break
+        return durations
+
+    @staticmethod
+    def _percentile(values, percent):
+        # type: (List[float], float) -> Optional[float]
+        if len(values) == 0:
+            return None
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100.0))]
@@ -0,0 +1,218 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Block layer queue related code
+"""
+
+import os
+import copy
+from source.constants.asd import ASD_NODE_CONFIG_BLOCK_QUEUE_LOCATION
+from source.dal.lists.settinglist import SettingList
+from source.dal.objects.disk import Disk
+from source.tools.configuration import Configuration
+from source.tools.lazy import shared_instance
+from source.tools.logger import Logger
+
+
+class BlockQueue(object):
+    """
+    Applies the block queue profile of a disk class onto the disks used by ALBA
+    The profiles are persisted through a generated udev rules file, so they survive reboots and hot-plugs
+    A 'scheduler' can be given as a list of schedulers in order of preference, the first one supported by the kernel is used
+    """
+    SYSFS_ROOT = '/sys'
+    UDEV_RULES_FILE = '/etc/udev/rules.d/99-alba-asd-queue.rules'
+    DEFAULT_PROFILES = {Disk.CLASS_HDD: {'scheduler': ['mq-deadline', 'deadline'],
+                                         'nr_requests': 128,
+                                         'read_ahead_kb': 512,
+                                         'rq_affinity': 2},
+                        Disk.CLASS_SSD: {'scheduler': ['none', 'noop'],
+                                         'nr_requests': 256,
+                                         'read_ahead_kb': 16,
+                                         'rq_affinity': 2},
+                        Disk.CLASS_NVME: {'scheduler': ['none'],
+                                          'read_ahead_kb': 16,
+                                          'rq_affinity': 2}}
+
+    _logger = Logger('tools')
+    _local_client = shared_instance('local_client')
+
+    @classmethod
+    def get_profiles(cls):
+        # type: () -> dict
+        """
+        Retrieve the block queue profiles of this node. Disk classes which are not configured use the default profile
+        :return: The profile per disk class
+        :rtype: dict
+        """
+        node_id = SettingList.get_setting_by_code(code='node_id').value
+        profiles = copy.deepcopy(cls.DEFAULT_PROFILES)
+        profiles.update(Configuration.get(ASD_NODE_CONFIG_BLOCK_QUEUE_LOCATION.format(node_id), default={}))
+        return profiles
+
+    @classmethod
+    def read(cls, disk):
+        # type: (Disk) -> dict
+        """
+        Read the current queue settings of a disk
+        :param disk: Disk to read the settings for
+        :type disk: source.dal.objects.disk.Disk
+        :return: The current value per queue attribute. For the scheduler, only the active one is returned (None when the disk offers no scheduler)
+        :rtype: dict
+        """
+        values = {}
+        queue_dir = os.path.join(cls.SYSFS_ROOT, 'block', disk.name, 'queue')
+        for attribute in ['scheduler', 'nr_requests', 'read_ahead_kb', 'rq_affinity']:
+            try:
+                with open(os.path.join(queue_dir, attribute)) as queue_file:
+                    value = queue_file.read().strip()
+            except IOError:
+                continue
+            if attribute == 'scheduler':
+                schedulers = cls._parse_schedulers(value)
+                values[attribute] = schedulers[0] if len(schedulers) > 0 else None
+            else:
+                values[attribute] = int(value)
+        return values
+
+    @classmethod
+    def get_drift(cls, disk, profiles=None):
+        # type: (Disk, dict) -> dict
+        """
+        Compare the queue settings of a disk with the profile of its disk class
+        :param disk: Disk to compare
+        :type disk: source.dal.objects.disk.Disk
+        :param profiles: Profiles to compare with. Defaults to the profiles of this node
+        :type profiles: dict
+        :return: The expected and actual value of each attribute which deviates from the profile
+        :rtype: dict
+        """
+        if profiles is None:
+            profiles = cls.get_profiles()
+        current = cls.read(disk)
+        drift = {}
+        for attribute, expected in profiles.get(disk.disk_class, {}).iteritems():
+            actual = current.get(attribute)
+            if attribute == 'scheduler':
+                if actual is None:
+                    continue  # The disk offers no scheduler to choose from
+                if not isinstance(expected, list):
+                    expected = [expected]
+                expected = cls._select_scheduler(disk, expected) or expected[0]
+            if actual != expected:
+                drift[attribute] = {'expected': expected,
+                                    'actual': actual}
+        return drift
+
+    @classmethod
+    def apply(cls, disk, profiles=None):
+        # type: (Disk, dict) -> None
+        """
+        Apply the profile of the disk class onto the queue of a disk
+        :param disk: Disk to apply the profile on
+        :type disk: source.dal.objects.disk.Disk
+        :param profiles: Profiles to apply. Defaults to the profiles of this node
+        :type profiles: dict
+        :return: None
+        :rtype: NoneType
+        """
+        if profiles is None:
+            profiles = cls.get_profiles()
+        queue_dir = os.path.join(cls.SYSFS_ROOT, 'block', disk.name, 'queue')
+        # The scheduler determines the allowed range for nr_requests, so it needs to be set first
+        for attribute, value in sorted(cls._get_settings(disk, profiles).iteritems(), key=lambda item: item[0] != 'scheduler'):
+            try:
+                with open(os.path.join(queue_dir, attribute), 'w') as queue_file:
+                    queue_file.write(str(value))
+            except IOError as ex:
+                cls._logger.warning('Disk {0} - Could not set queue attribute {1} to {2}: {3}'.format(disk.name, attribute, value, ex))
+
+    @classmethod
+    def write_udev_rules(cls, disks, profiles=None):
+        # type: (List[Disk], dict) -> None
+        """
+        (Re)generate the udev rules which apply the profiles when a disk appears
+        The rules file is only rewritten when its contents change
+        :param disks: All disks which need to be tuned
+        :type disks: list[source.dal.objects.disk.Disk]
+        :param profiles: Profiles to apply. Defaults to the profiles of this node
+        :type profiles: dict
+        :return: None
+        :rtype: NoneType
+        """
+        if profiles is None:
+            profiles = cls.get_profiles()
+        lines = ['# Generated by the ASD manager, do not edit']
+        for disk in sorted(disks, key=lambda d: d.aliases[0]):
+            settings = cls._get_settings(disk, profiles)
+            if len(settings) == 0:
+                continue
+            assignments = ['ATTR{{queue/{0}}}="{1}"'.format(attribute, value) for attribute, value in sorted(settings.iteritems(), key=lambda item: item[0] != 'scheduler')]
+            lines.append('ACTION=="add|change", SUBSYSTEM=="block", ENV{{DEVTYPE}}=="disk", ENV{{DEVLINKS}}=="*{0}*", {1}'.format(disk.aliases[0], ', '.join(assignments)))
+        contents = '{0}\n'.format('\n'.join(lines))
+
+        if os.path.exists(cls.UDEV_RULES_FILE):
+            with open(cls.UDEV_RULES_FILE) as rules_file:
+                if rules_file.read() == contents:
+                    return
+        cls._logger.info('Writing block queue udev rules for {0} disks'.format(len(lines) - 1))
+        with open(cls.UDEV_RULES_FILE, 'w') as rules_file:
+            rules_file.write(contents)
+        cls._local_client.run(['udevadm', 'control', '--reload'])
+
+    @classmethod
+    def _get_settings(cls, disk, profiles):
+        # type: (Disk, dict) -> dict
+        """
+        Resolve the profile of the disk class into the values to write for the disk
+        """
+        settings = {}
+        for attribute, value in profiles.get(disk.disk_class, {}).iteritems():
+            if attribute == 'scheduler':
+                value = cls._select_scheduler(disk, value if isinstance(value, list) else [value])
+                if value is None:
+                    continue
+            settings[attribute] = value
+        return settings
+
+    @classmethod
+    def _select_scheduler(cls, disk, preferred):
+        # type: (Disk, List[str]) -> Optional[str]
+        """
+        Select the first scheduler from the preferred schedulers which is supported for the disk
+        """
+        try:
+            with open(os.path.join(cls.SYSFS_ROOT, 'block', disk.name, 'queue', 'scheduler')) as scheduler_file:
+                available = cls._parse_schedulers(scheduler_file.read().strip())
+        except IOError:
+            return None
+        for scheduler in preferred:
+            if scheduler in available:
+                return scheduler
+        return None
+
+    @staticmethod
+    def _parse_schedulers(contents):
+        # type: (str) -> List[str]
+        """
+        Parse the contents of a queue/scheduler file (eg: 'noop [deadline] cfq')
+        :return: The available schedulers, the active scheduler first
+        :rtype: list[str]
+        """
+        schedulers = contents.split()
+        active = [scheduler.strip('[]') for scheduler in schedulers if scheduler.startswith('[')]
+        return active + [scheduler for scheduler in schedulers if not scheduler.startswith('[')]
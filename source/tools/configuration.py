@@ -19,12 +19,15 @@ Generic module for managing configuration somewhere
 """
 
 import json
+import time
 import random
 import string
+import threading
 from ovs_extensions.dal.base import ObjectNotFoundException
 from ovs_extensions.generic.configuration import Configuration as _Configuration
 from source.constants.asd import CONFIG_STORE_LOCATION, ASD_NODE_CONFIG_MAIN_LOCATION, ASD_NODE_CONFIG_NETWORK_LOCATION, ASD_NODE_CONFIG_IPMI_LOCATION, ASD_NODE_LOCATION
 from source.dal.lists.settinglist import SettingList
+from source.tools.metrics import Metrics
 from source.tools.system import System
 
 
@@ -33,6 +36,7 @@ class Configuration(_Configuration):
     Extends the 'default' configuration class
     """
     _unittest_data = {}
+    _thread_data = threading.local()
 
     def __init__(self):
         """
@@ -40,6 +44,57 @@ class Configuration(_Configuration):
         """
         _ = self
 
+    @classmethod
+    def get(cls, *args, **kwargs):
+        """
+        Retrieve a value. See the base class for the supported arguments
+        """
+        return cls._timed('get', super(Configuration, cls).get, *args, **kwargs)
+
+    @classmethod
+    def set(cls, *args, **kwargs):
+        """
+        Store a value. See the base class for the supported arguments
+        """
+        return cls._timed('set', super(Configuration, cls).set, *args, **kwargs)
+
+    @classmethod
+    def exists(cls, *args, **kwargs):
+        """
+        Verify whether a key exists. See the base class for the supported arguments
+        """
+        return cls._timed('exists', super(Configuration, cls).exists, *args, **kwargs)
+
+    @classmethod
+    def delete(cls, *args, **kwargs):
+        """
+        Delete a key. See the base class for the supported arguments
+        """
+        return cls._timed('delete', super(Configuration, cls).delete, *args, **kwargs)
+
+    @classmethod
+    def list(cls, *args, **kwargs):
+        """
+        List the keys under a key. See the base class for the supported arguments
+        """
+        return cls._timed('list', super(Configuration, cls).list, *args, **kwargs)
+
+    @classmethod
+    def _timed(cls, operation, function, *args, **kwargs):
+        """
+        Execute a configuration call and record its duration
+        Only the outermost call is recorded, as the base implementation calls other public methods
+        """
+        if getattr(cls._thread_data, 'active', False) is True:
+            return function(*args, **kwargs)
+        cls._thread_data.active = True
+        start = time.time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            cls._thread_data.active = False
+            Metrics.observe('asd_manager_config_duration_seconds', time.time() - start, operation=operation)
+
     @classmethod
     def initialize(cls, config):
         """
@@ -0,0 +1,183 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Disk statistics module, derives I/O statistics from /proc/diskstats
+"""
+
+import time
+import array
+import threading
+
+
+class RingBuffer(object):
+    """
+    Fixed-size buffer of numbers, overwriting the oldest value once full
+    """
+    def __init__(self, size, typecode='d'):
+        # type: (int, str) -> None
+        """
+        :param size: Amount of values to keep
+        :type size: int
+        :param typecode: Type of the values (see the array module)
+        :type typecode: str
+        """
+        self._values = array.array(typecode, [0] * size)
+        self._size = size
+        self._position = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value):
+        # type: (float) -> None
+        """
+        Add a value, overwriting the oldest one when the buffer is full
+        """
+        self._values[self._position] = value
+        self._position = (self._position + 1) % self._size
+        self._count = min(self._count + 1, self._size)
+
+    def last(self):
+        # type: () -> Optional[float]
+        """
+        Retrieve the most recent value
+        """
+        if self._count == 0:
+            return None
+        return self._values[(self._position - 1) % self._size]
+
+    def to_list(self, amount=None):
+        # type: (Optional[int]) -> List[float]
+        """
+        Retrieve the most recent values, oldest first
+        :param amount: Amount of values to retrieve. Defaults to all values
+        :type amount: int
+        :return: The values
+        :rtype: list
+        """
+        amount = self._count if amount is None else min(amount, self._count)
+        start = (self._position - amount) % self._size
+        return [self._values[(start + index) % self._size] for index in xrange(amount)]
+
+
+class DiskStats(object):
+    """
+    Keeps the I/O statistics of the disks in ring buffers
+    Every sample reads /proc/diskstats once for all disks and records the rates since the previous sample:
+        * read_iops, write_iops: Completed requests per second
+        * read_bytes, write_bytes: Bytes per second
+        * read_latency, write_latency: Average time per completed request in milliseconds (queueing included)
+        * utilization: Percentage of the time the disk had requests in flight
+    """
+    PROC_DISKSTATS = '/proc/diskstats'
+    SECTOR_SIZE = 512  # /proc/diskstats always counts in 512 byte sectors
+    HISTORY = 360      # Amount of samples kept per disk
+    METRICS = ['read_iops', 'write_iops', 'read_bytes', 'write_bytes', 'read_latency', 'write_latency', 'utilization']
+
+    _lock = threading.Lock()
+    _previous = {}  # Disk name: (timestamp, counters)
+    _history = {}   # Disk name: {'timestamps': RingBuffer, <metric>: RingBuffer}
+
+    @classmethod
+    def sample(cls, names, contents=None):
+        # type: (Iterable[str], Optional[str]) -> None
+        """
+        Record a sample for the given disks
+        :param names: Names of the disks to sample (eg: sda, nvme0n1). Disks not passed are forgotten
+        :type names: set
+        :param contents: Contents of /proc/diskstats. Read when not passed
+        :type contents: str
+        :return: None
+        :rtype: NoneType
+        """
+        names = set(names)
+        now = time.time()
+        if contents is None:
+            with open(cls.PROC_DISKSTATS) as diskstats_file:
+                contents = diskstats_file.read()
+        # Fields: major minor name, followed by at least 11 counters
+        counters = {}
+        for line in contents.splitlines():
+            parts = line.split()
+            if len(parts) >= 14 and parts[2] in names:
+                counters[parts[2]] = [int(value) for value in parts[3:14]]
+
+        with cls._lock:
+            for name in set(cls._history) | set(cls._previous):
+                if name not in names:
+                    cls._history.pop(name, None)
+                    cls._previous.pop(name, None)
+            for name, current in counters.iteritems():
+                previous = cls._previous.get(name)
+                cls._previous[name] = (now, current)
+                if previous is None:
+                    continue
+                elapsed = now - previous[0]
+                delta = [value - previous_value for value, previous_value in zip(current, previous[1])]
+                # The 9th counter is the amount of requests in flight, which is not cumulative. Others only decrease when wrapping or re-plugging
+                if elapsed <= 0 or any(delta[index] < 0 for index in xrange(len(delta)) if index != 8):
+                    continue
+                values = {'read_iops': delta[0] / elapsed,
+                          'write_iops': delta[4] / elapsed,
+                          'read_bytes': delta[2] * cls.SECTOR_SIZE / elapsed,
+                          'write_bytes': delta[6] * cls.SECTOR_SIZE / elapsed,
+                          'read_latency': float(delta[3]) / delta[0] if delta[0] > 0 else 0.0,
+                          'write_latency': float(delta[7]) / delta[4] if delta[4] > 0 else 0.0,
+                          'utilization': min(100.0, delta[9] / (elapsed * 10.0))}
+                if name not in cls._history:
+                    cls._history[name] = dict((key, RingBuffer(cls.HISTORY)) for key in cls.METRICS + ['timestamps'])
+                history = cls._history[name]
+                history['timestamps'].append(now)
+                for metric in cls.METRICS:
+                    history[metric].append(values[metric])
+
+    @classmethod
+    def get_latest(cls, name):
+        # type: (str) -> Optional[dict]
+        """
+        Retrieve the most recent statistics of a disk
+        :param name: Name of the disk
+        :type name: str
+        :return: The timestamp and metrics of the last sample or None when no sample is available yet
+        :rtype: dict
+        """
+        with cls._lock:
+            history = cls._history.get(name)
+            if history is None:
+                return None
+            latest = dict((metric, round(history[metric].last(), 2)) for metric in cls.METRICS)
+            latest['timestamp'] = history['timestamps'].last()
+            return latest
+
+    @classmethod
+    def get_history(cls, name, amount=None):
+        # type: (str, Optional[int]) -> Optional[dict]
+        """
+        Retrieve the recorded statistics of a disk
+        :param name: Name of the disk
+        :type name: str
+        :param amount: Amount of samples to retrieve. Defaults to all samples
+        :type amount: int
+        :return: Per metric the values (oldest first) and the timestamps of the samples or None when no sample is available yet
+        :rtype: dict
+        """
+        with cls._lock:
+            history = cls._history.get(name)
+            if history is None:
+                return None
+            return dict((key, buffer_.to_list(amount)) for key, buffer_ in history.iteritems())
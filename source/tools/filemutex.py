@@ -0,0 +1,54 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+File mutex module for the ASD Manager
+"""
+
+import time
+from ovs_extensions.generic.filemutex import file_mutex as _file_mutex
+from source.tools.metrics import Metrics
+
+
+class file_mutex(_file_mutex):
+    """
+    File mutex which keeps track of the time spent waiting for and holding the lock
+    """
+
+    def __init__(self, name, *args, **kwargs):
+        super(file_mutex, self).__init__(name, *args, **kwargs)
+        # Locks for a specific slot or disk (eg: slot_pci-0000:03:00.0-sas-0x5000c29f4cf04566-lun-0) are grouped together
+        self._metrics_name = name.split('_')[0] if '-' in name else name
+        self._acquired_at = None
+
+    def acquire(self, *args, **kwargs):
+        """
+        Acquire the lock. See the base class for the supported arguments
+        """
+        start = time.time()
+        result = super(file_mutex, self).acquire(*args, **kwargs)
+        self._acquired_at = time.time()
+        Metrics.observe('asd_manager_lock_wait_seconds', self._acquired_at - start, lock=self._metrics_name)
+        return result
+
+    def release(self):
+        """
+        Release the lock
+        """
+        super(file_mutex, self).release()
+        if self._acquired_at is not None:
+            Metrics.observe('asd_manager_lock_hold_seconds', time.time() - self._acquired_at, lock=self._metrics_name)
+            self._acquired_at = None
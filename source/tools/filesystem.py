@@ -0,0 +1,106 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Filesystem profile related code
+"""
+
+import copy
+from source.constants.asd import ASD_NODE_CONFIG_FILESYSTEM_LOCATION
+from source.dal.lists.settinglist import SettingList
+from source.dal.objects.disk import Disk
+from source.tools.configuration import Configuration
+
+
+class FilesystemProfiles(object):
+    """
+    Named XFS format and mount profiles
+    A profile consists out of the additional 'mkfs_options' passed to mkfs.xfs and the 'mount_options' written into fstab
+    Which profile is used for a disk can be passed explicitly, otherwise the profile mapped onto the disk class is used
+    """
+    DEFAULT_PROFILE = 'default'
+    DEFAULT_PROFILES = {'default': {'mkfs_options': [],
+                                    'mount_options': ['defaults', 'nofail', 'noatime', 'discard']},
+                        # Few allocation groups keep the head movements of a single spindle short, the larger log absorbs the
+                        # metadata bursts of the many files an ASD creates and removes
+                        'hdd': {'mkfs_options': ['-d', 'agcount=4', '-l', 'size=128m'],
+                                'mount_options': ['defaults', 'nofail', 'noatime', 'inode64', 'largeio', 'logbufs=8']},
+                        # More allocation groups allow more parallel allocations, which flash devices can serve
+                        'ssd': {'mkfs_options': ['-d', 'agcount=16', '-l', 'size=128m'],
+                                'mount_options': ['defaults', 'nofail', 'noatime', 'inode64', 'logbufs=8', 'discard']},
+                        # No online discard, the trim scheduler periodically trims the filesystem instead
+                        'ssd_scheduled_trim': {'mkfs_options': ['-d', 'agcount=16', '-l', 'size=128m'],
+                                               'mount_options': ['defaults', 'nofail', 'noatime', 'inode64', 'logbufs=8']}}
+    DEFAULT_CLASS_PROFILES = {Disk.CLASS_HDD: 'hdd',
+                              Disk.CLASS_SSD: 'ssd',
+                              Disk.CLASS_NVME: 'ssd'}
+
+    @classmethod
+    def get_config(cls):
+        # type: () -> Tuple[dict, dict]
+        """
+        Retrieve the filesystem profiles of this node and the profile to use for each disk class
+        Configured profiles are added to (or replace) the default profiles
+        :return: The profiles by name and the profile name by disk class
+        :rtype: tuple
+        """
+        node_id = SettingList.get_setting_by_code(code='node_id').value
+        config = Configuration.get(ASD_NODE_CONFIG_FILESYSTEM_LOCATION.format(node_id), default={})
+        profiles = copy.deepcopy(cls.DEFAULT_PROFILES)
+        profiles.update(config.get('profiles', {}))
+        class_profiles = copy.deepcopy(cls.DEFAULT_CLASS_PROFILES)
+        class_profiles.update(config.get('class_profiles', {}))
+        return profiles, class_profiles
+
+    @classmethod
+    def resolve(cls, disk, name=None):
+        # type: (Disk, Optional[str]) -> Tuple[str, dict]
+        """
+        Resolve the profile to use for a disk
+        :param disk: Disk to format and mount
+        :type disk: source.dal.objects.disk.Disk
+        :param name: Name of the requested profile. Defaults to the profile of the disk class
+        :type name: str
+        :raises ValueError: When the requested profile does not exist
+        :return: The name of the profile and the profile itself
+        :rtype: tuple
+        """
+        profiles, class_profiles = cls.get_config()
+        if name is None:
+            name = class_profiles.get(disk.disk_class, cls.DEFAULT_PROFILE)
+        if name not in profiles:
+            raise ValueError('Unknown filesystem profile {0}. Available profiles: {1}'.format(name, ', '.join(sorted(profiles))))
+        return name, profiles[name]
+
+    @classmethod
+    def uses_scheduled_trim(cls, disk, profiles=None):
+        # type: (Disk, Optional[dict]) -> bool
+        """
+        Verify whether a prepared disk relies on the trim scheduler instead of online discard
+        Only non-rotational disks mounted without the 'discard' option qualify
+        :param disk: Disk to verify
+        :type disk: source.dal.objects.disk.Disk
+        :param profiles: Profiles by name. Defaults to the profiles of this node
+        :type profiles: dict
+        :return: True if the disk should be trimmed by the scheduler
+        :rtype: bool
+        """
+        if disk.disk_class == Disk.CLASS_HDD:
+            return False
+        if profiles is None:
+            profiles = cls.get_config()[0]
+        profile = profiles.get(disk.filesystem_profile or cls.DEFAULT_PROFILE)
+        return profile is not None and 'discard' not in profile['mount_options']
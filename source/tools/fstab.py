@@ -18,40 +18,49 @@
 FSTAB related code
 """
 
+from source.tools.lockmanager import LockManager
+
 
 class FSTab(object):
     """
     Class to modify the /etc/fstab file
     """
-    _entry = '{0}  {1}  xfs  defaults,nofail,noatime,discard  0  2'
+    _entry = '{0}  {1}  xfs  {2}  0  2'
+    _default_mount_options = ['defaults', 'nofail', 'noatime', 'discard']
     _file_name = '/etc/fstab'
     _separators = ('# BEGIN ALBA ASDs', '# END ALBA ASDs')  # Don't change, for backwards compatibility
 
     @staticmethod
-    def add(partition_aliases, mountpoint):
+    def add(partition_aliases, mountpoint, mount_options=None):
         """
         Add an entry for 1 of the partition_aliases if none present yet
         :param partition_aliases: Aliases of the partition to add to fstab
         :type partition_aliases: list
         :param mountpoint: Mountpoint on which the ASD is mounted
         :type mountpoint: str
+        :param mount_options: Options to mount the partition with
+        :type mount_options: list
         :return: None
         """
         if len(partition_aliases) == 0:
             raise ValueError('No aliases provided for partition')
 
-        lines = FSTab._read()
-        found = False
-        for line in lines:
-            for alias in partition_aliases:
-                if line.startswith(alias):
-                    found = True
+        # Concurrent edits would lose entries: the file is read, changed and written back
+        with LockManager.locked('fstab'):
+            lines = FSTab._read()
+            found = False
+            for line in lines:
+                for alias in partition_aliases:
+                    if line.startswith(alias):
+                        found = True
+                        break
+                if found is True:
                     break
-            if found is True:
-                break
-        if found is False:
-            lines.append(FSTab._entry.format(partition_aliases[0], mountpoint))
-            FSTab._write(lines)
+            if found is False:
+                if not mount_options:
+                    mount_options = FSTab._default_mount_options
+                lines.append(FSTab._entry.format(partition_aliases[0], mountpoint, ','.join(mount_options)))
+                FSTab._write(lines)
 
     @staticmethod
     def remove(partition_aliases):
@@ -61,14 +70,15 @@ class FSTab(object):
         :type partition_aliases: list
         :return: None
         """
-        lines = FSTab._read()
-        mounted_asds = len(lines)
-        for line in list(lines):
-            for partition_alias in partition_aliases:
-                if partition_alias in line:
-                    lines.remove(line)
-        if mounted_asds != len(lines):
-            FSTab._write(lines)
+        with LockManager.locked('fstab'):
+            lines = FSTab._read()
+            mounted_asds = len(lines)
+            for line in list(lines):
+                for partition_alias in partition_aliases:
+                    if partition_alias in line:
+                        lines.remove(line)
+            if mounted_asds != len(lines):
+                FSTab._write(lines)
 
     @staticmethod
     def read():
@@ -0,0 +1,155 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Disk health module, parses the SMART (smartctl) and NVMe (nvme smart-log) health information and caches it
+"""
+
+import re
+import json
+import threading
+
+
+class DiskHealth(object):
+    """
+    Cache of the last collected health information per disk
+    Reading the cache executes no commands. The information is refreshed by the HealthController
+    """
+    STATUS_OK = 'ok'
+    STATUS_WARNING = 'warning'
+    STATUS_FAILING = 'failing'
+    STATUS_UNKNOWN = 'unknown'
+    WEAR_WARNING = 90  # Percentage of the rated endurance used
+
+    _lock = threading.Lock()
+    _cache = {}
+
+    @classmethod
+    def get(cls, disk):
+        # type: (Disk) -> dict
+        """
+        Retrieve the cached health information of a disk
+        :param disk: Disk to retrieve the information for
+        :type disk: source.dal.objects.disk.Disk
+        :return: The health information (status, timestamp, temperature, reallocated_sectors, pending_sectors, media_errors, percentage_used, error)
+        :rtype: dict
+        """
+        with cls._lock:
+            info = cls._cache.get(disk.aliases[0] if len(disk.aliases) > 0 else disk.name)
+            return dict(info) if info is not None else {'status': cls.STATUS_UNKNOWN, 'timestamp': None}
+
+    @classmethod
+    def store(cls, disk, info):
+        # type: (Disk, dict) -> None
+        """
+        Cache the health information of a disk. A status is derived from the information
+        :param disk: Disk the information belongs to
+        :type disk: source.dal.objects.disk.Disk
+        :param info: Health information, as returned by the parse functions
+        :type info: dict
+        :return: None
+        :rtype: NoneType
+        """
+        info = dict(info)
+        info['status'] = cls._get_status(info)
+        with cls._lock:
+            cls._cache[disk.aliases[0] if len(disk.aliases) > 0 else disk.name] = info
+
+    @classmethod
+    def _get_status(cls, info):
+        # type: (dict) -> str
+        if info.get('passed') is None and info.get('critical_warning') is None:
+            return cls.STATUS_UNKNOWN
+        if info.get('passed') is False or info.get('critical_warning'):
+            return cls.STATUS_FAILING
+        if info.get('reallocated_sectors') or info.get('pending_sectors') or info.get('media_errors') or \
+                (info.get('percentage_used') or 0) >= cls.WEAR_WARNING:
+            return cls.STATUS_WARNING
+        return cls.STATUS_OK
+
+    @staticmethod
+    def parse_smartctl(output):
+        # type: (str) -> dict
+        """
+        Parse the output of 'smartctl -H -A' for ATA and SCSI/SAS disks
+        :param output: Output of smartctl
+        :type output: str
+        :return: The health information. Values not reported by the disk are None
+        :rtype: dict
+        """
+        info = {'passed': None,
+                'temperature': None,
+                'reallocated_sectors': None,
+                'pending_sectors': None,
+                'media_errors': None,
+                'percentage_used': None,
+                'critical_warning': None}
+        for line in output.splitlines():
+            line = line.strip()
+            # Overall health: ATA and SCSI respectively
+            match = re.match(r'^SMART overall-health self-assessment test result: (\S+)', line) or re.match(r'^SMART Health Status: (\S+)', line)
+            if match is not None:
+                info['passed'] = match.group(1) in ['PASSED', 'OK']
+                continue
+            match = re.match(r'^Current Drive Temperature:\s+(\d+) C', line)
+            if match is not None:
+                info['temperature'] = int(match.group(1))
+                continue
+            match = re.match(r'^Elements in grown defect list:\s+(\d+)', line)
+            if match is not None:
+                info['reallocated_sectors'] = int(match.group(1))
+                continue
+            match = re.match(r'^Percentage used endurance indicator:\s+(\d+)%', line)
+            if match is not None:
+                info['percentage_used'] = int(match.group(1))
+                continue
+            # ATA attribute table: ID# ATTRIBUTE_NAME FLAG VALUE WORST THRESH TYPE UPDATED WHEN_FAILED RAW_VALUE
+            parts = line.split()
+            if len(parts) < 10 or not parts[0].isdigit():
+                continue
+            attribute_id, value, raw_value = int(parts[0]), int(parts[3]), parts[9]
+            raw = int(raw_value) if raw_value.isdigit() else None
+            if attribute_id == 5:
+                info['reallocated_sectors'] = raw
+            elif attribute_id == 197:
+                info['pending_sectors'] = raw
+            elif attribute_id in [194, 190] and info['temperature'] is None:
+                info['temperature'] = raw
+            elif attribute_id in [177, 231, 233] and info['percentage_used'] is None:
+                # Wear leveling count / SSD life left / media wearout indicator: normalized value counts down from 100
+                info['percentage_used'] = max(0, 100 - value)
+        return info
+
+    @staticmethod
+    def parse_nvme(output):
+        # type: (str) -> dict
+        """
+        Parse the output of 'nvme smart-log -o json'
+        :param output: Output of nvme-cli
+        :type output: str
+        :return: The health information. Values not reported by the disk are None
+        :rtype: dict
+        """
+        data = json.loads(output)
+        temperature = data.get('temperature')
+        percentage_used = data.get('percent_used', data.get('percentage_used'))
+        return {'passed': data.get('critical_warning', 0) == 0,
+                'temperature': temperature - 273 if temperature is not None else None,  # Reported in Kelvin
+                'reallocated_sectors': None,
+                'pending_sectors': None,
+                'media_errors': data.get('media_errors'),
+                'percentage_used': percentage_used,
+                'critical_warning': data.get('critical_warning')}
@@ -35,8 +35,7 @@ from ovs_extensions.generic.toolbox import ExtensionsToolbox
 from ovs_extensions.constants.config import CACC_LOCATION
 from ovs_extensions.constants.alba import MAINTENANCE_PREFIX
 from ovs_extensions.services.interfaces.systemd import Systemd
-from source.asdmanager import BOOTSTRAP_FILE
-from source.constants.asd import ASD_NODE_CONFIG_LOCATION, CACC_LOCATION_OLD
+from source.constants.asd import ASD_NODE_CONFIG_LOCATION, BOOTSTRAP_FILE, CACC_LOCATION_OLD
 from source.controllers.maintenance import MaintenanceController
 from source.tools.configuration import Configuration
 from source.tools.logger import Logger
@@ -49,7 +48,7 @@ class PostUpdate(object):
     logger = Logger('update')
     service_manager = ServiceFactory.get_manager()
 
-    CURRENT_VERSION = 7
+    CURRENT_VERSION = 8
 
     @staticmethod
     def ensure_directory(file_path):
@@ -267,6 +266,26 @@ class PostUpdate(object):
                             local_client.file_move(source_file_name='/opt/asd-manager/source/{0}'.format(file_name),
                                                    destination_file_name='/opt/asd-manager/config/{0}'.format(
                                                        file_name))
+
+                    # Version 8: CPU and NUMA placement parameters for the ASD services
+                    reload_daemon = False
+                    for asd in ASDList.get_asds():
+                        configuration_key = ServiceFactory.SERVICE_CONFIG_KEY.format(node_id, asd.service_name)
+                        if not Configuration.exists(configuration_key):
+                            continue
+                        params = Configuration.get(configuration_key)
+                        if 'NUMA_COMMAND' in params:
+                            continue
+                        # Placement only takes effect after the next restart of the ASD
+                        params.update(ASDController.get_affinity_params(asd.disk))
+                        Configuration.set(configuration_key, params)
+                        cls.service_manager.add_service(name=ASDController.ASD_PREFIX,
+                                                        client=local_client,
+                                                        params=params,
+                                                        target_name=asd.service_name)
+                        reload_daemon = True
+                    if reload_daemon is True and cls.service_manager.__class__ == Systemd:
+                        local_client.run(['systemctl', 'daemon-reload'])
                 except:
                     cls.logger.exception('Error while executing post-update code on node {0}'.format(node_id))
             Configuration.set(key, cls.CURRENT_VERSION)
@@ -0,0 +1,62 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+I/O priority module
+"""
+
+import ctypes
+import ctypes.util
+import platform
+
+
+class IOPriority(object):
+    """
+    Changes the I/O scheduling class of the calling thread (see ioprio_set(2))
+    Only honoured by I/O schedulers supporting priorities (eg: bfq, cfq)
+    """
+    CLASS_REALTIME = 1
+    CLASS_BEST_EFFORT = 2
+    CLASS_IDLE = 3
+
+    _WHO_PROCESS = 1  # With identifier 0, this targets the calling thread
+    _CLASS_SHIFT = 13
+    _SYSCALLS = {'x86_64': 251,
+                 'i686': 289,
+                 'aarch64': 30,
+                 'armv7l': 314,
+                 'ppc64le': 273}
+
+    _libc = None
+
+    @classmethod
+    def set_thread_class(cls, io_class, level=0):
+        # type: (int, int) -> bool
+        """
+        Set the I/O scheduling class of the calling thread
+        :param io_class: I/O scheduling class (CLASS_REALTIME, CLASS_BEST_EFFORT or CLASS_IDLE)
+        :type io_class: int
+        :param level: Priority level within the class (0 - 7, 0 being the highest). Ignored for the idle class
+        :type level: int
+        :return: True if the I/O scheduling class has been changed
+        :rtype: bool
+        """
+        syscall = cls._SYSCALLS.get(platform.machine())
+        if syscall is None:
+            return False
+        if cls._libc is None:
+            cls._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        return cls._libc.syscall(syscall, cls._WHO_PROCESS, 0, (io_class << cls._CLASS_SHIFT) | level) == 0
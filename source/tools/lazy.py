@@ -0,0 +1,72 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Lazy shared instances module
+"""
+
+import threading
+
+
+def _build_local_client():
+    from source.tools.sshclient import SSHClient
+    return SSHClient(endpoint='127.0.0.1', username='root')
+
+
+def _build_service_manager():
+    from source.tools.servicefactory import ServiceFactory
+    return ServiceFactory.get_manager()
+
+
+def _build_package_manager():
+    from source.tools.packagefactory import PackageFactory
+    return PackageFactory.get_manager()
+
+
+class shared_instance(object):
+    """
+    Class attribute which is only built on first access. The built instance is shared by all classes using the same name
+    This keeps importing the controllers and DAL objects cheap: no clients or managers are built at class-definition time
+    Usage:
+        class ASDController(object):
+            _local_client = shared_instance('local_client')
+    """
+    FACTORIES = {'local_client': _build_local_client,
+                 'service_manager': _build_service_manager,
+                 'package_manager': _build_package_manager}
+
+    _instances = {}
+    _lock = threading.Lock()
+
+    def __init__(self, name):
+        # type: (str) -> None
+        """
+        :param name: Name of the shared instance (see FACTORIES)
+        :type name: str
+        """
+        if name not in self.FACTORIES:
+            raise ValueError('Unknown shared instance {0}'.format(name))
+        self._name = name
+
+    def __get__(self, instance, owner):
+        try:
+            return shared_instance._instances[self._name]
+        except KeyError:
+            pass
+        with shared_instance._lock:
+            if self._name not in shared_instance._instances:
+                shared_instance._instances[self._name] = self.FACTORIES[self._name]()
+            return shared_instance._instances[self._name]
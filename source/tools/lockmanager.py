@@ -0,0 +1,173 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Lock manager module, in-process locks on individual resources of the ASD manager
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from source.tools.metrics import Metrics
+
+
+class DeadlockError(RuntimeError):
+    """
+    Raised when acquiring a lock would result in a deadlock
+    """
+    pass
+
+
+class LockManager(object):
+    """
+    Manages re-entrant locks on resources (eg: 'slot:<slot_id>', 'asd:<asd_id>', 'ports')
+    Unlike the global file mutexes, operations on independent slots or ASDs do not block each other.
+    Locks acquired together are taken in a fixed order. When nested acquisitions would wait in a cycle, the thread closing
+    the cycle receives a DeadlockError instead of blocking forever.
+    Conventional order when nesting: slot > asd > ports
+    """
+    _condition = threading.Condition(threading.Lock())
+    _owners = {}   # Resource: [thread ident, re-entrance count, acquired at]
+    _waiting = {}  # Thread ident: resource
+
+    @classmethod
+    @contextmanager
+    def locked(cls, *resources):
+        """
+        Hold the locks on the given resources
+        :param resources: Resources to lock (eg: 'slot:pci-0000:03:00.0-sas-0x5000c29f4cf04566-lun-0')
+        :type resources: str
+        """
+        acquired = []
+        try:
+            for resource in sorted(set(resources)):
+                cls.acquire(resource)
+                acquired.append(resource)
+            yield
+        finally:
+            for resource in reversed(acquired):
+                cls.release(resource)
+
+    @classmethod
+    def acquire(cls, resource):
+        # type: (str) -> None
+        """
+        Acquire the lock on a resource, waiting for it to be released by other threads
+        :param resource: Resource to lock
+        :type resource: str
+        :raises DeadlockError: When waiting would result in a deadlock
+        :return: None
+        :rtype: NoneType
+        """
+        ident = threading.current_thread().ident
+        start = time.time()
+        with cls._condition:
+            while resource in cls._owners and cls._owners[resource][0] != ident:
+                cycle = cls._find_cycle(ident=ident, resource=resource)
+                if cycle is not None:
+                    Metrics.increment('asd_manager_lock_deadlocks_total', lock=cls._get_kind(resource))
+                    raise DeadlockError('Waiting for {0} would result in a deadlock: {1}'.format(resource, ' -> '.join(cycle)))
+                cls._waiting[ident] = resource
+                try:
+                    cls._condition.wait()
+                finally:
+                    cls._waiting.pop(ident, None)
+            if resource in cls._owners:
+                cls._owners[resource][1] += 1
+                return
+            now = time.time()
+            cls._owners[resource] = [ident, 1, now]
+        Metrics.observe('asd_manager_lock_wait_seconds', now - start, lock=cls._get_kind(resource))
+
+    @classmethod
+    def release(cls, resource):
+        # type: (str) -> None
+        """
+        Release the lock on a resource
+        :param resource: Resource to unlock
+        :type resource: str
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._condition:
+            owner = cls._owners.get(resource)
+            if owner is None or owner[0] != threading.current_thread().ident:
+                raise RuntimeError('Lock on {0} is not held by this thread'.format(resource))
+            owner[1] -= 1
+            if owner[1] > 0:
+                return
+            del cls._owners[resource]
+            cls._condition.notify_all()
+        Metrics.observe('asd_manager_lock_hold_seconds', time.time() - owner[2], lock=cls._get_kind(resource))
+
+    @classmethod
+    def get_locks(cls):
+        # type: () -> dict
+        """
+        Retrieve the locks currently held and the threads waiting for them
+        :return: Per resource the thread holding it, since when and the threads waiting for it
+        :rtype: dict
+        """
+        names = dict((thread.ident, thread.name) for thread in threading.enumerate())
+        with cls._condition:
+            locks = dict((resource, {'thread': names.get(owner[0], owner[0]),
+                                     'held_since': owner[2],
+                                     'waiting': []}) for resource, owner in cls._owners.iteritems())
+            for ident, resource in cls._waiting.iteritems():
+                if resource in locks:
+                    locks[resource]['waiting'].append(names.get(ident, ident))
+        return locks
+
+    @staticmethod
+    def get_slot_resource(disk):
+        # type: (Disk) -> str
+        """
+        Retrieve the name of the lock resource of a slot. Different aliases of the same slot share the lock
+        :param disk: Disk modeled for the slot
+        :type disk: source.dal.objects.disk.Disk
+        :return: Name of the lock resource
+        :rtype: str
+        """
+        return 'slot:{0}'.format(disk.aliases[0].split('/')[-1])
+
+    @classmethod
+    def _find_cycle(cls, ident, resource):
+        # type: (int, str) -> Union[List[str], None]
+        """
+        Follow the wait-for graph starting at the owner of the requested resource. Must be called while holding the condition
+        :return: The resources forming a cycle back to the requesting thread or None
+        :rtype: list
+        """
+        chain = [resource]
+        seen = set()
+        while resource in cls._owners:
+            owner = cls._owners[resource][0]
+            if owner == ident:
+                return chain
+            if owner in seen or owner not in cls._waiting:
+                return None
+            seen.add(owner)
+            resource = cls._waiting[owner]
+            chain.append(resource)
+        return None
+
+    @staticmethod
+    def _get_kind(resource):
+        # type: (str) -> str
+        """
+        Locks on individual slots or ASDs are grouped together in the metrics
+        """
+        return resource.split(':')[0]
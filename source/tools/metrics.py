@@ -0,0 +1,191 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Metrics module, keeps track of the internals of the ASD manager in Prometheus format
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+
+class Metrics(object):
+    """
+    In-process metrics registry
+    Every metric must be defined in DEFINITIONS. Recording a value costs a lock and a few dictionary operations
+    """
+    LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    DEFINITIONS = {'asd_manager_request_duration_seconds': ('histogram', 'Duration of the API requests', LATENCY_BUCKETS),
+                   'asd_manager_request_subprocesses': ('histogram', 'Amount of commands executed per API request', COUNT_BUCKETS),
+                   'asd_manager_sync_disks_duration_seconds': ('histogram', 'Duration of the disk sync passes', LATENCY_BUCKETS),
+                   'asd_manager_sync_disks_total': ('counter', 'Amount of disk sync passes', None),
+                   'asd_manager_command_duration_seconds': ('histogram', 'Duration of the executed commands', LATENCY_BUCKETS),
+                   'asd_manager_config_duration_seconds': ('histogram', 'Duration of the configuration store calls', LATENCY_BUCKETS),
+                   'asd_manager_lock_wait_seconds': ('histogram', 'Time spent waiting for a lock', LATENCY_BUCKETS),
+                   'asd_manager_lock_hold_seconds': ('histogram', 'Time a lock has been held', LATENCY_BUCKETS),
+                   'asd_manager_lock_deadlocks_total': ('counter', 'Amount of lock acquisitions refused to prevent a deadlock', None)}
+
+    _lock = threading.Lock()
+    _values = {}
+    _thread_data = threading.local()
+
+    @classmethod
+    def observe(cls, name, value, **labels):
+        # type: (str, float, **str) -> None
+        """
+        Record an observation for a histogram
+        :param name: Name of the histogram
+        :type name: str
+        :param value: Observed value
+        :type value: float
+        :param labels: Labels of the observation
+        :return: None
+        :rtype: NoneType
+        """
+        buckets = cls.DEFINITIONS[name][2]
+        key = (name, tuple(sorted(labels.iteritems())))
+        index = bisect.bisect_left(buckets, value)
+        with cls._lock:
+            if key not in cls._values:
+                cls._values[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            entry = cls._values[key]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @classmethod
+    def increment(cls, name, amount=1, **labels):
+        # type: (str, float, **str) -> None
+        """
+        Increment a counter
+        :param name: Name of the counter
+        :type name: str
+        :param amount: Amount to increment with
+        :type amount: float
+        :param labels: Labels of the counter
+        :return: None
+        :rtype: NoneType
+        """
+        key = (name, tuple(sorted(labels.iteritems())))
+        with cls._lock:
+            cls._values[key] = cls._values.get(key, 0) + amount
+
+    @classmethod
+    @contextmanager
+    def timer(cls, name, **labels):
+        """
+        Context manager recording the duration of its body into a histogram
+        :param name: Name of the histogram
+        :type name: str
+        :param labels: Labels of the observation
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            cls.observe(name, time.time() - start, **labels)
+
+    @classmethod
+    def count_command(cls):
+        # type: () -> None
+        """
+        Register the execution of a command in the context of the current thread (see 'start_counting_commands')
+        :return: None
+        :rtype: NoneType
+        """
+        cls._thread_data.commands = getattr(cls._thread_data, 'commands', 0) + 1
+
+    @classmethod
+    def start_counting_commands(cls):
+        # type: () -> None
+        """
+        Reset the command counter of the current thread
+        :return: None
+        :rtype: NoneType
+        """
+        cls._thread_data.commands = 0
+
+    @classmethod
+    def get_command_count(cls):
+        # type: () -> int
+        """
+        Retrieve the amount of commands executed by the current thread since 'start_counting_commands'
+        :return: The amount of commands
+        :rtype: int
+        """
+        return getattr(cls._thread_data, 'commands', 0)
+
+    @classmethod
+    def reset(cls):
+        # type: () -> None
+        """
+        Remove all recorded values
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            cls._values = {}
+
+    @classmethod
+    def get_values(cls):
+        # type: () -> dict
+        """
+        Retrieve a copy of all recorded values
+        :return: Counter values and histogram data ([bucket counts], sum, count) by (name, labels)
+        :rtype: dict
+        """
+        with cls._lock:
+            return dict((key, [list(value[0]), value[1], value[2]] if isinstance(value, list) else value) for key, value in cls._values.iteritems())
+
+    @classmethod
+    def render(cls):
+        # type: () -> str
+        """
+        Render all recorded values in the Prometheus text exposition format
+        :return: The metrics
+        :rtype: str
+        """
+        values = cls.get_values()
+        lines = []
+        for name in sorted(cls.DEFINITIONS):
+            metric_type, description, buckets = cls.DEFINITIONS[name]
+            lines.append('# HELP {0} {1}'.format(name, description))
+            lines.append('# TYPE {0} {1}'.format(name, metric_type))
+            for (value_name, labels), value in sorted(values.iteritems()):
+                if value_name != name:
+                    continue
+                if metric_type == 'counter':
+                    lines.append('{0}{1} {2}'.format(name, cls._format_labels(labels), value))
+                    continue
+                bucket_counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(list(buckets) + ['+Inf'], bucket_counts):
+                    cumulative += bucket_count
+                    lines.append('{0}_bucket{1} {2}'.format(name, cls._format_labels(labels + (('le', str(bound)),)), cumulative))
+                lines.append('{0}_sum{1} {2}'.format(name, cls._format_labels(labels), total))
+                lines.append('{0}_count{1} {2}'.format(name, cls._format_labels(labels), count))
+        return '{0}\n'.format('\n'.join(lines))
+
+    @staticmethod
+    def _format_labels(labels):
+        # type: (tuple) -> str
+        if len(labels) == 0:
+            return ''
+        return '{{{0}}}'.format(','.join('{0}="{1}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for key, value in labels))
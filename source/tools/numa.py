@@ -0,0 +1,89 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+NUMA related code
+"""
+
+import os
+import re
+
+
+class NUMATools(object):
+    """
+    Retrieves NUMA topology information from sysfs
+    All methods accept the root of the sysfs tree, so they can be used against a copy of (or a fake) sysfs tree
+    """
+    SYSFS_ROOT = '/sys'
+
+    @classmethod
+    def get_nodes(cls, sysfs_root=None):
+        # type: (str) -> List[int]
+        """
+        Retrieve the NUMA nodes of the system
+        :param sysfs_root: Root of the sysfs tree
+        :type sysfs_root: str
+        :return: The NUMA node numbers
+        :rtype: list[int]
+        """
+        node_dir = os.path.join(sysfs_root or cls.SYSFS_ROOT, 'devices', 'system', 'node')
+        if not os.path.isdir(node_dir):
+            return []
+        return sorted(int(entry[4:]) for entry in os.listdir(node_dir) if re.match('^node[0-9]+$', entry))
+
+    @classmethod
+    def get_node_cpus(cls, node, sysfs_root=None):
+        # type: (int, str) -> str
+        """
+        Retrieve the CPUs of a NUMA node
+        :param node: NUMA node number
+        :type node: int
+        :param sysfs_root: Root of the sysfs tree
+        :type sysfs_root: str
+        :return: The CPU list (eg: '0-11 24-35'), usable for the systemd CPUAffinity setting
+        :rtype: str
+        """
+        with open(os.path.join(sysfs_root or cls.SYSFS_ROOT, 'devices', 'system', 'node', 'node{0}'.format(node), 'cpulist')) as cpulist:
+            return ' '.join(cpulist.read().strip().split(','))
+
+    @classmethod
+    def get_device_node(cls, device_name, sysfs_root=None):
+        # type: (str, str) -> Optional[int]
+        """
+        Retrieve the NUMA node of the PCI device (HBA, NVMe controller, ...) through which a block device is connected
+        :param device_name: Name of the block device (eg: sda, nvme0n1)
+        :type device_name: str
+        :param sysfs_root: Root of the sysfs tree
+        :type sysfs_root: str
+        :return: The NUMA node or None if it could not be determined
+        :rtype: int
+        """
+        sysfs_root = os.path.realpath(sysfs_root or cls.SYSFS_ROOT)
+        device_path = os.path.join(sysfs_root, 'block', device_name, 'device')
+        if not os.path.exists(device_path):
+            return None
+        # Walk up the device hierarchy until a device reporting its NUMA node is found
+        path = os.path.realpath(device_path)
+        while path.startswith(sysfs_root) and path != sysfs_root:
+            numa_file = os.path.join(path, 'numa_node')
+            if os.path.isfile(numa_file):
+                with open(numa_file) as numa_node:
+                    node = int(numa_node.read().strip())
+                if node >= 0:
+                    return node
+                return None  # -1: No NUMA information available for the device
+            path = os.path.dirname(path)
+        return None
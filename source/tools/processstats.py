@@ -0,0 +1,187 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Process statistics module, samples the resource usage of processes from /proc
+"""
+
+import os
+import time
+import threading
+from source.tools.diskstats import RingBuffer
+
+
+class ProcessStats(object):
+    """
+    Keeps the resource usage of the ASD processes in ring buffers
+    Every sample records per ASD:
+        * rss: Resident memory in bytes
+        * rss_percent: Resident memory as percentage of the memory of the node
+        * cpu_percent: CPU time (user + system) spent since the previous sample, as percentage of one core
+        * fds: Amount of open file descriptors
+        * fd_percent: Open file descriptors as percentage of the soft limit (LimitNOFILE)
+        * read_bytes, write_bytes: Bytes per second read from or written to storage since the previous sample
+    """
+    PROC_ROOT = '/proc'
+    HISTORY = 120  # Amount of samples kept per ASD
+    METRICS = ['rss', 'rss_percent', 'cpu_percent', 'fds', 'fd_percent', 'read_bytes', 'write_bytes']
+    FD_WARNING_PERCENT = 80
+    MEMORY_WARNING_PERCENT = 10
+
+    _lock = threading.Lock()
+    _previous = {}  # ASD ID: (timestamp, pid, cpu ticks, read bytes, written bytes)
+    _history = {}   # ASD ID: {'timestamps': RingBuffer, <metric>: RingBuffer}
+    _latest = {}    # ASD ID: Information which is not kept in history (pid, limit)
+    _clock_ticks = os.sysconf('SC_CLK_TCK')
+    _page_size = os.sysconf('SC_PAGE_SIZE')
+
+    @classmethod
+    def sample(cls, pids):
+        # type: (Dict[str, int]) -> None
+        """
+        Record a sample for the given processes
+        :param pids: Main PID per ASD ID. ASDs not passed are forgotten, ASDs without PID (0 or None) are not sampled
+        :type pids: dict
+        :return: None
+        :rtype: NoneType
+        """
+        memory_total = cls._get_memory_total()
+        samples = {}
+        for asd_id, pid in pids.iteritems():
+            if not pid:
+                continue
+            try:
+                samples[asd_id] = (time.time(), pid, cls._read_process(pid))
+            except (IOError, OSError):
+                pass  # Process stopped meanwhile
+
+        with cls._lock:
+            for asd_id in set(cls._history) | set(cls._previous):
+                if asd_id not in pids:
+                    cls._history.pop(asd_id, None)
+                    cls._previous.pop(asd_id, None)
+                    cls._latest.pop(asd_id, None)
+            for asd_id, (now, pid, process) in samples.iteritems():
+                previous = cls._previous.get(asd_id)
+                cls._previous[asd_id] = (now, pid, process['cpu_ticks'], process['read_bytes'], process['write_bytes'])
+                cls._latest[asd_id] = {'pid': pid,
+                                       'fd_limit': process['fd_limit']}
+                if previous is None or previous[1] != pid or now <= previous[0]:
+                    continue  # Rates require 2 samples of the same process
+                elapsed = now - previous[0]
+                values = {'rss': process['rss'],
+                          'rss_percent': 100.0 * process['rss'] / memory_total if memory_total else 0.0,
+                          'cpu_percent': 100.0 * (process['cpu_ticks'] - previous[2]) / cls._clock_ticks / elapsed,
+                          'fds': process['fds'],
+                          'fd_percent': 100.0 * process['fds'] / process['fd_limit'] if process['fd_limit'] else 0.0,
+                          'read_bytes': max(0, process['read_bytes'] - previous[3]) / elapsed,
+                          'write_bytes': max(0, process['write_bytes'] - previous[4]) / elapsed}
+                if asd_id not in cls._history:
+                    cls._history[asd_id] = dict((key, RingBuffer(cls.HISTORY)) for key in cls.METRICS + ['timestamps'])
+                history = cls._history[asd_id]
+                history['timestamps'].append(now)
+                for metric in cls.METRICS:
+                    history[metric].append(values[metric])
+
+    @classmethod
+    def get_latest(cls, asd_id):
+        # type: (str) -> Optional[dict]
+        """
+        Retrieve the most recent resource usage of an ASD process
+        :param asd_id: ID of the ASD
+        :type asd_id: str
+        :return: The timestamp, PID, file descriptor limit, metrics and warnings ('memory', 'fd_exhaustion') of the last sample or None when no sample is available yet
+        :rtype: dict
+        """
+        with cls._lock:
+            history = cls._history.get(asd_id)
+            if history is None:
+                return None
+            latest = dict((metric, round(history[metric].last(), 2)) for metric in cls.METRICS)
+            latest.update(cls._latest[asd_id])
+            latest['rss'] = int(latest['rss'])
+            latest['fds'] = int(latest['fds'])
+            latest['timestamp'] = history['timestamps'].last()
+            latest['warnings'] = []
+            if latest['rss_percent'] >= cls.MEMORY_WARNING_PERCENT:
+                latest['warnings'].append('memory')
+            if latest['fd_percent'] >= cls.FD_WARNING_PERCENT:
+                latest['warnings'].append('fd_exhaustion')
+            return latest
+
+    @classmethod
+    def get_history(cls, asd_id, amount=None):
+        # type: (str, Optional[int]) -> Optional[dict]
+        """
+        Retrieve the recorded resource usage of an ASD process
+        :param asd_id: ID of the ASD
+        :type asd_id: str
+        :param amount: Amount of samples to retrieve. Defaults to all samples
+        :type amount: int
+        :return: Per metric the values (oldest first) and the timestamps of the samples or None when no sample is available yet
+        :rtype: dict
+        """
+        with cls._lock:
+            history = cls._history.get(asd_id)
+            if history is None:
+                return None
+            return dict((key, buffer_.to_list(amount)) for key, buffer_ in history.iteritems())
+
+    @classmethod
+    def _read_process(cls, pid):
+        # type: (int) -> dict
+        """
+        Read the counters of a process
+        :param pid: ID of the process
+        :type pid: int
+        :return: The CPU ticks, resident memory, open and maximum file descriptors and storage I/O in bytes
+        :rtype: dict
+        """
+        process_root = '{0}/{1}'.format(cls.PROC_ROOT, pid)
+        with open('{0}/stat'.format(process_root)) as stat_file:
+            # The process name can contain spaces, the fields to parse follow its closing parenthesis
+            stat = stat_file.read().rsplit(')', 1)[1].split()
+        with open('{0}/statm'.format(process_root)) as statm_file:
+            rss_pages = int(statm_file.read().split()[1])
+        fd_limit = None
+        with open('{0}/limits'.format(process_root)) as limits_file:
+            for line in limits_file:
+                if line.startswith('Max open files'):
+                    soft_limit = line[len('Max open files'):].split()[0]
+                    fd_limit = int(soft_limit) if soft_limit.isdigit() else None  # 'unlimited'
+        io = {}
+        with open('{0}/io'.format(process_root)) as io_file:
+            for line in io_file:
+                key, _, value = line.partition(':')
+                io[key] = int(value)
+        return {'cpu_ticks': int(stat[11]) + int(stat[12]),  # utime and stime
+                'rss': rss_pages * cls._page_size,
+                'fds': len(os.listdir('{0}/fd'.format(process_root))),
+                'fd_limit': fd_limit,
+                'read_bytes': io.get('read_bytes', 0),
+                'write_bytes': io.get('write_bytes', 0)}
+
+    @classmethod
+    def _get_memory_total(cls):
+        # type: () -> int
+        """
+        Retrieve the total memory of the node in bytes
+        """
+        with open('{0}/meminfo'.format(cls.PROC_ROOT)) as meminfo_file:
+            for line in meminfo_file:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) * 1024
+        return 0
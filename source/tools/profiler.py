@@ -0,0 +1,183 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Profiler module, inspects the running ASD manager process
+"""
+
+import sys
+import time
+import base64
+import marshal
+import pstats
+import cProfile
+import threading
+import traceback
+from contextlib import contextmanager
+from StringIO import StringIO
+
+
+class ProfilerBusyException(RuntimeError):
+    """
+    Raised when a profiling session is requested while another one is in progress
+    """
+    pass
+
+
+class Profiler(object):
+    """
+    On-demand profiling of the running process
+    Nothing is recorded unless a profiling session is in progress
+    """
+    MAX_DURATION = 120
+    MIN_INTERVAL = 0.001
+
+    _lock = threading.Lock()
+    _active_profile = None
+    _aggregated_stats = None
+    _profiled_requests = 0
+    _stats_lock = threading.Lock()
+    _thread_data = threading.local()
+
+    @staticmethod
+    def dump_threads():
+        # type: () -> dict
+        """
+        Retrieve the current stack of all threads of the process
+        :return: The stack (outermost frame first) per thread
+        :rtype: dict
+        """
+        names = dict((thread.ident, thread.name) for thread in threading.enumerate())
+        stacks = {}
+        for thread_id, frame in sys._current_frames().iteritems():
+            name = '{0} ({1})'.format(names.get(thread_id, 'unknown'), thread_id)
+            stacks[name] = [line.rstrip() for line in traceback.format_stack(frame)]
+        return stacks
+
+    @classmethod
+    def sample(cls, duration, interval=0.01):
+        # type: (float, float) -> dict
+        """
+        Sample the stacks of all other threads for the given duration
+        :param duration: Duration of the session in seconds
+        :type duration: float
+        :param interval: Time between two samples in seconds
+        :type interval: float
+        :return: The amount of samples and the stacks in collapsed format ('frame;frame;frame count' per line)
+        :rtype: dict
+        """
+        with cls._session():
+            own_thread_id = threading.current_thread().ident
+            names = {}
+            counts = {}
+            samples = 0
+            end = time.time() + min(duration, cls.MAX_DURATION)
+            while time.time() < end:
+                for thread in threading.enumerate():
+                    names[thread.ident] = thread.name
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread_id:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append('{0} ({1}:{2})'.format(frame.f_code.co_name, frame.f_code.co_filename, frame.f_code.co_firstlineno))
+                        frame = frame.f_back
+                    stack.append(names.get(thread_id, 'unknown'))
+                    key = ';'.join(reversed(stack))
+                    counts[key] = counts.get(key, 0) + 1
+                samples += 1
+                time.sleep(interval)
+        return {'samples': samples,
+                'stacks': '\n'.join('{0} {1}'.format(key, count) for key, count in sorted(counts.iteritems()))}
+
+    @classmethod
+    def profile(cls, duration):
+        # type: (float) -> dict
+        """
+        Deterministically profile all requests handled during the given duration
+        :param duration: Duration of the session in seconds
+        :type duration: float
+        :return: The amount of profiled requests, the pstats dump (base64 encoded marshal data, loadable with pstats) and a summary
+        :rtype: dict
+        """
+        with cls._session():
+            with cls._stats_lock:
+                cls._aggregated_stats = None
+                cls._profiled_requests = 0
+            cls._active_profile = True
+            try:
+                time.sleep(min(duration, cls.MAX_DURATION))
+            finally:
+                cls._active_profile = None
+            with cls._stats_lock:
+                stats = cls._aggregated_stats
+                requests = cls._profiled_requests
+                cls._aggregated_stats = None
+        if stats is None:
+            return {'requests': 0, 'pstats': None, 'summary': ''}
+        summary = StringIO()
+        stats.stream = summary
+        stats.sort_stats('cumulative').print_stats(50)
+        return {'requests': requests,
+                'pstats': base64.b64encode(marshal.dumps(stats.stats)),
+                'summary': summary.getvalue()}
+
+    @classmethod
+    def start_request(cls):
+        # type: () -> None
+        """
+        Start profiling the current request when a profiling session is in progress
+        :return: None
+        :rtype: NoneType
+        """
+        if cls._active_profile is None:
+            return
+        profile = cProfile.Profile()
+        cls._thread_data.profile = profile
+        profile.enable()
+
+    @classmethod
+    def stop_request(cls):
+        # type: () -> None
+        """
+        Stop profiling the current request and add its statistics to the session
+        :return: None
+        :rtype: NoneType
+        """
+        profile = getattr(cls._thread_data, 'profile', None)
+        if profile is None:
+            return
+        profile.disable()
+        cls._thread_data.profile = None
+        with cls._stats_lock:
+            if cls._aggregated_stats is None:
+                cls._aggregated_stats = pstats.Stats(profile)
+            else:
+                cls._aggregated_stats.add(profile)
+            cls._profiled_requests += 1
+
+    @classmethod
+    @contextmanager
+    def _session(cls):
+        """
+        Guard ensuring only one profiling session runs at a time
+        """
+        if not cls._lock.acquire(False):
+            raise ProfilerBusyException('Another profiling session is in progress')
+        try:
+            yield
+        finally:
+            cls._lock.release()
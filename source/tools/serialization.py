@@ -0,0 +1,148 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Serialization module, encodes and compresses API responses
+"""
+
+import json
+import zlib
+
+
+class Serialization(object):
+    """
+    Pluggable JSON encoding and HTTP content negotiation for compressed responses
+    Faster encoders (ujson, simplejson) are used when installed, the standard json module otherwise.
+    Other encoders can be plugged in using register_encoder and set_encoder
+    """
+    COMPRESSION_LEVEL = 6
+    COMPRESSION_MIN_SIZE = 1024  # Compressing smaller payloads costs more than it saves
+    ENCODER_PREFERENCE = ['ujson', 'simplejson', 'json']
+
+    _encoders = {'json': lambda data: json.dumps(data)}
+    _encoder = None
+
+    @classmethod
+    def register_encoder(cls, name, function):
+        # type: (str, callable) -> None
+        """
+        Register a JSON encoder
+        :param name: Name of the encoder
+        :type name: str
+        :param function: Function encoding a JSON serializable object into a string
+        :type function: callable
+        :return: None
+        :rtype: NoneType
+        """
+        cls._encoders[name] = function
+
+    @classmethod
+    def set_encoder(cls, name):
+        # type: (str) -> None
+        """
+        Select the JSON encoder used to encode the responses
+        :param name: Name of a registered encoder
+        :type name: str
+        :return: None
+        :rtype: NoneType
+        """
+        if name not in cls._encoders:
+            raise ValueError('Unknown encoder {0}. Available: {1}'.format(name, ', '.join(sorted(cls._encoders))))
+        cls._encoder = name
+
+    @classmethod
+    def get_encoder(cls):
+        # type: () -> str
+        """
+        Retrieve the name of the selected encoder. Defaults to the first available encoder of ENCODER_PREFERENCE
+        :return: The name of the encoder
+        :rtype: str
+        """
+        if cls._encoder is None:
+            cls._encoder = next(name for name in cls.ENCODER_PREFERENCE if name in cls._encoders)
+        return cls._encoder
+
+    @classmethod
+    def encode(cls, data):
+        # type: (any) -> str
+        """
+        Encode data as JSON using the selected encoder
+        :param data: The data to encode
+        :type data: any
+        :return: The JSON string
+        :rtype: str
+        """
+        return cls._encoders[cls.get_encoder()](data)
+
+    @classmethod
+    def negotiate_encoding(cls, accept_encoding):
+        # type: (Optional[str]) -> Optional[str]
+        """
+        Select the content encoding of a response based on the Accept-Encoding header of the request
+        :param accept_encoding: Value of the Accept-Encoding header (eg: 'gzip, deflate;q=0.5')
+        :type accept_encoding: str
+        :return: 'gzip', 'deflate' or None when the response should not be compressed
+        :rtype: str
+        """
+        qualities = {}
+        for item in (accept_encoding or '').split(','):
+            parts = item.strip().split(';')
+            encoding = parts[0].strip().lower()
+            quality = 1.0
+            for parameter in parts[1:]:
+                key, _, value = parameter.strip().partition('=')
+                if key == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            if encoding != '':
+                qualities[encoding] = quality
+        for encoding in ['gzip', 'deflate']:
+            qualities.setdefault(encoding, qualities.get('*', 0.0))
+        best = max(['gzip', 'deflate'], key=lambda encoding: qualities[encoding])  # gzip wins ties
+        return best if qualities[best] > 0 else None
+
+    @classmethod
+    def compress(cls, payload, encoding):
+        # type: (str, str) -> str
+        """
+        Compress a payload
+        :param payload: The payload to compress
+        :type payload: str
+        :param encoding: 'gzip' or 'deflate' (zlib format, as defined by HTTP)
+        :type encoding: str
+        :return: The compressed payload
+        :rtype: str
+        """
+        if encoding == 'gzip':
+            compressor = zlib.compressobj(cls.COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            return compressor.compress(payload) + compressor.flush()
+        if encoding == 'deflate':
+            return zlib.compress(payload, cls.COMPRESSION_LEVEL)
+        raise ValueError('Unsupported encoding {0}'.format(encoding))
+
+
+try:
+    import ujson
+    Serialization.register_encoder('ujson', lambda data: ujson.dumps(data, escape_forward_slashes=False))
+except ImportError:
+    pass
+try:
+    import simplejson
+    Serialization.register_encoder('simplejson', lambda data: simplejson.dumps(data))
+except ImportError:
+    pass
@@ -0,0 +1,42 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+SSHClient module for the ASD Manager
+"""
+
+import os
+import time
+from ovs_extensions.generic.sshclient import SSHClient as _SSHClient
+from source.tools.metrics import Metrics
+
+
+class SSHClient(_SSHClient):
+    """
+    SSHClient which keeps track of the executed commands
+    """
+
+    def run(self, command, *args, **kwargs):
+        """
+        Executes a command. See the base class for the supported arguments
+        """
+        start = time.time()
+        try:
+            return super(SSHClient, self).run(command, *args, **kwargs)
+        finally:
+            executable = command[0] if isinstance(command, list) else command.split()[0]
+            Metrics.observe('asd_manager_command_duration_seconds', time.time() - start, command=os.path.basename(executable))
+            Metrics.count_command()
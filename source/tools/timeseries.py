@@ -0,0 +1,247 @@
+# Copyright (C) 2018 iNuron NV
+#
+# This file is part of Open vStorage Open Source Edition (OSE),
+# as available from
+#
+#      http://www.openvstorage.org and
+#      http://www.openvstorage.com.
+#
+# This file is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Affero General Public License v3 (GNU AGPLv3)
+# as published by the Free Software Foundation, in version 3 as it comes
+# in the LICENSE.txt file of the Open vStorage OSE distribution.
+#
+# Open vStorage is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY of any kind.
+
+"""
+Time series module, an embedded store for node metrics in memory-mapped ring files
+"""
+
+import os
+import re
+import sys
+import mmap
+import time
+import array
+import struct
+import threading
+from collections import OrderedDict
+
+
+class TimeSeriesException(Exception):
+    """
+    Raised when a series name is invalid or too many series exist
+    """
+    pass
+
+
+class TimeSeries(object):
+    """
+    Stores numeric series (eg: slots/<slot_id>/read_iops) in fixed-size files, one file per series
+    Every file contains a ring of buckets per tier. A recorded value is aggregated into the current bucket of every tier,
+    so the coarser tiers are downsampled averages of the same values and no separate downsampling pass is needed.
+    A bucket consists of 3 doubles: the start of the bucket, the sum and the amount of values. A bucket whose start does
+    not match the requested time has been overwritten (or never written) and is skipped when reading.
+    Disk and memory use is bounded by MAX_SERIES * the file size (about 60 KiB per series)
+    The mappings of the MAX_OPEN_MAPPINGS most recently used series are kept open, every mapping holds a file descriptor.
+    The least recently used mapping is closed when another series gets mapped, so the amount of series does not exhaust the file descriptors
+    """
+    FOLDER = '/opt/asd-manager/timeseries'
+    EXTENSION = '.ts'
+    TIERS = [(10, 360),     # 10 seconds for 1 hour
+             (60, 1440),    # 1 minute for 1 day
+             (3600, 720)]   # 1 hour for 30 days
+    MAX_SERIES = 2000
+    MAX_OPEN_MAPPINGS = 256
+    MAGIC = 'ASDTS001'
+
+    _HEADER = struct.Struct('<8sd')  # Magic, timestamp of the last recorded value
+    _BUCKET = struct.Struct('<3d')   # Start, sum, count
+    _NAME_REGEX = re.compile('^[a-zA-Z0-9_.:-]+(/[a-zA-Z0-9_.:-]+)*$')
+
+    _lock = threading.Lock()
+    _mappings = OrderedDict()  # Path: mapping, least recently used first
+
+    @classmethod
+    def record(cls, series, value, timestamp=None):
+        # type: (str, float, Optional[float]) -> None
+        """
+        Record a value for a series, creating the series when required
+        :param series: Name of the series. Slash separated segments of letters, digits, '_', '.', ':' and '-'
+        :type series: str
+        :param value: The value to record
+        :type value: float
+        :param timestamp: Time of the value. Defaults to now
+        :type timestamp: float
+        :return: None
+        :rtype: NoneType
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with cls._lock:
+            mapping = cls._get_mapping(series, create=True)
+            offset = cls._HEADER.size
+            for resolution, buckets in cls.TIERS:
+                start = timestamp - timestamp % resolution
+                position = offset + int(start // resolution) % buckets * cls._BUCKET.size
+                bucket_start, bucket_sum, bucket_count = cls._BUCKET.unpack_from(mapping, position)
+                if bucket_start != start:
+                    bucket_sum, bucket_count = 0.0, 0
+                cls._BUCKET.pack_into(mapping, position, start, bucket_sum + value, bucket_count + 1)
+                offset += buckets * cls._BUCKET.size
+            cls._HEADER.pack_into(mapping, 0, cls.MAGIC, timestamp)
+
+    @classmethod
+    def query(cls, series, start=None, end=None, resolution=None):
+        # type: (str, Optional[float], Optional[float], Optional[int]) -> dict
+        """
+        Retrieve the values of a series within a time range
+        :param series: Name of the series
+        :type series: str
+        :param start: Start of the range. Defaults to 1 hour before the end
+        :type start: float
+        :param end: End of the range. Defaults to now
+        :type end: float
+        :param resolution: Minimal resolution in seconds. Defaults to the finest tier which still covers the start of the range
+        :type resolution: int
+        :return: The resolution used and the [timestamp, average] points within the range, oldest first
+        :rtype: dict
+        """
+        now = time.time()
+        end = now if end is None else min(end, now)
+        start = end - 3600 if start is None else start
+        tier = len(cls.TIERS) - 1
+        for index, (tier_resolution, buckets) in enumerate(cls.TIERS):
+            if (resolution is not None and tier_resolution >= resolution) or (resolution is None and now - start <= tier_resolution * buckets):
+                tier = index
+                break
+        tier_resolution, buckets = cls.TIERS[tier]
+        offset = cls._HEADER.size + sum(tier_buckets * cls._BUCKET.size for _, tier_buckets in cls.TIERS[:tier])
+        points = []
+        with cls._lock:
+            mapping = cls._get_mapping(series, create=False)
+            values = array.array('d')
+            values.fromstring(mapping[offset:offset + buckets * cls._BUCKET.size])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        bucket_start = max(start - start % tier_resolution, end - end % tier_resolution - (buckets - 1) * tier_resolution)
+        while bucket_start <= end:
+            index = int(bucket_start // tier_resolution) % buckets * 3
+            if values[index] == bucket_start and values[index + 2] > 0:
+                points.append([bucket_start, values[index + 1] / values[index + 2]])
+            bucket_start += tier_resolution
+        return {'resolution': tier_resolution,
+                'points': points}
+
+    @classmethod
+    def list_series(cls):
+        # type: () -> List[str]
+        """
+        List the names of all stored series
+        :return: The sorted series names
+        :rtype: list
+        """
+        series = []
+        for root, _, filenames in os.walk(cls.FOLDER):
+            for filename in filenames:
+                if filename.endswith(cls.EXTENSION):
+                    path = os.path.join(root, filename)[len(cls.FOLDER) + 1:-len(cls.EXTENSION)]
+                    series.append(path.replace(os.sep, '/'))
+        return sorted(series)
+
+    @classmethod
+    def prune(cls, max_age):
+        # type: (float) -> List[str]
+        """
+        Remove the series which did not receive values for a while (eg: of removed slots or ASDs)
+        :param max_age: Amount of seconds after which a series without new values is removed
+        :type max_age: float
+        :return: The names of the removed series
+        :rtype: list
+        """
+        removed = []
+        threshold = time.time() - max_age
+        for series in cls.list_series():
+            with cls._lock:
+                try:
+                    last_recorded = cls._HEADER.unpack_from(cls._get_mapping(series, create=False), 0)[1]
+                except TimeSeriesException:
+                    continue
+                if last_recorded < threshold:
+                    path = cls._get_path(series)
+                    mapping = cls._mappings.pop(path, None)
+                    if mapping is not None:
+                        mapping.close()
+                    os.remove(path)
+                    removed.append(series)
+        return removed
+
+    @classmethod
+    def close(cls):
+        # type: () -> None
+        """
+        Close all open mappings (eg: on shutdown)
+        :return: None
+        :rtype: NoneType
+        """
+        with cls._lock:
+            while len(cls._mappings) > 0:
+                cls._mappings.popitem(last=False)[1].close()
+
+    @classmethod
+    def _get_path(cls, series):
+        # type: (str) -> str
+        """
+        Retrieve the path of the file of a series
+        """
+        if cls._NAME_REGEX.match(series) is None or any(segment in ['.', '..'] for segment in series.split('/')):
+            raise TimeSeriesException('Invalid series name {0}'.format(series))
+        return os.path.join(cls.FOLDER, *series.split('/')) + cls.EXTENSION
+
+    @classmethod
+    def _get_mapping(cls, series, create):
+        # type: (str, bool) -> mmap.mmap
+        """
+        Retrieve the mapping of the file of a series, mapping it when it is not open yet. Callers must hold the lock
+        A file with an unknown layout (eg: after the tiers changed) is reinitialized
+        """
+        path = cls._get_path(series)
+        mapping = cls._mappings.pop(path, None)
+        if mapping is None:
+            mapping = cls._map(series=series, path=path, create=create)
+            while len(cls._mappings) >= cls.MAX_OPEN_MAPPINGS:
+                cls._mappings.popitem(last=False)[1].close()
+        cls._mappings[path] = mapping
+        return mapping
+
+    @classmethod
+    def _map(cls, series, path, create):
+        # type: (str, str, bool) -> mmap.mmap
+        """
+        Map the file of a series into memory
+        """
+        size = cls._HEADER.size + sum(buckets * cls._BUCKET.size for _, buckets in cls.TIERS)
+        if not os.path.exists(path):
+            if create is False:
+                raise TimeSeriesException('Series {0} does not exist'.format(series))
+            if len(cls.list_series()) >= cls.MAX_SERIES:
+                raise TimeSeriesException('Maximum amount of series ({0}) reached'.format(cls.MAX_SERIES))
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+        with open(path, 'a+b') as series_file:
+            series_file.seek(0, os.SEEK_END)
+            if series_file.tell() != size or cls._read_magic(series_file) != cls.MAGIC:
+                series_file.truncate(0)
+                series_file.write('\0' * size)
+                series_file.flush()
+            return mmap.mmap(series_file.fileno(), size)
+
+    @classmethod
+    def _read_magic(cls, series_file):
+        # type: (file) -> str
+        """
+        Read the magic bytes of a series file
+        """
+        series_file.seek(0)
+        return series_file.read(len(cls.MAGIC))